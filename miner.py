@@ -1,665 +1,550 @@
+import argparse
 import pygame
 import random
 import sys
 import time
-from collections import deque  # For pathfinding
-
-# Initialize Pygame
-pygame.init()
+from collections import OrderedDict
+from miner_corpus import load_corpus
+from miner_engine import Action, PLAYER_HEALTH
+from miner_field import Cell, CELL_COLORS
+from miner_prefetch import LevelPrefetcher
+from miner_profile import FrameProfiler, PHASES
+from miner_replay import InputRecorder, make_state, state_digest
+from miner_save import save_state
 
 # Constants
-GRID_SIZE = 40
+GRID_SIZE = 40  # Cells per side of the world
 CELL_SIZE = 50  # Reduced cell size to fit on screen
-SCREEN_SIZE = GRID_SIZE * CELL_SIZE
-SCREEN = pygame.display.set_mode((SCREEN_SIZE, SCREEN_SIZE))
-pygame.display.set_caption("Simple Game")
+# The window is independent of the world size: when the world is larger
+# the view scrolls to follow the player
+WINDOW_WIDTH = 2000
+WINDOW_HEIGHT = 2000
+# Set to play a lazily generated world of this many cells per side,
+# loaded in chunks as the player explores, instead of a GRID_SIZE level
+WORLD_SIZE = None
+# Most zombie ticks to run in one frame when catching up after a stall
+MAX_CATCH_UP_STEPS = 4
+# Draw zombies gliding between cells instead of jumping once per tick
+INTERPOLATE_ZOMBIES = False
 
 # Colors
 WHITE = (255, 255, 255)
 GRAY = (160, 160, 160)
 GREEN = (0, 255, 0)
-BROWN = (156, 93, 82)
 RED = (255, 0, 0)
 BLACK = (0, 0, 0)
-BLUE = (0, 0, 255)
-PURPLE = (160, 32, 240)
-AQUA = (0, 255, 255)
-ORANGE = (255, 165, 0)
-DARK_GREEN = (0, 128, 0)  # For green ore
-
-# Fonts
-font = pygame.font.SysFont(None, 18)
-
-# Clock
-clock = pygame.time.Clock()
-
 
-def main():
-    level = 1
-    player_blue_ore_inventory = 0
-    player_green_ore_inventory = 0
-    player_health = 5
-    player_inventory = 0
-    total_zombies_defeated = 0
+# Fill colour of each cell kind, indexed by Cell
+CELL_FILL = [tuple(color) for color in CELL_COLORS.tolist()]
+
+# Screen area behind the stats text, redrawn every frame
+HUD_RECT = pygame.Rect(0, 0, 200, 130)
+
+# Key that shows or hides the frame timing overlay, and its screen area
+PROFILE_KEY = pygame.K_F3
+PROFILE_RECT = pygame.Rect(WINDOW_WIDTH - 330, 0, 330, 30 + 20 * len(PHASES))
+
+# Key that saves a snapshot of the level to SAVE_PATH, for --load
+SAVE_KEY = pygame.K_F5
+SAVE_PATH = 'miner.sav'
+
+# Keyboard controls
+KEY_ACTIONS = {
+    # Arrow keys move one square per key press
+    pygame.K_LEFT: Action.MOVE_LEFT,
+    pygame.K_RIGHT: Action.MOVE_RIGHT,
+    pygame.K_UP: Action.MOVE_UP,
+    pygame.K_DOWN: Action.MOVE_DOWN,
+    pygame.K_p: Action.PLACE_MATERIAL,
+    pygame.K_RETURN: Action.PLACE_GREEN_ORE,  # Enter key to place green ore in front
+    # Using 'w', 'a', 's', 'd' to mine or hit zombie
+    pygame.K_w: Action.HIT_UP,
+    pygame.K_a: Action.HIT_LEFT,
+    pygame.K_s: Action.HIT_DOWN,
+    pygame.K_d: Action.HIT_RIGHT,
+    pygame.K_b: Action.CRAFT_BUCKET,
+    # Shift picks up lava or water, Alt pours the bucket to make obsidian
+    pygame.K_LSHIFT: Action.FILL_BUCKET,
+    pygame.K_RSHIFT: Action.FILL_BUCKET,
+    pygame.K_LALT: Action.POUR_BUCKET,
+    pygame.K_RALT: Action.POUR_BUCKET,
+}
+
+
+# Draws the part of the field under a camera that follows the player,
+# from a cached terrain surface covering just the visible cells. Only
+# cells the field reports as changed are repainted onto the terrain, and
+# when the camera moves the terrain is scrolled and only the newly exposed
+# rows and columns are painted, so the cost depends on the window size
+# rather than the world size. Sprites (player and zombies) are drawn on
+# top each frame after restoring the terrain under where they were last
+# frame, and draw() returns just the screen rects that changed so they
+# can be passed to pygame.display.update. Overlays drawn after it (like
+# the stats) are passed as hud_rects and restored every frame.
+class FieldRenderer:
+    def __init__(self, surface, field, cell_size, font):
+        self.surface = surface
+        self.field = field
+        self.cell_size = cell_size
+        # Visible cells, rounded up so partly visible cells are drawn
+        width, height = surface.get_size()
+        self.cols = min(field.width, -(-width // cell_size))
+        self.rows = min(field.height, -(-height // cell_size))
+        # World cell shown in the top-left corner of the view
+        self.camera_x = 0
+        self.camera_y = 0
+        self.terrain = pygame.Surface(
+            (self.cols * cell_size, self.rows * cell_size))
+        self.double_ore_label = font.render('2', True, BLACK)
+        self.sprite_rects = []
+        self.full_redraw = True
+
+        self.paint_area(0, 0, self.cols, self.rows)
+        field.take_dirty()
+
+    def paint_cell(self, col, row, cell_type):
+        # Paint one cell at view position (col, row) onto the terrain
+        rect = pygame.Rect(col * self.cell_size, row * self.cell_size,
+                           self.cell_size, self.cell_size)
+        self.terrain.fill(CELL_FILL[cell_type], rect)
+        if cell_type == Cell.DOUBLE_BLUE_ORE:
+            # Draw '2' on top
+            text_rect = self.double_ore_label.get_rect(center=rect.center)
+            self.terrain.blit(self.double_ore_label, text_rect)
+        pygame.draw.rect(self.terrain, GRAY, rect, 1)  # Grid lines
+        return rect
+
+    def paint_area(self, col0, row0, col1, row1):
+        # Paint the view cells in [col0, col1) x [row0, row1)
+        cells = self.field.region(self.camera_x + col0, self.camera_y + row0,
+                                  self.camera_x + col1, self.camera_y + row1).tolist()
+        for row, cell_row in enumerate(cells, row0):
+            for col, cell_type in enumerate(cell_row, col0):
+                self.paint_cell(col, row, cell_type)
+
+    def follow(self, x, y):
+        # Keep cell (x, y) centred, without showing anything past the edges
+        camera_x = min(max(x - self.cols // 2, 0), self.field.width - self.cols)
+        camera_y = min(max(y - self.rows // 2, 0), self.field.height - self.rows)
+        dx = camera_x - self.camera_x
+        dy = camera_y - self.camera_y
+        if not dx and not dy:
+            return
+        self.camera_x = camera_x
+        self.camera_y = camera_y
+        self.full_redraw = True
+        if abs(dx) >= self.cols or abs(dy) >= self.rows:
+            self.paint_area(0, 0, self.cols, self.rows)
+            return
+        # Reuse what stays visible and paint the exposed edges
+        self.terrain.scroll(-dx * self.cell_size, -dy * self.cell_size)
+        if dx > 0:
+            self.paint_area(self.cols - dx, 0, self.cols, self.rows)
+        elif dx < 0:
+            self.paint_area(0, 0, -dx, self.rows)
+        if dy > 0:
+            self.paint_area(0, self.rows - dy, self.cols, self.rows)
+        elif dy < 0:
+            self.paint_area(0, 0, self.cols, -dy)
+
+    def draw(self, player_pos, player_facing, zombies, hud_rects, alpha=1.0):
+        self.follow(player_pos[0], player_pos[1])
+        left, top = self.camera_x, self.camera_y
+        right, bottom = left + self.cols, top + self.rows
+
+        # Repaint changed cells in view onto the terrain. Cells out of view
+        # are read from the field when they scroll into view.
+        changed = [self.paint_cell(x - left, y - top, self.field.get(x, y))
+                   for x, y in self.field.take_dirty()
+                   if left <= x < right and top <= y < bottom]
+
+        # Restore the terrain wherever something may have changed
+        if self.full_redraw:
+            self.surface.fill(WHITE)
+            self.surface.blit(self.terrain, (0, 0))
+        else:
+            for rect in changed + self.sprite_rects + hud_rects:
+                self.surface.blit(self.terrain, rect, rect)
 
-    while True:
-        # Initialize level
-        run_level(level, player_inventory, player_blue_ore_inventory,
-                  player_green_ore_inventory, player_health, total_zombies_defeated)
-        # After level is complete
-        level += 1
-        player_blue_ore_inventory = 0
-        player_green_ore_inventory = 0
-        player_health = 5
-        player_inventory = 0
-
-
-def run_level(level, player_inventory, player_blue_ore_inventory, player_green_ore_inventory, player_health, total_zombies_defeated):
-    # Game field
-    field = [['empty' for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
-
-    # Player attributes
-    player_pos = [0, 0]
-    player_inventory = player_inventory
-    player_blue_ore_inventory = player_blue_ore_inventory
-    player_green_ore_inventory = player_green_ore_inventory
-    player_health = player_health
-
-    # Player facing direction ('up', 'down', 'left', 'right')
-    player_facing = 'down'  # Default facing direction
-
-    # Bucket attributes
-    player_has_bucket = False
-    bucket_content = 'empty'  # Can be 'empty', 'lava', or 'water'
-
-    # Number of zombies
-    NUM_ZOMBIES = 5 + (level - 1)
-
-    # Zombie action timer
-    zombie_last_move_time = time.time()  # Initialize the zombie action timer
-
-    # Water and Lava Placement
-    def place_water(x, y, max_cells):
-        if field[y][x] == 'empty':
-            field[y][x] = 'water'
-            # Spread water to adjacent empty cells
-            spread_water(x, y, max_cells)
-
-    def spread_water(x, y, max_cells):
-        queue = deque()
-        queue.append((x, y))
-        visited = set()
-        visited.add((x, y))
-        while queue and len(visited) < max_cells:
-            cx, cy = queue.popleft()
-            neighbors = [
-                (cx+1, cy),
-                (cx-1, cy),
-                (cx, cy+1),
-                (cx, cy-1)
-            ]
-            random.shuffle(neighbors)  # Randomize spread
-            for nx, ny in neighbors:
-                if 0 <= nx < GRID_SIZE and 0 <= ny < GRID_SIZE:
-                    if (nx, ny) not in visited:
-                        if field[ny][nx] == 'empty':
-                            field[ny][nx] = 'water'
-                            queue.append((nx, ny))
-                            visited.add((nx, ny))
-                        # Water and Lava Interaction
-                        elif field[ny][nx] == 'lava':
-                            field[ny][nx] = 'obsidian'
-                            visited.add((nx, ny))  # Prevent reprocessing
-
-    def place_lava(x, y, max_cells):
-        if field[y][x] == 'empty':
-            field[y][x] = 'lava'
-            # Spread lava to adjacent empty cells
-            spread_lava(x, y, max_cells)
-
-    def spread_lava(x, y, max_cells):
-        queue = deque()
-        queue.append((x, y))
-        visited = set()
-        visited.add((x, y))
-        while queue and len(visited) < max_cells:
-            cx, cy = queue.popleft()
-            neighbors = [
-                (cx+1, cy),
-                (cx-1, cy),
-                (cx, cy+1),
-                (cx, cy-1)
-            ]
-            random.shuffle(neighbors)  # Randomize spread
-            for nx, ny in neighbors:
-                if 0 <= nx < GRID_SIZE and 0 <= ny < GRID_SIZE:
-                    if (nx, ny) not in visited:
-                        if field[ny][nx] == 'empty':
-                            field[ny][nx] = 'lava'
-                            queue.append((nx, ny))
-                            visited.add((nx, ny))
-                        # Lava and Water Interaction
-                        elif field[ny][nx] == 'water':
-                            # Current lava turns to obsidian
-                            field[cx][cy] = 'obsidian'
-                            break  # Stop spreading this lava path
-
-    # Place water and lava pools before filling materials
-    # Place a water pool (starting point), limit the spread to 50 cells
-    water_start_x = random.randint(5, 10)
-    water_start_y = random.randint(5, 10)
-    place_water(water_start_x, water_start_y, max_cells=50)
-
-    # Place a lava pool (starting point), limit the spread to 30 cells
-    lava_start_x = random.randint(25, 30)
-    lava_start_y = random.randint(25, 30)
-    place_lava(lava_start_x, lava_start_y, max_cells=30)
-
-    # Now fill the remaining empty spaces with materials (95% fill)
-    total_cells = GRID_SIZE * GRID_SIZE
-    material_target = int(total_cells * 0.95)
-    material_count = 0
-    attempts = 0
-    max_attempts = total_cells * 2  # Prevent infinite loop
-
-    while material_count < material_target and attempts < max_attempts:
-        x = random.randint(0, GRID_SIZE - 1)
-        y = random.randint(0, GRID_SIZE - 1)
-        if field[y][x] == 'empty' and [x, y] != player_pos and field[y][x] not in ('water', 'lava', 'obsidian'):
-            field[y][x] = 'material'
-            material_count += 1
-        attempts += 1
-
-    # Now place zombies in empty spaces
-    def is_adjacent(pos1, pos2):
-        return abs(pos1[0] - pos2[0]) <= 1 and abs(pos1[1] - pos2[1]) <= 1
-
-    zombies = []
-    zombie_positions = []
-    for _ in range(NUM_ZOMBIES):
-        while True:
-            x = random.randint(0, GRID_SIZE - 1)
-            y = random.randint(0, GRID_SIZE - 1)
-            if field[y][x] == 'empty' and not is_adjacent([x, y], player_pos):
-                zombies.append({'pos': [x, y], 'health': 5,
-                                'shocked': False, 'shock_time': 0, 'attack_time': 0, 'starred': False})
-                zombie_positions.append([x, y])
-                break
-
-    # Place 2 green ores not adjacent to zombies
-    green_ore_count = 0
-    attempts = 0
-    max_attempts = total_cells * 2  # Prevent infinite loop
-    while green_ore_count < 2 and attempts < max_attempts:
-        x = random.randint(0, GRID_SIZE - 1)
-        y = random.randint(0, GRID_SIZE - 1)
-        if field[y][x] == 'empty':
-            adjacent_to_zombie = False
-            for zombie in zombies:
-                zx, zy = zombie['pos']
-                if abs(zx - x) <= 1 and abs(zy - y) <= 1:
-                    adjacent_to_zombie = True
-                    break
-            if not adjacent_to_zombie:
-                field[y][x] = 'green_ore'
-                green_ore_count += 1
-        attempts += 1
-
-    # Randomly select one zombie to be starred (but do not show it)
-    if zombies:
-        starred_zombie = random.choice(zombies)
-        starred_zombie['starred'] = True
-
-    # Game over flag
-    game_over = False
-    level_complete = False
-    game_result = None  # To store the result ("Game Over" or "You Win!")
-
-    # Function to check if player steps on obsidian with 2 blue ores (win condition)
-    def check_victory():
-        if field[player_pos[1]][player_pos[0]] == 'obsidian' and player_blue_ore_inventory >= 2:
-            return True
-        return False
-
-    def draw_field():
-        for y in range(GRID_SIZE):
-            for x in range(GRID_SIZE):
-                rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE,
-                                   CELL_SIZE, CELL_SIZE)
-
-                cell_type = field[y][x]
-                if cell_type == 'material':
-                    pygame.draw.rect(SCREEN, BROWN, rect)
-                elif cell_type == 'blue_ore':
-                    pygame.draw.rect(SCREEN, BLUE, rect)
-                elif cell_type == 'double_blue_ore':
-                    pygame.draw.rect(SCREEN, BLUE, rect)
-                    # Draw '2' on top
-                    text_surface = font.render('2', True, BLACK)
-                    text_rect = text_surface.get_rect(center=rect.center)
-                    SCREEN.blit(text_surface, text_rect)
-                elif cell_type == 'green_ore':
-                    pygame.draw.rect(SCREEN, DARK_GREEN, rect)
-                elif cell_type == 'water':
-                    pygame.draw.rect(SCREEN, AQUA, rect)
-                elif cell_type == 'lava':
-                    pygame.draw.rect(SCREEN, ORANGE, rect)
-                elif cell_type == 'obsidian':
-                    pygame.draw.rect(SCREEN, PURPLE, rect)
-                else:
-                    pygame.draw.rect(SCREEN, WHITE, rect)
-                pygame.draw.rect(SCREEN, GRAY, rect, 1)  # Grid lines
+        cell = self.cell_size
+        sprite_rects = []
 
         # Draw player
-        rect = pygame.Rect(player_pos[0] * CELL_SIZE,
-                           player_pos[1] * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-        pygame.draw.rect(SCREEN, GREEN, rect)
+        rect = pygame.Rect((player_pos[0] - left) * cell,
+                           (player_pos[1] - top) * cell, cell, cell)
+        pygame.draw.rect(self.surface, GREEN, rect)
+        sprite_rects.append(rect)
 
         # Draw player facing direction (a small line indicating direction)
-        center_x = player_pos[0] * CELL_SIZE + CELL_SIZE // 2
-        center_y = player_pos[1] * CELL_SIZE + CELL_SIZE // 2
+        center_x, center_y = rect.center
         if player_facing == 'up':
-            pygame.draw.line(SCREEN, BLACK, (center_x, center_y),
-                             (center_x, center_y - CELL_SIZE // 2), 2)
+            pygame.draw.line(self.surface, BLACK, (center_x, center_y),
+                             (center_x, center_y - cell // 2), 2)
         elif player_facing == 'down':
-            pygame.draw.line(SCREEN, BLACK, (center_x, center_y),
-                             (center_x, center_y + CELL_SIZE // 2), 2)
+            pygame.draw.line(self.surface, BLACK, (center_x, center_y),
+                             (center_x, center_y + cell // 2), 2)
         elif player_facing == 'left':
-            pygame.draw.line(SCREEN, BLACK, (center_x, center_y),
-                             (center_x - CELL_SIZE // 2, center_y), 2)
+            pygame.draw.line(self.surface, BLACK, (center_x, center_y),
+                             (center_x - cell // 2, center_y), 2)
         elif player_facing == 'right':
-            pygame.draw.line(SCREEN, BLACK, (center_x, center_y),
-                             (center_x + CELL_SIZE // 2, center_y), 2)
-
-        # Draw zombies (all look the same)
-        for zombie in zombies:
-            if zombie['health'] > 0:
-                x, y = zombie['pos']
-                rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE,
-                                   CELL_SIZE, CELL_SIZE)
-                pygame.draw.rect(SCREEN, RED, rect)
-
-    def move_player(dx, dy):
-        nonlocal player_blue_ore_inventory, player_green_ore_inventory, player_health, game_over, game_result, level_complete, player_facing
-        new_x = player_pos[0] + dx
-        new_y = player_pos[1] + dy
-        if (0 <= new_x < GRID_SIZE and 0 <= new_y < GRID_SIZE):
-            target_cell = field[new_y][new_x]
-            # Update facing direction
-            if dx == -1:
-                player_facing = 'left'
-            elif dx == 1:
-                player_facing = 'right'
-            elif dy == -1:
-                player_facing = 'up'
-            elif dy == 1:
-                player_facing = 'down'
-
-            # Check for zombies at the new position
-            if any(zombie['pos'] == [new_x, new_y] and zombie['health'] > 0 for zombie in zombies):
-                return  # Can't move into a zombie
-            elif target_cell == 'material':
-                return  # Can't move into a material
-            elif target_cell == 'lava':
-                player_health = 0  # Player dies immediately
-                player_pos[0] = new_x
-                player_pos[1] = new_y
-                game_over = True
-                game_result = "Game Over! You stepped into lava."
-            elif target_cell == 'obsidian':
-                player_pos[0] = new_x
-                player_pos[1] = new_y
-                # Check victory condition
-                if player_blue_ore_inventory >= 2:
-                    level_complete = True
-                    game_result = "Level Complete!"
-            elif target_cell == 'water':
-                player_pos[0] = new_x
-                player_pos[1] = new_y
-                # The player can move into water
-            else:
-                player_pos[0] = new_x
-                player_pos[1] = new_y
-                # Collect blue ore if present
-                if target_cell == 'blue_ore':
-                    player_blue_ore_inventory += 1
-                    field[new_y][new_x] = 'empty'
-                elif target_cell == 'double_blue_ore':
-                    player_blue_ore_inventory += 2
-                    field[new_y][new_x] = 'empty'
-                # Collect green ore if present
-                if target_cell == 'green_ore':
-                    player_green_ore_inventory += 1
-                    field[new_y][new_x] = 'empty'
-
-    def find_path(start, goal, field):
-        visited = set()
-        queue = deque()
-        queue.append((start, []))  # (current_position, path)
-
-        while queue:
-            current_pos, path = queue.popleft()
-            if current_pos == goal:
-                return path  # Return the path to the goal
-
-            x, y = current_pos
-            if current_pos in visited:
-                continue
-            visited.add(current_pos)
-
-            # Add neighboring positions (up/down/left/right) if they are walkable and not player's position
-            neighbors = [
-                (x+1, y),
-                (x-1, y),
-                (x, y+1),
-                (x, y-1)
-            ]
-            random.shuffle(neighbors)
-            for nx, ny in neighbors:
-                if 0 <= nx < GRID_SIZE and 0 <= ny < GRID_SIZE:
-                    # Check if position is walkable and not player's position
-                    if ([nx, ny] != player_pos and
-                            field[ny][nx] in ('empty', 'blue_ore', 'double_blue_ore', 'obsidian', 'water', 'green_ore')):
-                        if (nx, ny) not in visited:
-                            queue.append(((nx, ny), path + [(nx, ny)]))
-        # No path found
-        return None
-
-    def move_zombies():
-        for zombie in zombies:
-            if zombie['health'] <= 0:
-                continue
-            if zombie['shocked']:
-                continue
-
-            x, y = zombie['pos']
-            path = find_path((x, y), (player_pos[0], player_pos[1]), field)
-            if path and len(path) > 0:
-                next_pos = path[0]
-                # Ensure zombie doesn't move onto player
-                if next_pos != (player_pos[0], player_pos[1]):
-                    zombie['pos'][0], zombie['pos'][1] = next_pos
-                    # Check if zombie steps into lava
-                    if field[zombie['pos'][1]][zombie['pos'][0]] == 'lava':
-                        zombie['health'] = 0  # Zombie dies
-                    # Check if zombie steps onto green ore
-                    elif field[zombie['pos'][1]][zombie['pos'][0]] == 'green_ore':
-                        field[zombie['pos'][1]][zombie['pos'][0]] = 'blue_ore'
-                else:
-                    # Zombie is adjacent to player, may attack
-                    pass
-            else:
-                # No path found, move randomly
-                directions = [(0, -1), (0, 1), (-1, 0), (1, 0)]
-                random.shuffle(directions)
-                for dx, dy in directions:
-                    nx = x + dx
-                    ny = y + dy
-                    if 0 <= nx < GRID_SIZE and 0 <= ny < GRID_SIZE:
-                        if field[ny][nx] in ('empty', 'blue_ore', 'double_blue_ore', 'obsidian', 'water', 'green_ore') and [nx, ny] != player_pos:
-                            zombie['pos'][0] = nx
-                            zombie['pos'][1] = ny
-                            # Check if zombie steps into lava
-                            if field[ny][nx] == 'lava':
-                                zombie['health'] = 0  # Zombie dies
-                            # Check if zombie steps onto green ore
-                            elif field[ny][nx] == 'green_ore':
-                                field[ny][nx] = 'blue_ore'
-                            break  # Move made
-                # If no move made, zombie stays in place
-
-    def mine_material_at(x, y):
-        nonlocal player_inventory
-        if field[y][x] == 'material':
-            field[y][x] = 'empty'
-            player_inventory += 1
-
-    def action_on_direction(direction):
-        dx, dy = 0, 0
-        if direction == 'up':
-            dy = -1
-        elif direction == 'down':
-            dy = 1
-        elif direction == 'left':
-            dx = -1
-        elif direction == 'right':
-            dx = 1
+            pygame.draw.line(self.surface, BLACK, (center_x, center_y),
+                             (center_x + cell // 2, center_y), 2)
+
+        # Draw zombies in view (all look the same)
+        for x, y in zip(*zombies.living_positions(left, top, right, bottom, alpha)):
+            rect = pygame.Rect(round((x - left) * cell), round((y - top) * cell),
+                               cell, cell)
+            pygame.draw.rect(self.surface, RED, rect)
+            sprite_rects.append(rect)
+
+        if self.full_redraw:
+            self.full_redraw = False
+            update_rects = [self.surface.get_rect()]
         else:
-            return
+            update_rects = changed + self.sprite_rects + sprite_rects + hud_rects
+        self.sprite_rects = sprite_rects
+        return update_rects
+
+
+# The F3 overlay: rolling p50/p99 of each phase of the frame and the
+# achieved FPS. The text is only re-rendered a few times a second.
+class ProfileOverlay:
+    def __init__(self, profiler, rect, font, refresh=0.25):
+        self.profiler = profiler
+        self.rect = rect
+        self.font = font
+        self.refresh = refresh
+        self.surface = pygame.Surface(rect.size)
+        self.updated = None
+
+    def draw(self, surface, now):
+        if self.updated is None or now - self.updated >= self.refresh:
+            self.updated = now
+            self.render()
+        surface.blit(self.surface, self.rect)
+
+    def render(self):
+        self.surface.fill(WHITE)
+        lines = [f'FPS: {self.profiler.fps():.1f}   p50 / p99 ms']
+        stats = self.profiler.percentiles()
+        for phase in PHASES:
+            p50, p99 = stats.get(phase, (0.0, 0.0))
+            lines.append(f'{phase:16} {p50:7.2f} {p99:7.2f}')
+        for i, line in enumerate(lines):
+            self.surface.blit(self.font.render(line, True, BLACK), (10, 10 + 20 * i))
+
+
+def level_seed(level, session_rng, corpus=None):
+    # Seed of the next level: one of the corpus's levels of this number
+    # if there are any, else any seed
+    if corpus:
+        seed = load_corpus(corpus).pick(level, session_rng)
+        if seed is not None:
+            return seed
+    return session_rng.getrandbits(32)
+
+
+def upcoming_levels(level, session_rng, corpus=None):
+    # Settings of every level from this one on. Each level starts afresh
+    # apart from the zombie count, which the caller carries over.
+    while True:
+        yield level_settings(level, 0, 0, 0, PLAYER_HEALTH, 0,
+                             seed=level_seed(level, session_rng, corpus), corpus=corpus)
+        level += 1
 
-        target_x = player_pos[0] + dx
-        target_y = player_pos[1] + dy
-        if 0 <= target_x < GRID_SIZE and 0 <= target_y < GRID_SIZE:
-            # First, check for zombie at target location
-            for zombie in zombies:
-                if zombie['health'] > 0 and zombie['pos'] == [target_x, target_y]:
-                    # Hit the zombie
-                    hit_zombie(zombie)
-                    return
-            # If no zombie, try to mine material
-            if field[target_y][target_x] == 'material':
-                mine_material_at(target_x, target_y)
-
-    def place_material():
-        nonlocal player_inventory
-        if player_inventory > 0 and field[player_pos[1]][player_pos[0]] == 'empty':
-            field[player_pos[1]][player_pos[0]] = 'material'
-            player_inventory -= 1
-
-    def place_green_ore_in_front():
-        nonlocal player_green_ore_inventory
-        if player_green_ore_inventory > 0:
-            # Determine the position in front of the player based on facing direction
-            dx, dy = 0, 0
-            if player_facing == 'up':
-                dy = -1
-            elif player_facing == 'down':
-                dy = 1
-            elif player_facing == 'left':
-                dx = -1
-            elif player_facing == 'right':
-                dx = 1
-
-            target_x = player_pos[0] + dx
-            target_y = player_pos[1] + dy
-
-            if 0 <= target_x < GRID_SIZE and 0 <= target_y < GRID_SIZE:
-                if field[target_y][target_x] == 'empty':
-                    field[target_y][target_x] = 'green_ore'
-                    player_green_ore_inventory -= 1
-
-    def hit_zombie(zombie):
-        nonlocal total_zombies_defeated
-        zombie['health'] -= 1
-        zombie['shocked'] = True
-        zombie['shock_time'] = time.time()
-        if zombie['health'] <= 0:
-            # Zombie drops blue ore at its position
-            x, y = zombie['pos']
-            if zombie.get('starred', False):
-                field[y][x] = 'double_blue_ore'
-            else:
-                field[y][x] = 'blue_ore'
-            total_zombies_defeated += 1
-
-    def zombie_attack():
-        nonlocal player_health, game_over, game_result
-        current_time = time.time()
-        for zombie in zombies:
-            if zombie['health'] <= 0:
-                continue
-            if zombie['shocked']:
-                continue
-            if current_time - zombie['attack_time'] < 0.5:
-                continue  # Zombie is in attack cooldown
-            x, y = zombie['pos']
-            if abs(player_pos[0] - x) <= 1 and abs(player_pos[1] - y) <= 1:
-                player_health -= 1
-                zombie['attack_time'] = current_time
-                if player_health <= 0:
-                    game_over = True
-                    game_result = "Game Over! You were killed by a zombie."
-
-        # Update zombies' shocked status
-        current_time = time.time()
-        for zombie in zombies:
-            if zombie['shocked'] and current_time - zombie['shock_time'] >= 0.5:
-                zombie['shocked'] = False
-
-    def show_stats():
-        level_text = font.render(f'Level: {level}', True, BLACK)
-        inventory_text = font.render(
-            f'Inventory: {player_inventory}', True, BLACK)
-        health_text = font.render(f'Health: {player_health}', True, BLACK)
-        blue_ore_text = font.render(
-            f'Blue Ore: {player_blue_ore_inventory}', True, BLACK)
-        green_ore_text = font.render(
-            f'Green Ore: {player_green_ore_inventory}', True, BLACK)
-        SCREEN.blit(level_text, (10, 10))
-        SCREEN.blit(inventory_text, (10, 30))
-        SCREEN.blit(health_text, (10, 50))
-        SCREEN.blit(blue_ore_text, (10, 70))
-        SCREEN.blit(green_ore_text, (10, 90))
 
+def main(seed=None, record_path=None, profile_path=None, snapshot=None, corpus=None):
+    app = App()
+    level = 1
+    total_zombies_defeated = 0
+
+    # One seed decides every level of the session
+    session_rng = random.Random(seed)
+    recorder = InputRecorder(record_path) if record_path else None
+    profiler = FrameProfiler(profile_path)
+
+    if snapshot:
+        state = run_level(app, level, 0, 0, 0, PLAYER_HEALTH, total_zombies_defeated,
+                          seed=session_rng.getrandbits(32), recorder=recorder,
+                          profiler=profiler, snapshot=snapshot)
+        total_zombies_defeated = state.total_zombies_defeated
+        level = state.level + 1
+
+    # Levels are built on a background thread while the one before them
+    # is played, so moving on to the next level doesn't wait for it. From
+    # here on only that thread draws from session_rng. exit_game() leaves
+    # through the finally, which stops it and closes any level it built.
+    prefetcher = LevelPrefetcher(upcoming_levels(level, session_rng, corpus))
+    try:
+        while True:
+            settings, state = prefetcher.next()
+            state = run_level(app, settings['level'], 0, 0, 0, PLAYER_HEALTH,
+                              total_zombies_defeated, seed=settings['seed'], corpus=corpus,
+                              recorder=recorder, profiler=profiler, state=state)
+            total_zombies_defeated = state.total_zombies_defeated
+    finally:
+        prefetcher.close()
+
+
+# Rendered text surfaces by (text, colour). The max_entries most recently
+# used are kept, so labels that keep coming back (like the HUD numbers)
+# are only rasterized once.
+class TextCache:
+    def __init__(self, font, max_entries=256):
+        self.font = font
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+
+    def render(self, text, color=BLACK):
+        key = (text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = self.font.render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+
+# The stats in the top-left corner, kept on a transparent surface that is
+# only redrawn when one of the values changes
+class StatsHud:
+    def __init__(self, rect, text_cache):
+        self.rect = rect
+        self.text_cache = text_cache
+        self.surface = pygame.Surface(rect.size, pygame.SRCALPHA)
+        self.lines = None
+
+    def draw(self, surface, state):
         # Display bucket status
-        if player_has_bucket:
-            bucket_status = f'Bucket: {bucket_content}'
+        if state.player_has_bucket:
+            bucket_status = f'Bucket: {state.bucket_content}'
         else:
             bucket_status = 'Bucket: None'
-        bucket_text = font.render(bucket_status, True, BLACK)
-        SCREEN.blit(bucket_text, (10, 110))
+        lines = (
+            f'Level: {state.level}',
+            f'Inventory: {state.player_inventory}',
+            f'Health: {state.player_health}',
+            f'Blue Ore: {state.player_blue_ore_inventory}',
+            f'Green Ore: {state.player_green_ore_inventory}',
+            bucket_status,
+        )
+        if lines != self.lines:
+            self.lines = lines
+            self.surface.fill((0, 0, 0, 0))
+            for i, line in enumerate(lines):
+                self.surface.blit(self.text_cache.render(line), (10, 10 + 20 * i))
+        surface.blit(self.surface, self.rect)
+
+
+# Everything that needs pygame initialized: the window, font and clock.
+# They are created here rather than when the module is imported, so tools
+# and headless runs can import it without opening a window.
+class App:
+    def __init__(self):
+        pygame.init()
+        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        pygame.display.set_caption("Simple Game")
+        self.font = pygame.font.SysFont(None, 18)
+        self.clock = pygame.time.Clock()
+        self.text_cache = TextCache(self.font)
+        self.stats_hud = StatsHud(HUD_RECT, self.text_cache)
+
+    def show_stats(self, state):
+        self.stats_hud.draw(self.screen, state)
+
+
+def level_settings(level, player_inventory, player_blue_ore_inventory,
+                   player_green_ore_inventory, player_health, total_zombies_defeated,
+                   seed=None, corpus=None):
+    # Keyword arguments of make_state() for a new level, read from the
+    # level corpus at path corpus if it has the level
+    settings = {
+        'level': level,
+        'player_inventory': player_inventory,
+        'player_blue_ore_inventory': player_blue_ore_inventory,
+        'player_green_ore_inventory': player_green_ore_inventory,
+        'player_health': player_health,
+        'total_zombies_defeated': total_zombies_defeated,
+        'grid_size': GRID_SIZE,
+        'world_size': WORLD_SIZE,
+        'seed': seed,
+        'max_catch_up': MAX_CATCH_UP_STEPS,
+    }
+    if corpus:
+        settings['corpus'] = corpus
+    return settings
+
+
+def run_headless(seed=None, record_path=None, max_levels=None, corpus=None):
+    # Play a session without a window, with the scripted bot from
+    # miner_eval at the controls, until it loses, runs out of time (or
+    # max_levels levels)
+    from miner_eval import ACTION_TIME, TIME_LIMIT, ScriptedBot
+    session_rng = random.Random(seed)
+    recorder = InputRecorder(record_path) if record_path else None
+    level = 1
+    total_zombies_defeated = 0
+    while max_levels is None or level <= max_levels:
+        settings = level_settings(level, 0, 0, 0, PLAYER_HEALTH, total_zombies_defeated,
+                                  seed=level_seed(level, session_rng, corpus),
+                                  corpus=corpus)
+        state = make_state(settings)
+        if recorder:
+            recorder.start_level(settings)
+        bot = ScriptedBot()
+        steps = 0
+        while not state.done and state.now < TIME_LIMIT:
+            action = bot.act(state)
+            state.step(action, ACTION_TIME)
+            if recorder:
+                recorder.record(action, ACTION_TIME)
+            steps += 1
+        result = state.game_result or 'Out of time'
+        print(f'Level {level}: {result} after {state.now:.1f}s '
+              f'({steps} steps), digest {state_digest(state)}')
+        state.close()
+        if not state.level_complete:
+            break
+        total_zombies_defeated = state.total_zombies_defeated
+        level += 1
+    if recorder:
+        recorder.close()
+
+
+def run_level(app, level, player_inventory, player_blue_ore_inventory,
+              player_green_ore_inventory, player_health, total_zombies_defeated,
+              seed=None, recorder=None, profiler=None, snapshot=None, state=None,
+              corpus=None, now=time.perf_counter):
+    # now is the clock the simulation follows, in seconds. With snapshot
+    # the level is resumed from a file written by save_state() instead,
+    # and with corpus it is read from that level corpus by its seed.
+    # state is the level already built from the same settings (with any
+    # zombie count, which is set here), e.g. by a LevelPrefetcher.
+    settings = level_settings(level, player_inventory, player_blue_ore_inventory,
+                              player_green_ore_inventory, player_health,
+                              total_zombies_defeated, seed, corpus)
+    if snapshot:
+        settings = {'snapshot': snapshot}
+    if state is None:
+        state = make_state(settings)
+    else:
+        state.total_zombies_defeated = total_zombies_defeated
+    if recorder:
+        recorder.start_level(settings)
+
+    def step(action, dt):
+        state.step(action, dt)
+        if recorder:
+            recorder.record(action, dt)
+        for message in state.messages:
+            print(message)
+
+    def exit_game():
+        state.close()
+        if recorder:
+            recorder.close()
+        if profiler:
+            profiler.close()
+        pygame.quit()
+        sys.exit()
 
-    # Game loop
-    while not game_over and not level_complete:
-        SCREEN.fill(WHITE)
-        draw_field()
-        show_stats()
+    if profiler is None:
+        profiler = FrameProfiler()
+    state.profiler = profiler
+    screen = app.screen
+    overlay = ProfileOverlay(profiler, PROFILE_RECT, app.font)
+    renderer = FieldRenderer(screen, state.field, CELL_SIZE, app.font)
+    last_time = now()
+    pending_events = []
 
-        current_time = time.time()
+    # Game loop
+    while not state.done:
+        profiler.next_frame()
+        alpha = state.timestep.alpha if INTERPOLATE_ZOMBIES else 1.0
+        hud_rects = [HUD_RECT, PROFILE_RECT] if profiler.show else [HUD_RECT]
+        update_rects = renderer.draw(
+            state.player_pos, state.player_facing, state.zombies, hud_rects, alpha)
+        profiler.mark('draw_field')
+        app.show_stats(state)
+        if profiler.show:
+            overlay.draw(screen, now())
+        profiler.mark('show_stats')
 
         # Handle events
-        for event in pygame.event.get():
+        for event in pending_events + pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-
-            # Player input handling for moving one square per key press
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_LEFT:
-                    move_player(-1, 0)
-                elif event.key == pygame.K_RIGHT:
-                    move_player(1, 0)
-                elif event.key == pygame.K_UP:
-                    move_player(0, -1)
-                elif event.key == pygame.K_DOWN:
-                    move_player(0, 1)
-                elif event.key == pygame.K_p:
-                    place_material()
-                elif event.key == pygame.K_RETURN:  # Enter key to place green ore in front
-                    place_green_ore_in_front()
-                # Using 'w', 'a', 's', 'd' to mine or hit zombie
-                elif event.key == pygame.K_w:
-                    action_on_direction('up')
-                elif event.key == pygame.K_a:
-                    action_on_direction('left')
-                elif event.key == pygame.K_s:
-                    action_on_direction('down')
-                elif event.key == pygame.K_d:
-                    action_on_direction('right')
-
-                # Handle crafting bucket
-                elif event.key == pygame.K_b:
-                    if not player_has_bucket and player_green_ore_inventory >= 1:
-                        player_green_ore_inventory -= 1
-                        player_has_bucket = True
-                        print("You crafted a bucket.")
-
-                # Handle picking up lava or water
-                elif event.key == pygame.K_LSHIFT or event.key == pygame.K_RSHIFT:
-                    if player_has_bucket and bucket_content == 'empty':
-                        # Check adjacent squares
-                        adjacent_positions = [
-                            (player_pos[0] + 1, player_pos[1]),
-                            (player_pos[0] - 1, player_pos[1]),
-                            (player_pos[0], player_pos[1] + 1),
-                            (player_pos[0], player_pos[1] - 1)
-                        ]
-                        for x, y in adjacent_positions:
-                            if 0 <= x < GRID_SIZE and 0 <= y < GRID_SIZE:
-                                cell = field[y][x]
-                                if cell == 'lava' or cell == 'water':
-                                    bucket_content = cell
-                                    print(
-                                        f"You picked up {bucket_content} in the bucket.")
-                                    break  # Only pick up from one cell
-
-                # Handle pouring bucket to make obsidian
-                elif event.key == pygame.K_LALT or event.key == pygame.K_RALT:
-                    if player_has_bucket and bucket_content != 'empty':
-                        # Check adjacent squares for the opposite of what's in the bucket
-                        opposite = 'water' if bucket_content == 'lava' else 'lava'
-                        adjacent_positions = [
-                            (player_pos[0] + 1, player_pos[1]),
-                            (player_pos[0] - 1, player_pos[1]),
-                            (player_pos[0], player_pos[1] + 1),
-                            (player_pos[0], player_pos[1] - 1)
-                        ]
-                        for x, y in adjacent_positions:
-                            if 0 <= x < GRID_SIZE and 0 <= y < GRID_SIZE:
-                                cell = field[y][x]
-                                if cell == opposite:
-                                    field[y][x] = 'obsidian'
-                                    bucket_content = 'empty'
-                                    print("You created obsidian!")
-                                    break
-
-        # Zombies take action every 0.5 seconds
-        if current_time - zombie_last_move_time >= 0.5:
-            # Update zombies
-            move_zombies()
-            zombie_attack()
-            # Reset the timer
-            zombie_last_move_time = current_time
-
-        # COMMENTED OUT: Water spreading logic to prevent water from spilling
-        # Water will now only spread during initial level setup
-        '''  
-        # Water spreading logic  
-        water_spread_positions = []  
-        for y in range(GRID_SIZE):  
-            for x in range(GRID_SIZE):  
-                if field[y][x] == 'water':  
-                    neighbors = [  
-                        (x+1, y),  
-                        (x-1, y),  
-                        (x, y+1),  
-                        (x, y-1)  
-                    ]  
-                    for nx, ny in neighbors:  
-                        if 0 <= nx < GRID_SIZE and 0 <= ny < GRID_SIZE:  
-                            if field[ny][nx] == 'empty':  
-                                field[ny][nx] = 'water'  
-                                water_spread_positions.append((nx, ny))  
-                            elif field[ny][nx] == 'lava':  
-                                field[ny][nx] = 'obsidian'  
-        '''
-
-        pygame.display.flip()
-        clock.tick(60)  # 60 FPS for smoother player movement
+                exit_game()
+
+            if event.type == pygame.KEYDOWN and event.key == PROFILE_KEY:
+                profiler.toggle()
+                # Paint over the overlay when it's hidden
+                renderer.full_redraw = True
+            elif event.type == pygame.KEYDOWN and event.key == SAVE_KEY:
+                save_state(state, SAVE_PATH)
+                print(f'Saved to {SAVE_PATH}')
+            elif event.type == pygame.KEYDOWN and event.key in KEY_ACTIONS:
+                step(KEY_ACTIONS[event.key], 0.0)
+        profiler.mark('events')
+
+        # Advance the simulation by the time since the last frame
+        current_time = now()
+        step(Action.NONE, current_time - last_time)
+        last_time = current_time
+        profiler.mark('step')
+
+        pygame.display.update(update_rects)
+        profiler.mark('display_update')
+        app.clock.tick(60)  # 60 FPS for smoother player movement
+
+        # Without interpolation nothing on screen changes between input
+        # events and zombie ticks, so sleep until whichever comes first
+        # instead of polling every frame
+        pending_events = []
+        if not INTERPOLATE_ZOMBIES:
+            wait = state.timestep.time_to_next_step() - (now() - last_time)
+            event = pygame.event.wait(max(1, int(wait * 1000)))
+            if event.type != pygame.NOEVENT:
+                pending_events.append(event)
+        profiler.mark('idle')
 
     # Level Complete or Game Over
-    SCREEN.fill(WHITE)
-    end_text = font.render(game_result, True, BLACK)
-    text_rect = end_text.get_rect(center=(SCREEN_SIZE // 2, SCREEN_SIZE // 2))
-    SCREEN.blit(end_text, text_rect)
+    screen.fill(WHITE)
+    end_text = app.text_cache.render(state.game_result)
+    text_rect = end_text.get_rect(center=screen.get_rect().center)
+    screen.blit(end_text, text_rect)
     pygame.display.flip()
     time.sleep(2)
-    if game_over:
-        pygame.quit()
-        sys.exit()
+    if state.game_over:
+        exit_game()
     else:
-        return
+        state.close()
+        return state
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Play the miner game.')
+    parser.add_argument('--seed', type=int,
+                        help='seed for every random choice of the session')
+    parser.add_argument('--record', metavar='PATH',
+                        help='record the session for miner_replay.py')
+    parser.add_argument('--profile', metavar='PATH',
+                        help='write the phase timings of every frame to a CSV '
+                             '(.csv) or JSON lines file')
+    parser.add_argument('--load', metavar='PATH',
+                        help=f'resume from a snapshot saved with F5 (to {SAVE_PATH})')
+    parser.add_argument('--headless', action='store_true',
+                        help='play without a window, with a scripted bot')
+    parser.add_argument('--levels', type=int,
+                        help='with --headless, stop after this many levels')
+    parser.add_argument('--corpus', metavar='PATH',
+                        help='play checked levels from a corpus built with miner_corpus.py')
+    args = parser.parse_args()
+    if args.corpus and load_corpus(args.corpus).grid_size != GRID_SIZE:
+        parser.error(f'{args.corpus} holds levels of another grid size')
+    if args.headless:
+        run_headless(args.seed, args.record, args.levels, args.corpus)
+    else:
+        main(args.seed, args.record, args.profile, args.load, args.corpus)
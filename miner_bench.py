@@ -0,0 +1,304 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+import miner_engine
+from miner_components import Components
+from miner_engine import Action, FlowField, GameState, ZOMBIE_HEALTH, ZOMBIE_TICK, find_path
+from miner_field import Cell, Field
+from miner_fluids import FluidFlow
+from miner_levelgen import generate_level, spread_lava, spread_water
+from miner_zombies import Zombies
+
+# Benchmarks of the game's hot paths. Every case is seeded, runs without a
+# window (SDL's dummy video driver for drawing) and reports timings as
+# JSON, so results from two versions can be compared with --compare.
+
+GRID_SIZES = [40, 200, 1000]
+ZOMBIE_COUNTS = [10, 100, 1000]
+SEED = 1234
+# Pathfinding modes compared by the chase benchmark. Replanning with
+# find_path from scratch takes seconds per tick beyond this many
+# cells times zombies, so larger cases skip 'bfs'.
+CHASE_MODES = ['bfs', 'flow_field', 'incremental']
+MAX_BFS_CHASE = 200 * 200 * 10
+# The chase also runs with the zombie AI work budget turned off, to show
+# what it does to the worst tick, up to this many cells times zombies
+CHASE_BUDGETS = [miner_engine.AI_PLAN_BUDGET, None]
+MAX_UNBUDGETED_CHASE = 200 * 200 * 100
+
+
+def measure(func, setup=None, min_time=0.2, min_runs=3, max_runs=100):
+    # Call func repeatedly (with fresh arguments from setup, which isn't
+    # timed) until min_time has passed, and return the times in seconds
+    times = []
+    while len(times) < max_runs and (len(times) < min_runs or sum(times) < min_time):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def open_state(size, num_zombies, seed=SEED, wall=False):
+    # A level with all material cleared away, the worst case for path
+    # searches, with num_zombies zombies on random free cells. With wall,
+    # a wall of material down the middle keeps them all away from the
+    # player.
+    state = GameState(grid_size=size, seed=seed)
+    cells = state.field.cells
+    cells[cells == Cell.MATERIAL] = Cell.EMPTY
+    if wall:
+        cells[:, size // 2] = Cell.MATERIAL
+        state.zombies = Zombies()  # Not the level's own, on both sides
+    state.components = Components(state.field)
+    rng = np.random.default_rng(seed)
+    free = np.flatnonzero(cells.reshape(-1) == Cell.EMPTY)
+    zombies = state.zombies
+    for index in rng.permutation(free).tolist():
+        if len(zombies) >= num_zombies:
+            break
+        x, y = index % size, index // size
+        if max(x, y) > 1 and zombies.at(x, y) < 0 and not (wall and x < size // 2):
+            zombies.spawn(x, y, ZOMBIE_HEALTH)
+    return state
+
+
+def bench_find_path(size):
+    # The legacy per-zombie search, on a generated level
+    state = GameState(grid_size=size, seed=SEED)
+    goal = tuple(state.player_pos)
+    starts = list(zip(*state.zombies.living_positions()))
+    return measure(lambda: [find_path(start, goal, state.field, state.rng)
+                            for start in starts])
+
+
+def bench_flow_field(size):
+    state = open_state(size, 0)
+    goal = tuple(state.player_pos)
+    corner = [(size - 1, size - 1)]  # Forces a search of the whole grid
+    return measure(lambda: FlowField(state.field, goal, corner))
+
+
+def bench_move_zombies(size, num_zombies, mode='flow_field'):
+    state = open_state(size, num_zombies)
+    saved_mode = miner_engine.ZOMBIE_PATHFINDING
+    miner_engine.ZOMBIE_PATHFINDING = mode
+    try:
+        return measure(state.tick)
+    finally:
+        miner_engine.ZOMBIE_PATHFINDING = saved_mode
+
+
+def bench_chase(size, num_zombies, mode, budget=miner_engine.AI_PLAN_BUDGET):
+    # Steady-state zombie ticks while the player walks back and forth (a
+    # step every other tick) and now and then places or mines a block,
+    # so the incremental searches have goal moves and terrain changes to
+    # repair
+    state = open_state(size, num_zombies)
+    state.player_health = 10 ** 9
+    state.player_inventory = 10 ** 9
+    route = [Action.MOVE_RIGHT] * 8 + [Action.MOVE_LEFT] * 8
+    ticks = [0]
+
+    def tick():
+        n = ticks[0]
+        ticks[0] += 1
+        if n % 10 == 5:
+            action = Action.PLACE_MATERIAL if n % 20 == 5 else Action.HIT_UP
+        else:
+            action = route[n // 2 % len(route)] if n % 2 else None
+        state.step(action, ZOMBIE_TICK)
+
+    saved = miner_engine.ZOMBIE_PATHFINDING, miner_engine.AI_PLAN_BUDGET
+    miner_engine.ZOMBIE_PATHFINDING = mode
+    miner_engine.AI_PLAN_BUDGET = budget
+    try:
+        # The first tick builds the incremental searches. It counts
+        # towards the worst tick, but the median is the steady state.
+        return measure(tick, max_runs=1) + measure(tick, min_runs=20)
+    finally:
+        miner_engine.ZOMBIE_PATHFINDING, miner_engine.AI_PLAN_BUDGET = saved
+
+
+def bench_walled(size, num_zombies, mode):
+    # Zombie ticks while none of the zombies can reach the player, with
+    # every zombie planning on every tick
+    state = open_state(size, num_zombies, wall=True)
+    saved = miner_engine.ZOMBIE_PATHFINDING, miner_engine.AI_PLAN_BUDGET
+    miner_engine.ZOMBIE_PATHFINDING = mode
+    miner_engine.AI_PLAN_BUDGET = None
+    try:
+        return measure(state.tick)
+    finally:
+        miner_engine.ZOMBIE_PATHFINDING, miner_engine.AI_PLAN_BUDGET = saved
+
+
+def bench_spread(size, spread):
+    # Spread a pool over a quarter of an empty grid
+    max_cells = size * size // 4
+    rng = np.random.default_rng(SEED)
+    return measure(lambda field: spread(field, size // 2, size // 2, max_cells, rng),
+                   setup=lambda: (Field(size),))
+
+
+def bench_fluid_flow(size):
+    # Water flowing out from the middle of an empty grid, one step per run
+    def setup():
+        field = Field(size)
+        fluids = FluidFlow(field)
+        field.set(size // 2, size // 2, Cell.WATER)
+        fluids.touch(size // 2, size // 2)
+        for _ in range(min(size // 4, 50)):  # Let the edge grow first
+            fluids.spread(Cell.WATER)
+        return (fluids,)
+    return measure(lambda fluids: fluids.spread(Cell.WATER), setup=setup)
+
+
+def bench_generate_level(size):
+    rng = np.random.default_rng(SEED)
+    return measure(lambda: generate_level(1, size, rng=rng))
+
+
+def bench_draw_field(size, num_zombies):
+    # One frame with a few changed cells, in a 1000x1000 window
+    import pygame
+    import miner
+    app = miner.App()
+    state = open_state(size, num_zombies)
+    surface = pygame.Surface((1000, 1000))
+    renderer = miner.FieldRenderer(surface, state.field, miner.CELL_SIZE, app.font)
+    rng = np.random.default_rng(SEED)
+
+    def frame():
+        for x, y in rng.integers(0, min(size, renderer.cols), (5, 2)).tolist():
+            state.field.set(x, y, Cell.BLUE_ORE)
+        renderer.draw(state.player_pos, state.player_facing, state.zombies,
+                      [miner.HUD_RECT])
+
+    results = {'draw_field': measure(frame)}
+    results['draw_field_full'] = measure(
+        lambda: miner.FieldRenderer(surface, state.field, miner.CELL_SIZE, app.font))
+    return results
+
+
+def summarize(name, params, times):
+    times_ms = sorted(t * 1000 for t in times)
+    return {
+        'name': name,
+        **params,
+        'runs': len(times_ms),
+        'mean_ms': sum(times_ms) / len(times_ms),
+        'median_ms': times_ms[len(times_ms) // 2],
+        'min_ms': times_ms[0],
+        'max_ms': times_ms[-1],
+    }
+
+
+def run(sizes, zombie_counts, only=None):
+    def wanted(name):
+        return only is None or name in only
+
+    results = []
+
+    def add(name, params, times):
+        results.append(summarize(name, params, times))
+        entry = results[-1]
+        print(f"{name:18} {json.dumps(params):60} {entry['median_ms']:10.3f} ms"
+              f" (worst {entry['max_ms']:.3f} ms)", file=sys.stderr)
+
+    for size in sizes:
+        if wanted('find_path'):
+            add('find_path', {'grid_size': size}, bench_find_path(size))
+        if wanted('flow_field'):
+            add('flow_field', {'grid_size': size}, bench_flow_field(size))
+        if wanted('spread_water'):
+            add('spread_water', {'grid_size': size}, bench_spread(size, spread_water))
+        if wanted('spread_lava'):
+            add('spread_lava', {'grid_size': size}, bench_spread(size, spread_lava))
+        if wanted('fluid_flow'):
+            add('fluid_flow', {'grid_size': size}, bench_fluid_flow(size))
+        if wanted('generate_level'):
+            add('generate_level', {'grid_size': size}, bench_generate_level(size))
+        for num_zombies in zombie_counts:
+            params = {'grid_size': size, 'zombies': num_zombies}
+            if wanted('move_zombies'):
+                add('move_zombies', params, bench_move_zombies(size, num_zombies))
+            work = size * size * num_zombies
+            if wanted('chase'):
+                for mode in CHASE_MODES:
+                    if mode == 'bfs' and work > MAX_BFS_CHASE:
+                        continue
+                    for budget in CHASE_BUDGETS:
+                        if budget is None and work > MAX_UNBUDGETED_CHASE:
+                            continue
+                        add('chase', {**params, 'mode': mode, 'ai_budget': budget},
+                            bench_chase(size, num_zombies, mode, budget))
+            if wanted('walled'):
+                for mode in CHASE_MODES:
+                    if work > (MAX_BFS_CHASE if mode == 'bfs' else MAX_UNBUDGETED_CHASE):
+                        continue
+                    add('walled', {**params, 'mode': mode},
+                        bench_walled(size, num_zombies, mode))
+            if wanted('draw_field') or wanted('draw_field_full'):
+                for name, times in bench_draw_field(size, num_zombies).items():
+                    if wanted(name):
+                        add(name, params, times)
+    return results
+
+
+def compare(results, baseline_path):
+    # Print how each case changed against an earlier results file
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    def key(entry):
+        return tuple(sorted((k, v) for k, v in entry.items()
+                            if k not in ('runs', 'mean_ms', 'median_ms', 'min_ms', 'max_ms')))
+
+    before = {key(entry): entry for entry in baseline['results']}
+    for entry in results:
+        old = before.get(key(entry))
+        if old is None:
+            continue
+        ratio = entry['median_ms'] / old['median_ms'] if old['median_ms'] else float('inf')
+        print(f"{entry['name']:18} {old['median_ms']:10.3f} -> {entry['median_ms']:10.3f} ms"
+              f"  x{ratio:.2f}  {dict(key(entry))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the miner hot paths.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=GRID_SIZES)
+    parser.add_argument('--zombies', type=int, nargs='+', default=ZOMBIE_COUNTS)
+    parser.add_argument('--only', nargs='+', metavar='NAME',
+                        help='run only these benchmarks')
+    parser.add_argument('--label', help='name of the version being measured')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='compare against an earlier results file')
+    args = parser.parse_args()
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+    report = {
+        'label': args.label,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': run(args.sizes, args.zombies, args.only),
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        compare(report['results'], args.compare)
+
+
+if __name__ == "__main__":
+    main()
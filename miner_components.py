@@ -0,0 +1,161 @@
+import numpy as np
+from miner_field import WALKABLE
+
+NEIGHBOURS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+# The 8 cells around a cell in order, each 4-adjacent to the next
+RING = ((1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1))
+
+
+# Connected regions of walkable cells, kept up to date as cells change,
+# so whether a zombie can reach the player at all is a lookup instead of
+# a search that has to explore the zombie's whole region to find out it
+# can't.
+#
+# Every walkable cell has a label and labels are merged with union-find,
+# so a cell becoming walkable (mined material, lava hardening into
+# obsidian) costs a few unions. A cell becoming blocked (placed material,
+# lava flowing in) can split its region. That is ruled out locally where
+# the cells around it still join its walkable neighbours; otherwise the
+# region is relabelled from the neighbours of the blocked cells, but
+# only once it is next queried and only that region.
+#
+# passable is the table of cell kinds that join regions, WALKABLE (for
+# zombies) by default.
+class Components:
+    def __init__(self, field, passable=WALKABLE):
+        self.field = field
+        self.passable = tuple(passable.tolist())
+        walkable = passable[field.cells]
+        height, width = walkable.shape
+
+        # Label the horizontal runs of walkable cells, then join the runs
+        # that touch vertically
+        starts = walkable.copy()
+        starts[:, 1:] &= ~walkable[:, :-1]
+        runs = np.cumsum(starts.reshape(-1)).reshape(height, width) - 1
+        count = int(starts.sum())
+        self.parent = list(range(count))
+        # Root label -> cells next to cells blocked since, one in each
+        # piece the region may have split into
+        self.pending = {}
+        below = walkable[:-1] & walkable[1:]
+        pairs = np.unique(runs[:-1][below] * count + runs[1:][below])
+        for a, b in zip((pairs // count).tolist(), (pairs % count).tolist()):
+            self.union(a, b)
+        roots = np.array([self.find(run) for run in range(count)], dtype=np.int32)
+
+        # Number the regions from 0, one label each
+        regions, compact = np.unique(roots, return_inverse=True)
+        self.labels = np.full((height, width), -1, dtype=np.int32)
+        if count:
+            self.labels[walkable] = compact.astype(np.int32)[runs[walkable]]
+        self.parent = list(range(len(regions)))
+
+    def find(self, label):
+        parent = self.parent
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[b] = a
+            if b in self.pending:
+                self.pending.setdefault(a, set()).update(self.pending.pop(b))
+        return a
+
+    def is_walkable(self, x, y):
+        return self.passable[self.field.cells.item(y, x)]
+
+    def walkable_neighbours(self, x, y):
+        field = self.field
+        return [(x + dx, y + dy) for dx, dy in NEIGHBOURS
+                if field.in_bounds(x + dx, y + dy) and self.is_walkable(x + dx, y + dy)]
+
+    def changed(self, x, y):
+        # Cell (x, y) may have become walkable or blocked
+        label = self.labels.item(y, x)
+        if self.is_walkable(x, y):
+            if label >= 0:
+                return
+            roots = {self.find(self.labels.item(ny, nx))
+                     for nx, ny in self.walkable_neighbours(x, y)}
+            if roots:
+                label = roots.pop()
+                for root in roots:
+                    label = self.union(label, root)
+            else:
+                label = len(self.parent)
+                self.parent.append(label)
+            self.labels[y, x] = label
+        elif label >= 0:
+            self.labels[y, x] = -1
+            if not self.splits(x, y):
+                return
+            root = self.find(label)
+            self.pending.setdefault(root, set()).update(self.walkable_neighbours(x, y))
+
+    def splits(self, x, y):
+        # Whether blocking (x, y) may have cut its walkable neighbours off
+        # from each other: not if they are joined through the cells
+        # around it, i.e. all lie on one unbroken walkable arc of the ring
+        field = self.field
+        around = [field.in_bounds(x + dx, y + dy) and self.is_walkable(x + dx, y + dy)
+                  for dx, dy in RING]
+        if all(around):
+            return False
+        # Walk the ring from a blocked cell, counting the arcs that hold
+        # one of the four neighbours (the even positions)
+        first = around.index(False)
+        arcs = 0
+        in_arc = touches = False
+        for k in range(first + 1, first + 9):
+            k %= 8
+            if around[k]:
+                in_arc = True
+                touches = touches or k % 2 == 0
+            elif in_arc:
+                arcs += touches
+                in_arc = touches = False
+        return arcs > 1
+
+    def settle(self):
+        # Relabel the regions that may have split
+        labels = self.labels
+        field = self.field
+        for root, seeds in self.pending.items():
+            for x, y in seeds:
+                label = labels.item(y, x)
+                if label < 0 or self.find(label) != root:
+                    continue  # Blocked since, or already relabelled
+                new = len(self.parent)
+                self.parent.append(new)
+                labels[y, x] = new
+                stack = [(x, y)]
+                while stack:
+                    cx, cy = stack.pop()
+                    for nx, ny in ((cx+1, cy), (cx-1, cy), (cx, cy+1), (cx, cy-1)):
+                        if field.in_bounds(nx, ny):
+                            label = labels.item(ny, nx)
+                            if label >= 0 and label != new and self.find(label) == root:
+                                labels[ny, nx] = new
+                                stack.append((nx, ny))
+        self.pending.clear()
+
+    def label(self, x, y):
+        # Region of cell (x, y), or -1 if it isn't walkable. Only
+        # meaningful after settle() once cells were blocked.
+        label = self.labels.item(y, x)
+        return self.find(label) if label >= 0 else -1
+
+    def around(self, x, y):
+        # Regions a zombie can reach cell (x, y) from: its own and those
+        # of its walkable neighbours, as the path searches count the goal
+        # itself as passable
+        self.settle()
+        regions = {self.label(nx, ny) for nx, ny in self.walkable_neighbours(x, y)}
+        if self.is_walkable(x, y):
+            regions.add(self.label(x, y))
+        return regions
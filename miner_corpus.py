@@ -0,0 +1,291 @@
+import argparse
+import functools
+import json
+import numpy as np
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from miner_components import Components
+from miner_engine import GRID_SIZE
+from miner_eval import neighbours
+from miner_field import Cell, Field
+from miner_levelgen import Level, generate_level
+from miner_save import PREFIX, aligned
+
+# A corpus of pregenerated levels that have been checked to be winnable,
+# so a game can play them instead of generating levels blind. Building
+# one generates many seeded levels over worker processes, checks each
+# and keeps the good ones:
+#
+#     python miner_corpus.py --levels 1 2 3 --count 10000 --output levels.corpus
+#
+# The file is laid out like a snapshot (see miner_save): magic, format
+# version and header length, a JSON header, then raw arrays, which are
+# memory-mapped on opening. Each level number has its levels' cells,
+# zombies and seeds, plus an open-addressing hash table from seed to
+# level, so Corpus.get() finds a level by seed in constant time without
+# reading the rest of the file.
+
+MAGIC = b'MINERLVL'
+VERSION = 1
+SEEDS_PER_TASK = 200   # Levels a worker generates per task
+EMPTY_SLOT = 2 ** 64 - 1  # Seed of an unused hash table slot
+
+# Cells the player can get through: everything but lava, as they mine
+# their way through material
+PASSABLE = np.ones(len(Cell), dtype=bool)
+PASSABLE[Cell.LAVA] = False
+
+
+def layout_for(level, seed, grid_size=GRID_SIZE):
+    # The layout GameState(level=level, seed=seed, grid_size=grid_size)
+    # generates for itself, drawn from its rng the same way
+    layout_seed = random.Random(seed).getrandbits(64)
+    return generate_level(level, grid_size, rng=np.random.default_rng(layout_seed))
+
+
+def check_layout(layout):
+    # Why a level can't be won, as a list of problems (empty if it can).
+    # Rather than playing it, this checks that what winning needs is in
+    # reach of the player at (0, 0): obsidian, or a green ore for a
+    # bucket plus water and lava to make obsidian with, and zombies that
+    # drop at least two blue ores.
+    cells = layout.field.cells
+    labels = Components(layout.field, PASSABLE).labels
+    reach = labels == labels[0, 0]
+    nearby = reach | neighbours(reach)
+    problems = []
+    if not (reach & (cells == Cell.OBSIDIAN)).any():
+        if not (reach & (cells == Cell.GREEN_ORE)).any():
+            problems.append('no green ore')
+        elif not ((reach & (cells == Cell.WATER)).any() and
+                  (nearby & (cells == Cell.LAVA)).any()):
+            problems.append('no water or lava')
+    blue_ore = (np.count_nonzero(reach & (cells == Cell.BLUE_ORE)) +
+                2 * np.count_nonzero(reach & (cells == Cell.DOUBLE_BLUE_ORE)))
+    positions = layout.zombie_positions
+    drops = reach[positions[:, 1], positions[:, 0]].astype(int)
+    if 0 <= layout.starred < len(drops):
+        drops[layout.starred] *= 2  # Drops a double blue ore
+    if blue_ore + drops.sum() < 2:
+        problems.append('too few blue ores')
+    return problems
+
+
+def corpus_seeds(seed, level, count):
+    # count distinct level seeds, in the range of the game's own
+    seeds = np.random.SeedSequence([seed, level]).generate_state(count).tolist()
+    return list(dict.fromkeys(seeds))
+
+
+def check_levels(task):
+    # One worker task: generate and check a batch of seeded levels.
+    # Returns the good ones as (seed, cells, zombie positions, starred),
+    # how many were rejected and the problems found with them, counted.
+    level, seeds, grid_size = task
+    good = []
+    rejected = 0
+    problems = {}
+    for seed in seeds:
+        layout = layout_for(level, seed, grid_size)
+        found = check_layout(layout)
+        for problem in found:
+            problems[problem] = problems.get(problem, 0) + 1
+        if found:
+            rejected += 1
+        else:
+            good.append((seed, layout.field.cells, layout.zombie_positions, layout.starred))
+    return level, good, rejected, problems
+
+
+def slot_of(seed, bits):
+    # Home slot of a seed in a table of 2 ** bits slots (Fibonacci hashing)
+    return ((seed * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> (64 - bits)
+
+
+def hash_table(seeds):
+    # Open-addressing table (linear probing, at most half full) mapping
+    # each seed to its index in seeds
+    bits = max(1, (2 * len(seeds) - 1).bit_length())
+    mask = (1 << bits) - 1
+    keys = [EMPTY_SLOT] * (1 << bits)
+    values = [-1] * (1 << bits)
+    for index, seed in enumerate(seeds):
+        slot = slot_of(seed, bits)
+        while keys[slot] != EMPTY_SLOT:
+            slot = (slot + 1) & mask
+        keys[slot] = seed
+        values[slot] = index
+    return np.array(keys, dtype=np.uint64), np.array(values, dtype=np.int32)
+
+
+def write_corpus(path, grid_size, levels):
+    # levels maps a level number to its good levels, as from check_levels
+    arrays = []  # (name, array) in file order
+    header_levels = {}
+    for number, good in sorted(levels.items()):
+        seeds = [seed for seed, _, _, _ in good]
+        most = max((len(positions) for _, _, positions, _ in good), default=0)
+        zombies = np.zeros((len(good), most, 2), dtype=np.int32)
+        counts = np.zeros(len(good), dtype=np.int32)
+        for index, (_, _, positions, _) in enumerate(good):
+            zombies[index, :len(positions)] = positions
+            counts[index] = len(positions)
+        keys, values = hash_table(seeds)
+        cells = np.zeros((len(good), grid_size, grid_size), dtype=np.uint8)
+        for index, (_, level_cells, _, _) in enumerate(good):
+            cells[index] = level_cells
+        header_levels[number] = {'count': len(good), 'slot_bits': int(len(keys)).bit_length() - 1}
+        arrays += [
+            ('%d.seeds' % number, np.array(seeds, dtype=np.uint64)),
+            ('%d.slot_seeds' % number, keys),
+            ('%d.slot_levels' % number, values),
+            ('%d.cells' % number, cells),
+            ('%d.zombies' % number, zombies),
+            ('%d.zombie_counts' % number, counts),
+            ('%d.starred' % number, np.array([starred for _, _, _, starred in good],
+                                              dtype=np.int32)),
+        ]
+
+    blocks = []
+    offset = 0
+    for name, array in arrays:
+        blocks.append({'name': name, 'dtype': array.dtype.str,
+                       'shape': array.shape, 'offset': offset})
+        offset = aligned(offset + array.nbytes)
+    header = json.dumps({'grid_size': grid_size, 'levels': header_levels,
+                         'blocks': blocks}).encode()
+    data_start = aligned(PREFIX.size + len(header))
+    header = header.ljust(data_start - PREFIX.size)
+    with open(path, 'wb') as f:
+        f.write(PREFIX.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for (name, array), block in zip(arrays, blocks):
+            f.seek(data_start + block['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+
+
+class Corpus:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            magic, version, header_size = PREFIX.unpack(f.read(PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError(f'{path} is not a miner level corpus')
+            if version != VERSION:
+                raise ValueError(f'{path} has unsupported corpus version {version}')
+            header = json.loads(f.read(header_size))
+        data_start = PREFIX.size + header_size
+        self.grid_size = header['grid_size']
+        self.levels = {int(number): level for number, level in header['levels'].items()}
+        self.arrays = {}
+        for block in header['blocks']:
+            shape = tuple(block['shape'])
+            if np.prod(shape):
+                array = np.memmap(path, dtype=np.dtype(block['dtype']), mode='r',
+                                  offset=data_start + block['offset'], shape=shape)
+            else:
+                array = np.zeros(shape, dtype=np.dtype(block['dtype']))
+            self.arrays[block['name']] = array
+
+    def __len__(self):
+        return sum(level['count'] for level in self.levels.values())
+
+    def count(self, level):
+        return self.levels[level]['count'] if level in self.levels else 0
+
+    def pick(self, level, rng):
+        # Seed of a random level of this number, or None if there are none
+        count = self.count(level)
+        if not count:
+            return None
+        return self.arrays['%d.seeds' % level].item(rng.randrange(count))
+
+    def index(self, level, seed):
+        # Position of a level within its number, or -1 if not in the corpus
+        if not self.count(level):
+            return -1
+        bits = self.levels[level]['slot_bits']
+        keys = self.arrays['%d.slot_seeds' % level]
+        mask = (1 << bits) - 1
+        slot = slot_of(seed, bits)
+        while True:
+            key = keys.item(slot)
+            if key == seed:
+                return self.arrays['%d.slot_levels' % level].item(slot)
+            if key == EMPTY_SLOT:
+                return -1
+            slot = (slot + 1) & mask
+
+    def get(self, level, seed):
+        # The Level of this number and seed, or None if not in the corpus.
+        # It is the same layout as generating it would give.
+        index = self.index(level, seed)
+        if index < 0:
+            return None
+        cells = np.array(self.arrays['%d.cells' % level][index])
+        count = self.arrays['%d.zombie_counts' % level].item(index)
+        positions = np.array(self.arrays['%d.zombies' % level][index, :count])
+        starred = self.arrays['%d.starred' % level].item(index)
+        return Level(level, Field(self.grid_size, cells=cells), positions, starred)
+
+
+@functools.lru_cache(maxsize=None)
+def load_corpus(path):
+    # Opened once per path, for make_state() to look levels up in
+    return Corpus(path)
+
+
+def build(levels, count, seed=0, grid_size=GRID_SIZE, workers=None):
+    # Generate count levels of every number in levels over a process
+    # pool and check them. Returns the good ones by level number, as
+    # write_corpus() takes them, and per level number how many were
+    # rejected and the problems found with them.
+    tasks = []
+    for level in levels:
+        seeds = corpus_seeds(seed, level, count)
+        tasks += [(level, seeds[start:start + SEEDS_PER_TASK], grid_size)
+                  for start in range(0, len(seeds), SEEDS_PER_TASK)]
+    good = {level: [] for level in levels}
+    rejected = {level: 0 for level in levels}
+    problems = {level: {} for level in levels}
+    with ProcessPoolExecutor(workers) as pool:
+        for level, batch, batch_rejected, found in pool.map(check_levels, tasks):
+            good[level] += batch
+            rejected[level] += batch_rejected
+            for problem, n in found.items():
+                problems[level][problem] = problems[level].get(problem, 0) + n
+    return good, rejected, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build a corpus of checked, pregenerated levels.')
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 3, 4, 5])
+    parser.add_argument('--count', type=int, default=1000,
+                        help='levels to generate per level number')
+    parser.add_argument('--grid-size', type=int, default=GRID_SIZE)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--output', default='levels.corpus')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    good, rejected, problems = build(args.levels, args.count, args.seed, args.grid_size,
+                                     args.workers)
+    write_corpus(args.output, args.grid_size, good)
+    elapsed = time.perf_counter() - start
+
+    for level in args.levels:
+        checked = len(good[level]) + rejected[level]
+        found = ', '.join(f'{problem} {n}' for problem, n in sorted(problems[level].items()))
+        print(f'level {level:2}  kept {len(good[level]):6} of {checked:6}'
+              f"{'  (' + found + ')' if found else ''}")
+    size = os.path.getsize(args.output)
+    print(f'{sum(map(len, good.values()))} levels, {size / 1024:.0f} KB, '
+          f'in {elapsed:.1f}s with {args.workers} workers', file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,843 @@
+import numpy as np
+import random
+from collections import deque  # For pathfinding
+from enum import IntEnum
+from miner_components import Components
+from miner_field import Cell, WALKABLE
+from miner_fluids import FluidFlow
+from miner_levelgen import generate_level
+from miner_planner import DStarLite
+from miner_zombies import Zombies
+
+# Constants
+GRID_SIZE = 40
+PLAYER_HEALTH = 5
+ZOMBIE_HEALTH = 5
+
+# Timings in seconds of simulated time
+ZOMBIE_TICK = 0.5        # Zombies take action every 0.5 seconds
+SHOCK_TIME = 0.5         # A hit zombie stays shocked this long
+ATTACK_COOLDOWN = 0.5    # Minimum time between two attacks of one zombie
+# Water and lava flow into neighbouring empty cells once every this many
+# zombie ticks (0 keeps them still)
+WATER_FLOW_TICKS = 2
+LAVA_FLOW_TICKS = 4
+# Whether lava flows over the player, killing them, or waits for them to
+# step out of its way. Zombies are always killed.
+LAVA_FLOW_KILLS_PLAYER = False
+
+# Zombie pathfinding mode: 'flow_field' builds one distance grid from the
+# player per tick and shares it between all zombies, 'bfs' searches from
+# every zombie separately, 'incremental' keeps a D* Lite search per zombie
+# from tick to tick and only repairs it where the player or the terrain
+# changed
+ZOMBIE_PATHFINDING = 'flow_field'
+
+# Zombie AI level of detail. A zombie only plans a path (with the mode
+# above) on the ticks it is due to: every tick while within AI_NEAR
+# steps of the player, every AI_FAR_INTERVAL ticks further away and every
+# AI_STUCK_INTERVAL ticks once it found no path (or until the terrain
+# opens up around it). All searches of a tick share a budget of
+# AI_PLAN_BUDGET node expansions, so the work of a tick stays bounded
+# however many zombies there are and however large the map is. A search
+# that runs out of it is finished on a later tick, AI_UNFINISHED_INTERVAL
+# ticks on, and the zombies whose searches didn't finish go first then,
+# round-robin. Until then zombies follow the route they planned last, or
+# step at random. The budget counts nodes rather than time, so replays
+# stay deterministic. AI_PLAN_BUDGET = None plans for every zombie on
+# every tick.
+AI_NEAR = 64
+AI_FAR_INTERVAL = 4
+AI_STUCK_INTERVAL = 8
+AI_UNFINISHED_INTERVAL = 1
+AI_PLAN_BUDGET = 5000
+
+DIRECTIONS = {
+    'up': (0, -1),
+    'down': (0, 1),
+    'left': (-1, 0),
+    'right': (1, 0),
+}
+
+
+# Player actions understood by GameState.step
+class Action(IntEnum):
+    NONE = 0
+    MOVE_UP = 1
+    MOVE_DOWN = 2
+    MOVE_LEFT = 3
+    MOVE_RIGHT = 4
+    HIT_UP = 5           # Mine material or hit a zombie
+    HIT_DOWN = 6
+    HIT_LEFT = 7
+    HIT_RIGHT = 8
+    PLACE_MATERIAL = 9   # Place a material block at the player's position
+    PLACE_GREEN_ORE = 10  # Place a green ore block in front of the player
+    CRAFT_BUCKET = 11
+    FILL_BUCKET = 12     # Pick up adjacent lava or water
+    POUR_BUCKET = 13     # Pour onto the opposite fluid to make obsidian
+
+
+MOVE_ACTIONS = {
+    Action.MOVE_UP: 'up',
+    Action.MOVE_DOWN: 'down',
+    Action.MOVE_LEFT: 'left',
+    Action.MOVE_RIGHT: 'right',
+}
+
+HIT_ACTIONS = {
+    Action.HIT_UP: 'up',
+    Action.HIT_DOWN: 'down',
+    Action.HIT_LEFT: 'left',
+    Action.HIT_RIGHT: 'right',
+}
+
+
+# Node expansions the zombie searches of one tick may still make, shared
+# by all of them (see AI_PLAN_BUDGET)
+class SearchBudget:
+    def __init__(self, nodes):
+        self.left = nodes
+
+    @property
+    def spent(self):
+        return self.left <= 0
+
+
+def find_path(start, goal, field, rng=random, budget=None):
+    # With a SearchBudget, give up (returning None) once it is spent
+    visited = set()
+    queue = deque()
+    queue.append((start, []))  # (current_position, path)
+
+    while queue:
+        current_pos, path = queue.popleft()
+        if current_pos == goal:
+            return path  # Return the path to the goal
+
+        x, y = current_pos
+        if current_pos in visited:
+            continue
+        if budget is not None:
+            if budget.left <= 0:
+                return None
+            budget.left -= 1
+        visited.add(current_pos)
+
+        # Add neighboring positions (up/down/left/right) if they are walkable.
+        # The goal (the player's position) is let in whatever it holds, so
+        # the search can end there; move_zombies keeps zombies off it.
+        neighbors = [
+            (x+1, y),
+            (x-1, y),
+            (x, y+1),
+            (x, y-1)
+        ]
+        rng.shuffle(neighbors)
+        for nx, ny in neighbors:
+            if field.in_bounds(nx, ny):
+                # Check if position is the goal or walkable
+                if (nx, ny) == goal or field.is_walkable(nx, ny):
+                    if (nx, ny) not in visited:
+                        queue.append(((nx, ny), path + [(nx, ny)]))
+    # No path found
+    return None
+
+
+# Distances from every cell to a goal, shared by all zombies in a tick.
+# Built by one BFS out from the goal; the search stops early once every
+# target cell has been labelled. With a radius, only the square window of
+# that radius around the goal is searched (for worlds too large to search
+# whole) and cells outside it count as unreachable. With a SearchBudget
+# it also stops once that is spent, so it reaches the nearest targets
+# first; complete is False then, and the cells it didn't label may still
+# be reachable.
+class FlowField:
+    def __init__(self, field, goal, targets, radius=None, budget=None):
+        gx, gy = goal
+        if radius is None:
+            x0, y0, x1, y1 = 0, 0, field.width, field.height
+        else:
+            x0, y0 = max(0, gx - radius), max(0, gy - radius)
+            x1 = min(field.width, gx + radius + 1)
+            y1 = min(field.height, gy + radius + 1)
+        self.x0, self.y0 = x0, y0
+        width, height = x1 - x0, y1 - y0
+        self.width, self.height = width, height
+
+        # Search in window coordinates
+        walkable = WALKABLE[field.region(x0, y0, x1, y1)].tolist()
+        distance = [[-1] * width for _ in range(height)]
+        goal = (gx - x0, gy - y0)
+        distance[goal[1]][goal[0]] = 0
+        remaining = {(x - x0, y - y0) for x, y in targets}
+        remaining.discard(goal)
+        queue = deque([goal])
+        left = -1 if budget is None else budget.left
+        while queue and remaining and left:
+            left -= 1
+            x, y = queue.popleft()
+            step = distance[y][x] + 1
+            for nx, ny in ((x+1, y), (x-1, y), (x, y+1), (x, y-1)):
+                if (0 <= nx < width and 0 <= ny < height and
+                        distance[ny][nx] < 0 and walkable[ny][nx]):
+                    distance[ny][nx] = step
+                    remaining.discard((nx, ny))
+                    queue.append((nx, ny))
+        if budget is not None:
+            budget.left = max(0, left)
+        self.complete = not (queue and remaining)
+        self.distance = distance
+
+    def covers(self, x, y):
+        return (0 <= x - self.x0 < self.width) and (0 <= y - self.y0 < self.height)
+
+    def distance_at(self, x, y):
+        # Steps from (x, y) to the goal, or -1 if unreachable
+        x -= self.x0
+        y -= self.y0
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.distance[y][x]
+        return -1
+
+    def next_step(self, x, y, occupied=(), rng=random):
+        # Pick one of the free neighbours that is a step closer to the goal
+        here = self.distance_at(x, y)
+        if here <= 0:
+            return None
+        steps = [(nx, ny) for nx, ny in ((x+1, y), (x-1, y), (x, y+1), (x, y-1))
+                 if self.distance_at(nx, ny) == here - 1 and (nx, ny) not in occupied]
+        return rng.choice(steps) if steps else None
+
+    def route(self, x, y, steps):
+        # Up to steps cells further down the field from (x, y), for a
+        # zombie to walk without looking at the field again
+        cells = []
+        here = self.distance_at(x, y)
+        while here > 1 and len(cells) < steps:
+            for nx, ny in ((x+1, y), (x-1, y), (x, y+1), (x, y-1)):
+                if self.distance_at(nx, ny) == here - 1:
+                    break
+            cells.append((nx, ny))
+            x, y, here = nx, ny, here - 1
+        return cells
+
+
+# Turns variable frame times into a whole number of fixed-length steps.
+# Leftover time carries over in the accumulator, so a slow frame catches
+# up with several steps instead of skipping work. max_steps caps the
+# catch-up after a long stall (the excess time is dropped), and alpha is
+# how far the clock is between the last step and the next, for
+# interpolating what's drawn.
+class FixedTimestep:
+    def __init__(self, step, max_steps=None):
+        self.step = step
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+
+    def advance(self, dt):
+        # Number of steps to run for dt more seconds
+        self.accumulator += dt
+        steps = int(self.accumulator // self.step)
+        self.accumulator -= steps * self.step
+        if self.max_steps is not None and steps > self.max_steps:
+            steps = self.max_steps
+        return steps
+
+    @property
+    def alpha(self):
+        return self.accumulator / self.step
+
+    def time_to_next_step(self):
+        return self.step - self.accumulator
+
+
+# Complete rules of one level, without any rendering or input handling.
+# The simulation only advances through step(), so it can run as fast as
+# the caller likes.
+class GameState:
+    def __init__(self, level=1, player_inventory=0, player_blue_ore_inventory=0,
+                 player_green_ore_inventory=0, player_health=PLAYER_HEALTH,
+                 total_zombies_defeated=0, grid_size=GRID_SIZE, world=None,
+                 seed=None, max_catch_up=None, field=None, layout=None):
+        self.level = level
+        # All randomness of the level, so a seed and the same sequence of
+        # step() calls always play out identically
+        self.rng = random.Random(seed)
+        self.field = None
+        # Only search this far around the player for zombie paths (None
+        # searches the whole field)
+        self.flow_radius = None
+
+        # Player attributes
+        self.player_pos = [0, 0]
+        self.player_inventory = player_inventory
+        self.player_blue_ore_inventory = player_blue_ore_inventory
+        self.player_green_ore_inventory = player_green_ore_inventory
+        self.player_health = player_health
+
+        # Player facing direction ('up', 'down', 'left', 'right')
+        self.player_facing = 'down'  # Default facing direction
+
+        # Bucket attributes
+        self.player_has_bucket = False
+        self.bucket_content = 'empty'  # Can be 'empty', 'lava', or 'water'
+
+        # A cell holds at most one living zombie
+        self.zombies = Zombies()
+        self.total_zombies_defeated = total_zombies_defeated
+
+        # Zombies act in fixed ZOMBIE_TICK steps of simulated time. time is
+        # the time of the last tick; max_catch_up limits how many ticks one
+        # step() may run (None runs them all, e.g. headless)
+        self.time = 0.0
+        self.ticks = 0
+        self.timestep = FixedTimestep(ZOMBIE_TICK, max_catch_up)
+
+        # Game over flag
+        self.game_over = False
+        self.level_complete = False
+        self.game_result = None  # To store the result ("Game Over" or "You Win!")
+
+        # Messages produced by the last step, for the front-end to show
+        self.messages = []
+
+        # Optional FrameProfiler, told when each part of a tick finishes
+        self.profiler = None
+
+        # Zombie index -> its DStarLite search, in 'incremental' mode
+        self.planners = {}
+        # Zombie index -> cells it will walk through until it plans again
+        self.routes = {}
+        # Zombie index the round-robin of AI_PLAN_BUDGET carries on from:
+        # the first whose search didn't finish
+        self.ai_cursor = 0
+        # Length of the routes planned: the ticks a zombie may wait for
+        # its next turn to plan, as of the last tick
+        self.route_steps = AI_FAR_INTERVAL
+
+        if world is not None:
+            # A ChunkedField generates itself (and its zombies) lazily
+            self.field = world
+            self.flow_radius = world.chunk_size
+            self.fluids = FluidFlow(world)
+            world.on_generate = self.chunk_generated
+            world.get(0, 0)
+        else:
+            if field is not None:
+                # Play on an existing field (e.g. from a snapshot), without zombies
+                self.field = field
+            else:
+                self.generate_level(grid_size, layout)
+            # Pools start flowing where they border empty cells
+            self.fluids = FluidFlow(self.field)
+            self.fluids.seed(self.field.cells)
+        # Walkable regions, so zombies walled off from the player skip
+        # the search. A chunked world is searched near the player only.
+        self.components = Components(self.field) if world is None else None
+
+    @property
+    def done(self):
+        return self.game_over or self.level_complete
+
+    @property
+    def now(self):
+        # Current simulated time, between ticks
+        return self.time + self.timestep.accumulator
+
+    def close(self):
+        # Release what the level keeps outside memory (the chunk cache of
+        # a chunked world) once it is over
+        close = getattr(self.field, 'close', None)
+        if close is not None:
+            close()
+
+    def generate_level(self, grid_size, layout=None):
+        # layout is this same level generated beforehand (e.g. read from a
+        # corpus). Its seed is drawn all the same, so the level plays out
+        # exactly as if it had been generated here.
+        layout_seed = self.rng.getrandbits(64)
+        if layout is None:
+            layout = generate_level(self.level, grid_size, player_pos=self.player_pos,
+                                    rng=np.random.default_rng(layout_seed))
+        self.field = layout.field
+        self.spawn_zombies(layout.zombie_positions, layout.starred)
+
+    def chunk_generated(self, x0, y0, cells, positions, starred):
+        # A chunk of a chunked world was generated for the first time
+        self.spawn_zombies(positions, starred)
+        self.fluids.seed(cells, x0, y0, edges=True)
+
+    def spawn_zombies(self, positions, starred):
+        for i, (x, y) in enumerate(positions.tolist()):
+            self.zombies.spawn(x, y, ZOMBIE_HEALTH, starred=i == starred,
+                               attack_time=-ATTACK_COOLDOWN)
+
+    def step(self, action, dt):
+        # Apply one player action (or Action.NONE / None), then advance the
+        # simulated clock by dt seconds, running every zombie tick that
+        # falls into that time
+        self.messages = []
+        if self.done:
+            return
+        if action:
+            self.apply_action(action)
+        for _ in range(self.timestep.advance(dt)):
+            if self.done:
+                break
+            self.tick()
+
+    def tick(self):
+        # One fixed step of the simulation: zombies move, then attack
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.mark('step')
+        self.time += ZOMBIE_TICK
+        self.zombies.begin_tick()
+        self.move_zombies()
+        if profiler is not None:
+            profiler.mark('move_zombies')
+        self.zombie_attack()
+        if profiler is not None:
+            profiler.mark('zombie_attack')
+        self.ticks += 1
+        self.flow_fluids()
+        if profiler is not None:
+            profiler.mark('fluids')
+
+    def apply_action(self, action):
+        if action in MOVE_ACTIONS:
+            dx, dy = DIRECTIONS[MOVE_ACTIONS[action]]
+            self.move_player(dx, dy)
+        elif action in HIT_ACTIONS:
+            self.action_on_direction(HIT_ACTIONS[action])
+        elif action == Action.PLACE_MATERIAL:
+            self.place_material()
+        elif action == Action.PLACE_GREEN_ORE:
+            self.place_green_ore_in_front()
+        elif action == Action.CRAFT_BUCKET:
+            self.craft_bucket()
+        elif action == Action.FILL_BUCKET:
+            self.fill_bucket()
+        elif action == Action.POUR_BUCKET:
+            self.pour_bucket()
+
+    # Function to check if player steps on obsidian with 2 blue ores (win condition)
+    def check_victory(self):
+        x, y = self.player_pos
+        return self.field.get(x, y) == Cell.OBSIDIAN and self.player_blue_ore_inventory >= 2
+
+    def move_player(self, dx, dy):
+        field = self.field
+        player_pos = self.player_pos
+        new_x = player_pos[0] + dx
+        new_y = player_pos[1] + dy
+        if field.in_bounds(new_x, new_y):
+            target_cell = field.get(new_x, new_y)
+            # Update facing direction
+            if dx == -1:
+                self.player_facing = 'left'
+            elif dx == 1:
+                self.player_facing = 'right'
+            elif dy == -1:
+                self.player_facing = 'up'
+            elif dy == 1:
+                self.player_facing = 'down'
+
+            # Check for zombies at the new position
+            if (new_x, new_y) in self.zombies.cells:
+                return  # Can't move into a zombie
+            elif target_cell == Cell.MATERIAL:
+                return  # Can't move into a material
+            elif target_cell == Cell.LAVA:
+                self.player_health = 0  # Player dies immediately
+                player_pos[0] = new_x
+                player_pos[1] = new_y
+                self.game_over = True
+                self.game_result = "Game Over! You stepped into lava."
+            elif target_cell == Cell.OBSIDIAN:
+                player_pos[0] = new_x
+                player_pos[1] = new_y
+                # Check victory condition
+                if self.player_blue_ore_inventory >= 2:
+                    self.level_complete = True
+                    self.game_result = "Level Complete!"
+            elif target_cell == Cell.WATER:
+                player_pos[0] = new_x
+                player_pos[1] = new_y
+                # The player can move into water
+            else:
+                player_pos[0] = new_x
+                player_pos[1] = new_y
+                # Collect blue ore if present
+                if target_cell == Cell.BLUE_ORE:
+                    self.player_blue_ore_inventory += 1
+                    field.set(new_x, new_y, Cell.EMPTY)
+                    self.fluids.touch(new_x, new_y)
+                elif target_cell == Cell.DOUBLE_BLUE_ORE:
+                    self.player_blue_ore_inventory += 2
+                    field.set(new_x, new_y, Cell.EMPTY)
+                    self.fluids.touch(new_x, new_y)
+                # Collect green ore if present
+                if target_cell == Cell.GREEN_ORE:
+                    self.player_green_ore_inventory += 1
+                    field.set(new_x, new_y, Cell.EMPTY)
+                    self.fluids.touch(new_x, new_y)
+
+    def move_zombies(self):
+        field = self.field
+        zombies = self.zombies
+        player_pos = self.player_pos
+        goal = (player_pos[0], player_pos[1])
+        movers = self.round_robin(zombies.active())
+        thinkers = self.due_zombies(movers)
+        if self.planners or self.routes:
+            # Forget the searches and routes of zombies that died
+            for plans in (self.planners, self.routes):
+                for i in [i for i in plans if zombies.health[i] <= 0]:
+                    del plans[i]
+        thinking = set(thinkers.tolist())
+        walled_off = set()
+        if self.components is not None and thinking:
+            regions = self.components.around(*goal)
+            label = self.components.label
+            walled_off = {i for i in thinking if label(*zombies.position(i)) not in regions}
+        searchers = [i for i in thinkers.tolist() if i not in walled_off]
+        budget = None if AI_PLAN_BUDGET is None else SearchBudget(AI_PLAN_BUDGET)
+        if ZOMBIE_PATHFINDING == 'flow_field' and searchers:
+            flow = FlowField(field, goal,
+                             zip(zombies.x[searchers].tolist(), zombies.y[searchers].tolist()),
+                             self.flow_radius, budget)
+        unfinished = []  # Zombies whose search ran out of budget
+
+        for i in movers.tolist():
+            if zombies.health[i] <= 0:
+                continue  # Died earlier in this tick
+
+            x, y = zombies.position(i)
+            thinks = i in thinking
+            finished = True
+            if not thinks:
+                path = None  # Walks its route, below
+            elif i in walled_off:
+                path = None  # No search can reach the player
+            elif ZOMBIE_PATHFINDING == 'flow_field':
+                if self.flow_radius is not None and not flow.covers(x, y):
+                    # Zombies far from the player stay put, so they don't
+                    # wander into (and generate) new parts of a large world
+                    self.rest(i, AI_FAR_INTERVAL)
+                    continue
+                here = flow.distance_at(x, y)
+                if here > 0:
+                    # Step closer, or wait in place while other zombies
+                    # block every closer cell
+                    next_pos = flow.next_step(x, y, zombies.cells, self.rng)
+                    path = [next_pos or (x, y)]
+                    if next_pos and AI_PLAN_BUDGET is not None:
+                        # Steps to take while not planning
+                        path += flow.route(*next_pos, self.route_steps - 1)
+                else:
+                    finished = here == 0 or flow.complete
+                    path = None
+            elif ZOMBIE_PATHFINDING == 'incremental':
+                if (self.flow_radius is not None and
+                        max(abs(x - goal[0]), abs(y - goal[1])) > self.flow_radius):
+                    self.rest(i, AI_FAR_INTERVAL)
+                    continue  # Out of range, as with the flow field
+                finished, path = self.plan_step(i, x, y, goal, budget)
+                if path and path[0] != (x, y) and AI_PLAN_BUDGET is not None:
+                    path += self.planners[i].route(path[0], self.route_steps - 1)
+            else:
+                # A search that had the whole budget to itself and still ran
+                # out would never finish, as it starts over every time: it
+                # found no path, as far as this zombie can tell
+                whole = budget is None or budget.left == AI_PLAN_BUDGET
+                path = find_path((x, y), goal, field, self.rng, budget)
+                finished = path is not None or whole or not budget.spent
+            if not finished:
+                # Walk the old route meanwhile and finish the search on a
+                # later tick
+                thinks = False
+                unfinished.append(i)
+                self.rest(i, AI_UNFINISHED_INTERVAL)
+            if thinks:
+                self.rest(i, self.ai_interval(i, x, y, path))
+            else:
+                path = self.routes.get(i)
+                if path and not field.is_walkable(*path[0]):
+                    path = None  # The terrain changed under the route
+            if path and len(path) > 0:
+                next_pos = path[0]
+                # Ensure zombie doesn't move onto player or another zombie
+                if next_pos != goal and next_pos not in zombies.cells:
+                    self.move_zombie(i, *next_pos)
+                    path = path[1:]
+                else:
+                    # Zombie is adjacent to player, may attack
+                    pass
+                if AI_PLAN_BUDGET is not None:
+                    self.routes[i] = path
+            elif not thinks and self.flow_radius is not None:
+                # Without a route, zombies that didn't plan stay put in a
+                # large world rather than wander into new parts of it
+                self.routes.pop(i, None)
+            else:
+                # No path found, move randomly
+                self.routes.pop(i, None)
+                directions = list(DIRECTIONS.values())
+                self.rng.shuffle(directions)
+                for dx, dy in directions:
+                    nx = x + dx
+                    ny = y + dy
+                    if field.in_bounds(nx, ny):
+                        if (field.is_walkable(nx, ny) and [nx, ny] != player_pos and
+                                (nx, ny) not in zombies.cells):
+                            self.move_zombie(i, nx, ny)
+                            break  # Move made
+                # If no move made, zombie stays in place
+
+        if unfinished:
+            # The zombies left waiting plan first next time, and routes
+            # cover the ticks until every zombie due gets its turn
+            if ZOMBIE_PATHFINDING != 'flow_field':
+                self.ai_cursor = unfinished[0]
+            served = len(thinkers) - len(unfinished)
+            self.route_steps = max(AI_FAR_INTERVAL, -(-len(thinkers) // max(1, served)))
+        else:
+            self.route_steps = AI_FAR_INTERVAL
+
+    def round_robin(self, movers):
+        # movers (sorted by index) starting from the round-robin cursor
+        if AI_PLAN_BUDGET is None or not self.ai_cursor:
+            return movers
+        return np.roll(movers, -int(np.searchsorted(movers, self.ai_cursor)))
+
+    def due_zombies(self, movers):
+        # The zombies of movers that plan a path this tick
+        if AI_PLAN_BUDGET is None:
+            return movers
+        return movers[self.zombies.think_tick[movers] <= self.ticks]
+
+    def rest(self, i, ticks):
+        # Zombie i plans again in this many ticks
+        if AI_PLAN_BUDGET is not None:
+            self.zombies.think_tick[i] = self.ticks + ticks
+
+    def ai_interval(self, i, x, y, path):
+        # Ticks until zombie i, at (x, y) and having planned path, plans again
+        if not path:
+            interval = AI_STUCK_INTERVAL
+        elif abs(x - self.player_pos[0]) + abs(y - self.player_pos[1]) > AI_NEAR:
+            interval = AI_FAR_INTERVAL
+        else:
+            return 1
+        if ZOMBIE_PATHFINDING != 'flow_field':
+            # Each zombie searches on its own, so spread them over the
+            # ticks by index. With the flow field they share one search
+            # and are better off planning on the same ticks.
+            interval -= (self.ticks + i) % interval
+        return interval
+
+    def plan_step(self, i, x, y, goal, budget=None):
+        # (finished, path) for zombie i from its incremental search: path
+        # is one step, or None if it can't reach the goal. finished is
+        # False if the search ran out of budget before it could tell.
+        planner = self.planners.get(i)
+        if planner is None:
+            planner = self.planners[i] = DStarLite(self.field, (x, y), goal)
+        else:
+            planner.move_start((x, y))
+            if planner.goal != goal:
+                planner.move_goal(goal)
+        # In a large world a search may take several ticks to finish,
+        # rather than spreading over (and generating) the whole world at once
+        limit = window = None
+        if self.flow_radius is not None:
+            limit = window = (2 * self.flow_radius + 1) ** 2
+        if budget is not None:
+            limit = budget.left if limit is None else min(limit, budget.left)
+        expansions = planner.expansions
+        finished = planner.compute(limit)
+        if budget is not None:
+            budget.left -= planner.expansions - expansions
+        if not finished:
+            if window is not None and len(planner.rhs) > 2 * window:
+                # Spread well beyond the window the flow field searches
+                # without reaching the zombie: no path, as there, and
+                # start afresh next time
+                del self.planners[i]
+                return True, None
+            return False, None
+        if planner.distance() <= 0:
+            return True, None
+        next_pos = planner.next_step(self.zombies.cells, self.rng)
+        return True, [next_pos or (x, y)]
+
+    def terrain_changed(self, x, y):
+        # Cell (x, y) may have become walkable or blocked
+        if self.components is not None:
+            self.components.changed(x, y)
+        for planner in self.planners.values():
+            planner.changed(x, y)
+        if AI_PLAN_BUDGET is not None and self.field.is_walkable(x, y):
+            self.wake_zombies(x, y)
+
+    def wake_zombies(self, x, y):
+        # Cell (x, y) became walkable, which may open a way to the player
+        # for zombies that found none: the resting zombies of its region
+        # (near it in a chunked world) plan again on the next tick
+        zombies = self.zombies
+        n = zombies.count
+        resting = np.flatnonzero((zombies.think_tick[:n] > self.ticks) & zombies.alive())
+        if not len(resting):
+            return
+        xs, ys = zombies.x[resting], zombies.y[resting]
+        components = self.components
+        if components is not None:
+            region = components.label(x, y)
+            labels = components.labels[ys, xs]
+            found = np.unique(labels[labels >= 0]).tolist()
+            woken = np.isin(labels, [label for label in found
+                                     if components.find(label) == region])
+        else:
+            radius = self.flow_radius
+            woken = (np.abs(xs - x) <= radius) & (np.abs(ys - y) <= radius)
+        zombies.think_tick[resting[woken]] = self.ticks
+
+    def move_zombie(self, i, x, y):
+        self.zombies.move(i, x, y)
+        # Check if zombie steps into lava
+        cell = self.field.get(x, y)
+        if cell == Cell.LAVA:
+            self.zombies.kill(i)  # Zombie dies
+        # Check if zombie steps onto green ore
+        elif cell == Cell.GREEN_ORE:
+            self.field.set(x, y, Cell.BLUE_ORE)
+
+    def mine_material_at(self, x, y):
+        if self.field.is_minable(x, y):
+            self.field.set(x, y, Cell.EMPTY)
+            self.fluids.touch(x, y)  # Neighbouring water or lava may flow in
+            self.terrain_changed(x, y)
+            self.player_inventory += 1
+
+    def flow_fluids(self):
+        for kind, every in ((Cell.WATER, WATER_FLOW_TICKS), (Cell.LAVA, LAVA_FLOW_TICKS)):
+            if not every or self.ticks % every:
+                continue
+            blocked = ()
+            if kind == Cell.LAVA and not LAVA_FLOW_KILLS_PLAYER:
+                blocked = {tuple(self.player_pos)}
+            for x, y in self.fluids.spread(kind, blocked):
+                cell = self.field.get(x, y)
+                if cell == Cell.WATER:
+                    continue  # Flowed into an empty cell, which stays walkable
+                self.terrain_changed(x, y)
+                if cell != Cell.LAVA:
+                    continue
+                # Lava flowing over the player or a zombie kills it
+                zombie = self.zombies.at(x, y)
+                if zombie >= 0:
+                    self.zombies.kill(zombie)
+                if [x, y] == self.player_pos and not self.done:
+                    self.player_health = 0
+                    self.game_over = True
+                    self.game_result = "Game Over! You were caught by lava."
+
+    def action_on_direction(self, direction):
+        if direction not in DIRECTIONS:
+            return
+        dx, dy = DIRECTIONS[direction]
+
+        target_x = self.player_pos[0] + dx
+        target_y = self.player_pos[1] + dy
+        if self.field.in_bounds(target_x, target_y):
+            # First, check for zombie at target location
+            zombie = self.zombies.at(target_x, target_y)
+            if zombie >= 0:
+                # Hit the zombie
+                self.hit_zombie(zombie)
+                return
+            # If no zombie, try to mine material
+            if self.field.is_minable(target_x, target_y):
+                self.mine_material_at(target_x, target_y)
+
+    def place_material(self):
+        x, y = self.player_pos
+        if self.player_inventory > 0 and self.field.get(x, y) == Cell.EMPTY:
+            self.field.set(x, y, Cell.MATERIAL)
+            self.terrain_changed(x, y)
+            self.player_inventory -= 1
+
+    def place_green_ore_in_front(self):
+        if self.player_green_ore_inventory > 0:
+            # Determine the position in front of the player based on facing direction
+            dx, dy = DIRECTIONS[self.player_facing]
+            target_x = self.player_pos[0] + dx
+            target_y = self.player_pos[1] + dy
+
+            if self.field.in_bounds(target_x, target_y):
+                if self.field.get(target_x, target_y) == Cell.EMPTY:
+                    self.field.set(target_x, target_y, Cell.GREEN_ORE)
+                    self.player_green_ore_inventory -= 1
+
+    def hit_zombie(self, i):
+        x, y = self.zombies.position(i)
+        if self.zombies.damage(i, self.now):
+            # Zombie drops blue ore at its position
+            if self.zombies.starred[i]:
+                self.field.set(x, y, Cell.DOUBLE_BLUE_ORE)
+            else:
+                self.field.set(x, y, Cell.BLUE_ORE)
+            self.total_zombies_defeated += 1
+
+    def zombie_attack(self):
+        current_time = self.time
+        px, py = self.player_pos
+        # Every zombie next to the player that isn't shocked or cooling down
+        # attacks once
+        attackers = self.zombies.attackers(px, py, current_time, ATTACK_COOLDOWN)
+        if len(attackers):
+            self.zombies.attack_time[attackers] = current_time
+            self.player_health -= len(attackers)
+            if self.player_health <= 0:
+                self.game_over = True
+                self.game_result = "Game Over! You were killed by a zombie."
+
+        # Update zombies' shocked status
+        self.zombies.expire_shocks(current_time, SHOCK_TIME)
+
+    def craft_bucket(self):
+        if not self.player_has_bucket and self.player_green_ore_inventory >= 1:
+            self.player_green_ore_inventory -= 1
+            self.player_has_bucket = True
+            self.messages.append("You crafted a bucket.")
+
+    def adjacent_positions(self):
+        x, y = self.player_pos
+        return [(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)]
+
+    def fill_bucket(self):
+        if self.player_has_bucket and self.bucket_content == 'empty':
+            # Check adjacent squares
+            for x, y in self.adjacent_positions():
+                if self.field.in_bounds(x, y):
+                    cell = self.field.get(x, y)
+                    if cell == Cell.LAVA or cell == Cell.WATER:
+                        self.bucket_content = 'lava' if cell == Cell.LAVA else 'water'
+                        self.messages.append(
+                            f"You picked up {self.bucket_content} in the bucket.")
+                        break  # Only pick up from one cell
+
+    def pour_bucket(self):
+        if self.player_has_bucket and self.bucket_content != 'empty':
+            # Check adjacent squares for the opposite of what's in the bucket
+            opposite = Cell.WATER if self.bucket_content == 'lava' else Cell.LAVA
+            for x, y in self.adjacent_positions():
+                if self.field.in_bounds(x, y):
+                    if self.field.get(x, y) == opposite:
+                        self.field.set(x, y, Cell.OBSIDIAN)
+                        self.terrain_changed(x, y)
+                        self.bucket_content = 'empty'
+                        self.messages.append("You created obsidian!")
+                        break
@@ -0,0 +1,265 @@
+import argparse
+import heapq
+import itertools
+import json
+import numpy as np
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from miner_engine import (Action, DIRECTIONS, GRID_SIZE, HIT_ACTIONS, MOVE_ACTIONS,
+                          GameState)
+from miner_field import Cell
+from miner_levelgen import LAVA_POOL_CELLS, WATER_POOL_CELLS, generate_level
+
+# Monte Carlo evaluation of level settings: many seeded levels are played
+# headlessly by a scripted bot, spread over worker processes, and the
+# outcomes are summarised per setting (level, water pool and lava pool
+# size) in one report.
+
+ACTION_TIME = 0.25   # Simulated seconds between two bot actions
+TIME_LIMIT = 300.0   # Simulated seconds before a game counts as a timeout
+GAMES_PER_TASK = 10  # Games a worker plays per task
+
+MOVE_ACTION = {direction: action for action, direction in MOVE_ACTIONS.items()}
+HIT_ACTION = {direction: action for action, direction in HIT_ACTIONS.items()}
+
+
+# A simple policy that plays a level the intended way: hit any zombie
+# next to it, collect blue ore, get a green ore and craft a bucket, fill
+# it with water (or lava), pour it onto the other fluid to make obsidian,
+# hunt zombies until it has two blue ores and then step onto the
+# obsidian. It walks along the cheapest route, mining through material.
+# It sees the whole grid, or in a chunked world the cells within the
+# zombies' search radius of the player.
+class ScriptedBot:
+    def act(self, state):
+        field = state.field
+        px, py = state.player_pos
+        radius = state.flow_radius
+        if radius is None:
+            x0, y0, x1, y1 = 0, 0, field.width, field.height
+        else:
+            x0, y0 = max(0, px - radius), max(0, py - radius)
+            x1 = min(field.width, px + radius + 1)
+            y1 = min(field.height, py + radius + 1)
+        # Masks and routes are in view coordinates, relative to (x0, y0)
+        self.origin = (x0, y0)
+        self.cells = cells = field.region(x0, y0, x1, y1)
+        zombies = state.zombies
+
+        for direction, (dx, dy) in DIRECTIONS.items():
+            if (px + dx, py + dy) in zombies.cells:
+                return HIT_ACTION[direction]
+
+        blue_ore = state.player_blue_ore_inventory
+        if blue_ore < 2:
+            action = self.go_to(state, (cells == Cell.BLUE_ORE) |
+                                (cells == Cell.DOUBLE_BLUE_ORE))
+            if action is not None:
+                return action
+
+        if not state.player_has_bucket:
+            if state.player_green_ore_inventory:
+                return Action.CRAFT_BUCKET
+            action = self.go_to(state, cells == Cell.GREEN_ORE)
+            if action is not None:
+                return action
+        elif not (cells == Cell.OBSIDIAN).any():
+            if state.bucket_content == 'empty':
+                fluid = (cells == Cell.WATER) | (cells == Cell.LAVA)
+                if self.next_to(state, fluid):
+                    return Action.FILL_BUCKET
+                action = self.go_to(state, neighbours(fluid))
+            else:
+                opposite = cells == (Cell.LAVA if state.bucket_content == 'water'
+                                     else Cell.WATER)
+                if self.next_to(state, opposite):
+                    return Action.POUR_BUCKET
+                action = self.go_to(state, neighbours(opposite))
+            if action is not None:
+                return action
+
+        if blue_ore < 2:
+            # Hunt: walk up to the nearest zombie in view
+            mask = np.zeros(cells.shape, dtype=bool)
+            living = zombies.living()
+            xs, ys = zombies.x[living] - x0, zombies.y[living] - y0
+            seen = (xs >= 0) & (xs < x1 - x0) & (ys >= 0) & (ys < y1 - y0)
+            mask[ys[seen], xs[seen]] = True
+            action = self.go_to(state, neighbours(mask))
+        else:
+            action = self.go_to(state, cells == Cell.OBSIDIAN)
+        return Action.NONE if action is None else action
+
+    def next_to(self, state, mask):
+        px, py = state.player_pos
+        px -= self.origin[0]
+        py -= self.origin[1]
+        height, width = mask.shape
+        return any(0 <= px + dx < width and 0 <= py + dy < height and mask[py + dy, px + dx]
+                   for dx, dy in DIRECTIONS.values())
+
+    def go_to(self, state, targets):
+        # First action on the cheapest route to any target cell: Dijkstra
+        # where material costs two actions (mine, then move), lava and
+        # zombies block the way. None if no target can be reached.
+        if not targets.any():
+            return None
+        cells = self.cells.tolist()
+        targets = targets.tolist()
+        height, width = len(cells), len(cells[0])
+        x0, y0 = self.origin
+        occupied = {(x - x0, y - y0) for x, y in state.zombies.cells}
+        start = (state.player_pos[0] - x0, state.player_pos[1] - y0)
+        first = {start: None}  # Cell -> direction of the first step to it
+        cost = {start: 0}
+        heap = [(0, start)]
+        while heap:
+            here, (x, y) = heapq.heappop(heap)
+            if here > cost[(x, y)]:
+                continue
+            if targets[y][x]:
+                direction = first[(x, y)]
+                if direction is None:
+                    return None  # Already there
+                dx, dy = DIRECTIONS[direction]
+                sx, sy = start[0] + dx, start[1] + dy
+                if cells[sy][sx] == Cell.MATERIAL:
+                    return HIT_ACTION[direction]
+                return MOVE_ACTION[direction]
+            for direction, (dx, dy) in DIRECTIONS.items():
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < width and 0 <= ny < height):
+                    continue
+                cell = cells[ny][nx]
+                if cell == Cell.LAVA or (nx, ny) in occupied:
+                    continue
+                step = here + (2 if cell == Cell.MATERIAL else 1)
+                if step < cost.get((nx, ny), step + 1):
+                    cost[(nx, ny)] = step
+                    first[(nx, ny)] = direction if first[(x, y)] is None else first[(x, y)]
+                    heapq.heappush(heap, (step, (nx, ny)))
+        return None
+
+
+def neighbours(mask):
+    # Cells next to (but not in) the mask, in the four directions
+    grown = np.zeros_like(mask)
+    grown[1:, :] |= mask[:-1, :]
+    grown[:-1, :] |= mask[1:, :]
+    grown[:, 1:] |= mask[:, :-1]
+    grown[:, :-1] |= mask[:, 1:]
+    return grown & ~mask
+
+
+def game_seed(seed, setting, game):
+    return int(np.random.SeedSequence(
+        [seed, setting['level'], setting['water_cells'], setting['lava_cells'], game]
+    ).generate_state(1)[0])
+
+
+def play_game(setting, seed, grid_size=GRID_SIZE):
+    # Play one seeded level with the bot and return what happened
+    layout = generate_level(setting['level'], grid_size, rng=np.random.default_rng(seed),
+                            water_cells=setting['water_cells'],
+                            lava_cells=setting['lava_cells'])
+    state = GameState(level=setting['level'], seed=seed, field=layout.field)
+    state.spawn_zombies(layout.zombie_positions, layout.starred)
+    bot = ScriptedBot()
+    obsidian_time = None
+    while not state.done and state.now < TIME_LIMIT:
+        state.step(bot.act(state), ACTION_TIME)
+        if obsidian_time is None and any(m == "You created obsidian!"
+                                         for m in state.messages):
+            obsidian_time = state.now
+    return {
+        'won': state.level_complete,
+        'died': state.game_over,
+        'time': state.now,
+        'obsidian_time': obsidian_time,
+        'kills': state.total_zombies_defeated,
+    }
+
+
+def play_games(task):
+    # One worker task: a batch of games of one setting
+    setting, seed, games, grid_size = task
+    return setting, [play_game(setting, game_seed(seed, setting, game), grid_size)
+                     for game in games]
+
+
+def summarize(setting, results):
+    def mean(values):
+        return sum(values) / len(values) if values else None
+
+    wins = [r for r in results if r['won']]
+    obsidian_times = [r['obsidian_time'] for r in results if r['obsidian_time'] is not None]
+    return {
+        **setting,
+        'games': len(results),
+        'win_rate': len(wins) / len(results),
+        'death_rate': sum(r['died'] for r in results) / len(results),
+        'timeout_rate': sum(not r['won'] and not r['died'] for r in results) / len(results),
+        'obsidian_rate': len(obsidian_times) / len(results),
+        'mean_time_to_obsidian': mean(obsidian_times),
+        'median_time_to_obsidian': (float(np.median(obsidian_times))
+                                    if obsidian_times else None),
+        'mean_time_to_win': mean([r['time'] for r in wins]),
+        'mean_kills': mean([r['kills'] for r in results]),
+    }
+
+
+def evaluate(settings, games, seed=0, grid_size=GRID_SIZE, workers=None):
+    # Play games levels of every setting over a process pool; returns one
+    # summary per setting, in the order given
+    tasks = [(setting, seed, range(start, min(start + GAMES_PER_TASK, games)), grid_size)
+             for setting in settings
+             for start in range(0, games, GAMES_PER_TASK)]
+    results = {}
+    with ProcessPoolExecutor(workers) as pool:
+        for setting, batch in pool.map(play_games, tasks):
+            results.setdefault(json.dumps(setting, sort_keys=True), []).extend(batch)
+    return [summarize(setting, results[json.dumps(setting, sort_keys=True)])
+            for setting in settings]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Evaluate level settings by letting a bot play many seeded levels.')
+    parser.add_argument('--games', type=int, default=100, help='games per setting')
+    parser.add_argument('--levels', type=int, nargs='+', default=[1])
+    parser.add_argument('--water', type=int, nargs='+', default=[WATER_POOL_CELLS],
+                        help='water pool sizes to try')
+    parser.add_argument('--lava', type=int, nargs='+', default=[LAVA_POOL_CELLS],
+                        help='lava pool sizes to try')
+    parser.add_argument('--grid-size', type=int, default=GRID_SIZE)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--output', help='write the report as JSON to this file')
+    args = parser.parse_args()
+
+    settings = [{'level': level, 'water_cells': water, 'lava_cells': lava}
+                for level, water, lava in itertools.product(args.levels, args.water, args.lava)]
+    start = time.perf_counter()
+    summaries = evaluate(settings, args.games, args.seed, args.grid_size, args.workers)
+    elapsed = time.perf_counter() - start
+
+    for s in summaries:
+        obsidian = s['mean_time_to_obsidian']
+        print(f"level {s['level']:2}  water {s['water_cells']:4}  lava {s['lava_cells']:4}  "
+              f"win {s['win_rate']:6.1%}  died {s['death_rate']:6.1%}  "
+              f"obsidian {s['obsidian_rate']:6.1%} after "
+              f"{'-' if obsidian is None else f'{obsidian:.1f}s':>7}  "
+              f"kills {s['mean_kills']:.2f}")
+    total = len(settings) * args.games
+    print(f'{total} games in {elapsed:.1f}s with {args.workers} workers', file=sys.stderr)
+    if args.output:
+        report = {'games': args.games, 'seed': args.seed, 'grid_size': args.grid_size,
+                  'workers': args.workers, 'elapsed': elapsed, 'settings': summaries}
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
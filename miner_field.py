@@ -0,0 +1,93 @@
+import numpy as np
+from enum import IntEnum
+
+
+# Kinds of cell stored in the field, one byte per cell
+class Cell(IntEnum):
+    EMPTY = 0
+    MATERIAL = 1
+    BLUE_ORE = 2
+    DOUBLE_BLUE_ORE = 3
+    GREEN_ORE = 4
+    WATER = 5
+    LAVA = 6
+    OBSIDIAN = 7
+
+
+# Lookup tables indexed by cell kind, so whole-grid queries are a single
+# fancy-indexing operation (e.g. WALKABLE[field.cells])
+
+# Cells zombies can walk on
+WALKABLE = np.zeros(len(Cell), dtype=bool)
+WALKABLE[[Cell.EMPTY, Cell.BLUE_ORE, Cell.DOUBLE_BLUE_ORE,
+          Cell.OBSIDIAN, Cell.WATER, Cell.GREEN_ORE]] = True
+
+# Cells the player can mine
+MINABLE = np.zeros(len(Cell), dtype=bool)
+MINABLE[Cell.MATERIAL] = True
+
+# Fill colour of each cell kind
+CELL_COLORS = np.zeros((len(Cell), 3), dtype=np.uint8)
+CELL_COLORS[Cell.EMPTY] = (255, 255, 255)           # White
+CELL_COLORS[Cell.MATERIAL] = (156, 93, 82)          # Brown
+CELL_COLORS[Cell.BLUE_ORE] = (0, 0, 255)            # Blue
+CELL_COLORS[Cell.DOUBLE_BLUE_ORE] = (0, 0, 255)     # Blue, drawn with a '2'
+CELL_COLORS[Cell.GREEN_ORE] = (0, 128, 0)           # Dark green
+CELL_COLORS[Cell.WATER] = (0, 255, 255)             # Aqua
+CELL_COLORS[Cell.LAVA] = (255, 165, 0)              # Orange
+CELL_COLORS[Cell.OBSIDIAN] = (160, 32, 240)         # Purple
+
+# Plain Python copies for single-cell checks, where indexing a tuple is
+# much cheaper than indexing a NumPy array
+IS_WALKABLE = tuple(WALKABLE.tolist())
+IS_MINABLE = tuple(MINABLE.tolist())
+
+
+class Field:
+    def __init__(self, width, height=None, fill=Cell.EMPTY, cells=None):
+        self.width = width
+        self.height = width if height is None else height
+        # Row-major like the old list of lists: cells[y, x]. An existing
+        # uint8 array (e.g. memory-mapped from a snapshot) can be passed
+        # as cells instead of filling a new one.
+        if cells is None:
+            cells = np.full((self.height, self.width), fill, dtype=np.uint8)
+        self.cells = cells
+        # Cells changed through set() since the last take_dirty(), so a
+        # renderer can repaint only what changed
+        self.dirty = set()
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def get(self, x, y):
+        return self.cells.item(y, x)
+
+    def is_generated(self, x, y):
+        # Whole fields are generated up front, unlike a ChunkedField
+        return True
+
+    def set(self, x, y, cell):
+        self.cells[y, x] = cell
+        self.dirty.add((x, y))
+
+    def take_dirty(self):
+        dirty = self.dirty
+        self.dirty = set()
+        return dirty
+
+    def is_walkable(self, x, y):
+        return IS_WALKABLE[self.cells.item(y, x)]
+
+    def is_minable(self, x, y):
+        return IS_MINABLE[self.cells.item(y, x)]
+
+    def region(self, x0, y0, x1, y1):
+        # Cells in [x0, x1) x [y0, y1) as a (rows, cols) array
+        return self.cells[y0:y1, x0:x1]
+
+    def walkable_mask(self):
+        return WALKABLE[self.cells]
+
+    def count(self, cell):
+        return int(np.count_nonzero(self.cells == cell))
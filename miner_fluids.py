@@ -0,0 +1,97 @@
+import numpy as np
+from miner_field import Cell
+
+NEIGHBOURS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+OPPOSITE = {Cell.WATER: Cell.LAVA, Cell.LAVA: Cell.WATER}
+
+
+# Water and lava flowing into empty cells over time. Rather than scanning
+# the grid, it keeps the frontier of each fluid: the fluid cells that may
+# be able to flow. A cell joins it when it becomes fluid, or when a
+# neighbouring cell changes (touch(), e.g. after mining frees a cell next
+# to a pool), and leaves it once it has flowed, so the cost of a step
+# follows the moving edge of the fluid rather than the size of the map.
+# Pools at rest cost nothing. A new level (or chunk of a chunked world)
+# starts its frontier with seed().
+class FluidFlow:
+    def __init__(self, field):
+        self.field = field
+        self.frontier = {Cell.WATER: set(), Cell.LAVA: set()}
+
+    def seed(self, cells, x0=0, y0=0, edges=False):
+        # Add the fluid cells of a block of cells, placed at (x0, y0), that
+        # can flow: those next to an empty cell or the other fluid. With
+        # edges, the fluid cells on the border of the block are added too,
+        # as their neighbours outside it are unknown here.
+        field = self.field
+        for kind, opposite in OPPOSITE.items():
+            fluid = cells == kind
+            target = (cells == Cell.EMPTY) | (cells == opposite)
+            flows = np.zeros_like(fluid)
+            flows[1:] |= target[:-1]
+            flows[:-1] |= target[1:]
+            flows[:, 1:] |= target[:, :-1]
+            flows[:, :-1] |= target[:, 1:]
+            if edges:
+                flows[[0, -1]] = True
+                flows[:, [0, -1]] = True
+            ys, xs = np.nonzero(fluid & flows)
+            self.frontier[kind].update(
+                (x, y) for x, y in zip((xs + x0).tolist(), (ys + y0).tolist())
+                if field.in_bounds(x, y))
+
+    def touch(self, x, y):
+        # Cell (x, y) changed: it and its fluid neighbours may flow again
+        field = self.field
+        for dx, dy in ((0, 0),) + NEIGHBOURS:
+            nx, ny = x + dx, y + dy
+            if field.in_bounds(nx, ny):
+                cell = field.get(nx, ny)
+                if cell in self.frontier:
+                    self.frontier[cell].add((nx, ny))
+
+    def spread(self, kind, blocked=()):
+        # Let every frontier cell of one fluid flow into its empty
+        # neighbours, apart from the blocked ones, which it waits for.
+        # Where water meets lava the lava cell hardens into obsidian.
+        # Returns the cells that changed.
+        field = self.field
+        frontier = self.frontier[kind]
+        self.frontier[kind] = next_frontier = set()
+        opposite = OPPOSITE[kind]
+        changed = []
+        # Sorted so a step doesn't depend on set order
+        for x, y in sorted(frontier):
+            if field.get(x, y) != kind:
+                continue  # Changed since it joined (e.g. poured into obsidian)
+            hardens = False
+            for dx, dy in NEIGHBOURS:
+                nx, ny = x + dx, y + dy
+                if not field.in_bounds(nx, ny):
+                    continue
+                if not field.is_generated(nx, ny):
+                    # Wait for it rather than generate the world ahead of
+                    # the fluid
+                    next_frontier.add((x, y))
+                    continue
+                cell = field.get(nx, ny)
+                if cell == Cell.EMPTY and (nx, ny) in blocked:
+                    next_frontier.add((x, y))
+                elif cell == Cell.EMPTY:
+                    field.set(nx, ny, kind)
+                    next_frontier.add((nx, ny))
+                    changed.append((nx, ny))
+                elif cell == opposite and kind == Cell.WATER:
+                    field.set(nx, ny, Cell.OBSIDIAN)
+                    changed.append((nx, ny))
+                elif cell == opposite:
+                    hardens = True
+            if hardens:
+                # Lava still flows into its other neighbours before it
+                # hardens, as in VectorMinerEnv
+                field.set(x, y, Cell.OBSIDIAN)
+                changed.append((x, y))
+        return changed
+
+    def active(self):
+        return len(self.frontier[Cell.WATER]) + len(self.frontier[Cell.LAVA])
@@ -0,0 +1,179 @@
+import numpy as np
+from collections import deque
+from miner_field import Cell, Field
+
+# Level layout settings
+MATERIAL_FILL = 0.95     # Fraction of the grid filled with materials
+WATER_POOL_CELLS = 50    # Maximum size of the water pool
+LAVA_POOL_CELLS = 30     # Maximum size of the lava pool
+GREEN_ORES = 2
+
+
+def zombie_count(level):
+    return 5 + (level - 1)
+
+
+# A generated level: the field plus where its zombies start
+class Level:
+    def __init__(self, number, field, zombie_positions, starred):
+        self.number = number
+        self.field = field
+        # (n, 2) array of x, y start positions, one row per zombie
+        self.zombie_positions = zombie_positions
+        # Index of the zombie that drops a double blue ore, or -1
+        self.starred = starred
+
+
+# Water and Lava Placement
+def place_water(field, x, y, max_cells, rng):
+    if field.get(x, y) == Cell.EMPTY:
+        field.set(x, y, Cell.WATER)
+        # Spread water to adjacent empty cells
+        spread_water(field, x, y, max_cells, rng)
+
+
+def spread_water(field, x, y, max_cells, rng):
+    queue = deque()
+    queue.append((x, y))
+    visited = set()
+    visited.add((x, y))
+    while queue and len(visited) < max_cells:
+        cx, cy = queue.popleft()
+        neighbors = [
+            (cx+1, cy),
+            (cx-1, cy),
+            (cx, cy+1),
+            (cx, cy-1)
+        ]
+        rng.shuffle(neighbors)  # Randomize spread
+        for nx, ny in neighbors:
+            if field.in_bounds(nx, ny):
+                if (nx, ny) not in visited:
+                    cell = field.get(nx, ny)
+                    if cell == Cell.EMPTY:
+                        field.set(nx, ny, Cell.WATER)
+                        queue.append((nx, ny))
+                        visited.add((nx, ny))
+                    # Water and Lava Interaction
+                    elif cell == Cell.LAVA:
+                        field.set(nx, ny, Cell.OBSIDIAN)
+                        visited.add((nx, ny))  # Prevent reprocessing
+
+
+def place_lava(field, x, y, max_cells, rng):
+    if field.get(x, y) == Cell.EMPTY:
+        field.set(x, y, Cell.LAVA)
+        # Spread lava to adjacent empty cells
+        spread_lava(field, x, y, max_cells, rng)
+
+
+def spread_lava(field, x, y, max_cells, rng):
+    queue = deque()
+    queue.append((x, y))
+    visited = set()
+    visited.add((x, y))
+    while queue and len(visited) < max_cells:
+        cx, cy = queue.popleft()
+        neighbors = [
+            (cx+1, cy),
+            (cx-1, cy),
+            (cx, cy+1),
+            (cx, cy-1)
+        ]
+        rng.shuffle(neighbors)  # Randomize spread
+        for nx, ny in neighbors:
+            if field.in_bounds(nx, ny):
+                if (nx, ny) not in visited:
+                    cell = field.get(nx, ny)
+                    if cell == Cell.EMPTY:
+                        field.set(nx, ny, Cell.LAVA)
+                        queue.append((nx, ny))
+                        visited.add((nx, ny))
+                    # Lava and Water Interaction
+                    elif cell == Cell.WATER:
+                        # Current lava turns to obsidian
+                        field.set(cx, cy, Cell.OBSIDIAN)
+                        break  # Stop spreading this lava path
+
+
+def dilate(mask):
+    # Grow a boolean mask by one cell in all eight directions
+    padded = np.pad(mask, 1)
+    grown = np.zeros_like(mask)
+    height, width = mask.shape
+    for dy in (0, 1, 2):
+        for dx in (0, 1, 2):
+            grown |= padded[dy:dy + height, dx:dx + width]
+    return grown
+
+
+def sample(candidates, count, rng):
+    # Pick up to count distinct flat indices from a boolean mask
+    free = np.flatnonzero(candidates)
+    count = min(count, len(free))
+    return rng.choice(free, size=count, replace=False)
+
+
+# Every placement step samples from the currently free cells instead of
+# retrying random coordinates, so generation runs in bounded time however
+# full or large the grid is.
+def generate_level(number, width, height=None, player_pos=(0, 0), rng=None,
+                   num_zombies=None, water_cells=WATER_POOL_CELLS,
+                   lava_cells=LAVA_POOL_CELLS):
+    rng = np.random.default_rng() if rng is None else rng
+    field = Field(width, height)
+    width, height = field.width, field.height
+    cells = field.cells.reshape(-1)  # Flat view, writes go to the field
+    # Zombies don't start next to the player. player_pos may be None for
+    # a piece of a larger world that the player doesn't start in.
+    near_player = np.zeros((height, width), dtype=bool)
+    if player_pos is not None:
+        near_player[max(0, player_pos[1] - 1):player_pos[1] + 2,
+                    max(0, player_pos[0] - 1):player_pos[0] + 2] = True
+        player_index = player_pos[1] * width + player_pos[0]
+    near_player = near_player.reshape(-1)
+    if num_zombies is None:
+        num_zombies = zombie_count(number)
+
+    # Place water and lava pools before filling materials. On the default
+    # 40x40 grid the water pool starts in 5..10 and the lava pool in 25..30.
+    # Place a water pool (starting point), limit the spread to water_cells
+    water_x = int(rng.integers(width // 8, width // 4 + 1))
+    water_y = int(rng.integers(height // 8, height // 4 + 1))
+    place_water(field, water_x, water_y, water_cells, rng)
+
+    # Place a lava pool (starting point), limit the spread to lava_cells
+    lava_x = int(rng.integers(width * 5 // 8, width * 3 // 4 + 1))
+    lava_y = int(rng.integers(height * 5 // 8, height * 3 // 4 + 1))
+    place_lava(field, lava_x, lava_y, lava_cells, rng)
+
+    # Fill the empty spaces with materials, keeping the player's cell and
+    # enough room for the zombies and green ores free
+    empty = cells == Cell.EMPTY
+    if player_pos is not None:
+        empty[player_index] = False
+    material_target = int(width * height * MATERIAL_FILL)
+    room = int(np.count_nonzero(empty)) - 9 * (num_zombies + GREEN_ORES)
+    material_count = max(0, min(material_target, room))
+    cells[sample(empty, material_count, rng)] = Cell.MATERIAL
+
+    # Place zombies in empty spaces not next to the player
+    candidates = (cells == Cell.EMPTY) & ~near_player
+    zombie_indices = sample(candidates, num_zombies, rng)
+    zombie_positions = np.column_stack(
+        (zombie_indices % width, zombie_indices // width))
+
+    # Place green ores in empty spaces not adjacent to zombies
+    zombie_mask = np.zeros(width * height, dtype=bool)
+    zombie_mask[zombie_indices] = True
+    near_zombie = dilate(zombie_mask.reshape(height, width)).reshape(-1)
+    candidates = (cells == Cell.EMPTY) & ~near_zombie
+    if player_pos is not None:
+        candidates[player_index] = False
+    cells[sample(candidates, GREEN_ORES, rng)] = Cell.GREEN_ORE
+
+    # Randomly select one zombie to be starred (but do not show it)
+    starred = int(rng.integers(len(zombie_indices))) if len(zombie_indices) else -1
+
+    field.take_dirty()
+    return Level(number, field, zombie_positions, starred)
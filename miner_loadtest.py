@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from miner_engine import Action, GRID_SIZE
+from miner_server import TICK_RATE
+
+# Load test of miner_server: starts a server in its own process (or uses
+# a running one with --port/--unix), connects more and more clients to
+# it and reports, for each number of clients, the tick rate the server
+# kept up, the share of one core its ticks used (and so the highest tick
+# rate a core could run) and how much it sent.
+# Some of the clients play (send a random action every tick they get),
+# the rest only watch. The clients parse nothing but the stats messages,
+# so they stay cheap next to the server.
+
+STATS_PREFIX = b'{"type": "stats"'
+ACTIONS = list(Action)
+
+
+class LoadClient:
+    def __init__(self, playing, rng):
+        self.playing = playing
+        self.rng = rng
+        self.ticks = 0
+        self.bytes = 0
+        self.stats = []
+        self.writer = None
+
+    async def run(self, connect):
+        reader, self.writer = await connect()
+        try:
+            async for line in reader:
+                self.bytes += len(line)
+                if line.startswith(STATS_PREFIX):
+                    self.stats.append(json.loads(line))
+                    continue
+                self.ticks += 1
+                if self.playing:
+                    action = self.rng.choice(ACTIONS).name
+                    self.writer.write(b'{"action": "%s"}\n' % action.encode())
+        except ConnectionError:
+            pass
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def measure(connect, clients, players, duration, rng):
+    # Connect clients (players of them playing), let them run for duration
+    # seconds and summarise the server's stats from that time
+    load = [LoadClient(i < players, random.Random(rng.getrandbits(32)))
+            for i in range(clients)]
+    tasks = [asyncio.create_task(client.run(connect)) for client in load]
+    await asyncio.sleep(1.0)  # Let everyone connect and settle
+    for client in load:
+        client.stats.clear()
+    ticks = [client.ticks for client in load]
+    await asyncio.sleep(duration)
+    received = [(client.ticks - before) / duration for client, before in zip(load, ticks)]
+    # Stats messages reach every client, so any connected one has them all
+    stats = max((client.stats for client in load), key=len)
+    for client in load:
+        client.close()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if not stats:
+        return None
+
+    def mean(name):
+        return sum(s[name] for s in stats) / len(stats)
+
+    return {
+        'clients': clients,
+        'players': players,
+        'connected': stats[-1]['clients'],
+        'tick_rate': mean('tick_rate'),
+        'busy': mean('busy'),
+        # Ticks per second the server could run on a core of its own
+        'max_tick_rate': mean('tick_rate') / mean('busy') if mean('busy') else None,
+        'kbytes_per_second': mean('bytes_per_second') / 1024,
+        'slowest_client_tick_rate': min(received),
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def wait_for_server(connect, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            reader, writer = await connect()
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def run(args):
+    server = None
+    if args.unix:
+        def connect():
+            return asyncio.open_unix_connection(args.unix, limit=2 ** 22)
+    else:
+        port = args.port
+        if port is None:
+            port = free_port()
+            server = subprocess.Popen(
+                [sys.executable, os.path.join(os.path.dirname(__file__), 'miner_server.py'),
+                 '--port', str(port), '--tick-rate', str(args.tick_rate),
+                 '--grid-size', str(args.grid_size), '--seed', str(args.seed)])
+
+        def connect():
+            return asyncio.open_connection(args.host, port, limit=2 ** 22)
+
+    rng = random.Random(args.seed)
+    results = []
+    try:
+        await wait_for_server(connect)
+        for clients in args.clients:
+            players = min(clients, args.players)
+            result = await measure(connect, clients, players, args.duration, rng)
+            if result is None:
+                print(f'{clients:6} clients: no stats received', file=sys.stderr)
+                continue
+            results.append(result)
+            sustained = result['tick_rate'] >= 0.95 * args.tick_rate
+            print(f"{clients:6} clients ({players} playing): "
+                  f"{result['tick_rate']:7.1f} ticks/s of {args.tick_rate:g}, "
+                  f"busy {result['busy']:6.1%} (at most {result['max_tick_rate'] or 0:6.0f} ticks/s), "
+                  f"{result['kbytes_per_second']:8.1f} KB/s, "
+                  f"slowest client {result['slowest_client_tick_rate']:6.1f} ticks/s"
+                  f"{'' if sustained else '  (fell behind)'}", file=sys.stderr)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the miner game server.')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 10, 100, 500, 1000],
+                        help='numbers of concurrent clients to try')
+    parser.add_argument('--players', type=int, default=1,
+                        help='how many of the clients send actions')
+    parser.add_argument('--duration', type=float, default=5.0,
+                        help='seconds to measure each number of clients')
+    parser.add_argument('--tick-rate', type=float, default=TICK_RATE)
+    parser.add_argument('--grid-size', type=int, default=GRID_SIZE)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help='use a server already running on this port')
+    parser.add_argument('--unix', metavar='PATH',
+                        help='use a server already listening on this Unix socket')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'tick_rate': args.tick_rate, 'grid_size': args.grid_size,
+                       'players': args.players, 'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import heapq
+import random
+
+INF = float('inf')
+
+
+# D* Lite (Koenig and Likhachev) for one zombie chasing the player. The
+# search runs backward from the goal (the player's cell), so g of a cell
+# is its distance to the goal and the search tree stays valid while the
+# zombie walks along it: moving the start only raises km, the offset
+# that keeps the queued keys lower bounds. When a cell changes, changed()
+# re-opens just that cell and its neighbours, and the repair spreads only
+# as far as distances actually change. When the player moves, the tree is
+# re-rooted in place: the new goal gets rhs 0, the old goal becomes an
+# ordinary cell again, and the same repair fixes the distances in between.
+#
+# On an open map every cell between the zombie and the player ties on the
+# first part of the key, and the usual tie-break (smaller g first) would
+# flood that whole rectangle. Instead, cells whose distance dropped are
+# taken deepest first, so a search runs straight along one shortest path,
+# while cells whose distance grew still come before any tied cell, so a
+# blocked path is always invalidated before the start is trusted again.
+#
+# Every cell a zombie can walk on is passable, plus the goal itself (the
+# player may stand on a block of material they just placed). Other
+# zombies don't block the search, like in FlowField.
+class DStarLite:
+    def __init__(self, field, start, goal):
+        self.field = field
+        self.start = start
+        self.goal = goal
+        self.km = 0
+        self.g = {}
+        self.rhs = {goal: 0}
+        # Lazy priority queue: heap entries whose key no longer matches
+        # queued[cell] are stale and skipped
+        self.queue = []
+        self.queued = {}
+        self.expansions = 0  # Cells expanded so far, for benchmarks
+        self.enqueue(goal)
+
+    def key(self, cell):
+        # (estimated length of a path through the cell, tie-break)
+        g, rhs = self.g.get(cell, INF), self.rhs.get(cell, INF)
+        (sx, sy), (x, y) = self.start, cell
+        if g < rhs:
+            return (g + abs(sx - x) + abs(sy - y) + self.km, -INF)
+        return (rhs + abs(sx - x) + abs(sy - y) + self.km, -rhs)
+
+    def passable(self, cell):
+        return cell == self.goal or self.field.is_walkable(*cell)
+
+    def neighbours(self, cell):
+        x, y = cell
+        width, height = self.field.width, self.field.height
+        cells = []
+        if x + 1 < width:
+            cells.append((x + 1, y))
+        if x > 0:
+            cells.append((x - 1, y))
+        if y + 1 < height:
+            cells.append((x, y + 1))
+        if y > 0:
+            cells.append((x, y - 1))
+        return cells
+
+    def enqueue(self, cell):
+        if self.g.get(cell, INF) != self.rhs.get(cell, INF):
+            key = self.key(cell)
+            self.queued[cell] = key
+            heapq.heappush(self.queue, (key, cell))
+        else:
+            self.queued.pop(cell, None)
+
+    def update(self, cell):
+        # Recompute rhs of a cell from its neighbours and queue it if that
+        # makes it inconsistent
+        goal = self.goal
+        if cell != goal:
+            best = INF
+            is_walkable = self.field.is_walkable
+            if is_walkable(*cell):
+                g = self.g
+                for neighbour in self.neighbours(cell):
+                    distance = g.get(neighbour, INF) + 1
+                    if distance < best and (neighbour == goal or is_walkable(*neighbour)):
+                        best = distance
+            if best == INF:
+                self.rhs.pop(cell, None)
+            else:
+                self.rhs[cell] = best
+        self.enqueue(cell)
+
+    def changed(self, x, y):
+        # Cell (x, y) changed kind: edges into and out of it may have
+        # appeared or gone
+        cell = (x, y)
+        self.update(cell)
+        for neighbour in self.neighbours(cell):
+            self.update(neighbour)
+
+    def move_start(self, start):
+        x, y = start
+        sx, sy = self.start
+        self.km += abs(sx - x) + abs(sy - y)
+        self.start = start
+
+    def move_goal(self, goal):
+        old_goal = self.goal
+        self.goal = goal
+        self.rhs[goal] = 0
+        self.changed(*old_goal)
+        self.changed(*goal)
+
+    def compute(self, budget=None):
+        # Repair the tree until the start's distance is known. With a
+        # budget, give up after expanding that many cells and return
+        # False; the next call carries on where this one stopped.
+        queue, queued = self.queue, self.queued
+        g, rhs = self.g, self.rhs
+        is_walkable = self.field.is_walkable
+        start = self.start
+        expanded = 0
+        while queue:
+            top_key, cell = queue[0]
+            if queued.get(cell) != top_key:
+                heapq.heappop(queue)  # Stale entry
+                continue
+            g_start, rhs_start = g.get(start, INF), rhs.get(start, INF)
+            if not (top_key < self.key(start) or g_start != rhs_start):
+                break
+            if budget is not None and expanded >= budget:
+                self.expansions += expanded
+                return False
+            expanded += 1
+            heapq.heappop(queue)
+            new_key = self.key(cell)
+            if top_key < new_key:
+                # km or the start moved since it was queued
+                queued[cell] = new_key
+                heapq.heappush(queue, (new_key, cell))
+                continue
+            del queued[cell]
+            goal = self.goal
+            distance = rhs.get(cell, INF)
+            if g.get(cell, INF) > distance:
+                # Got closer: only neighbours it is now a shortcut for change
+                g[cell] = distance
+                distance += 1
+                for neighbour in self.neighbours(cell):
+                    if (distance < rhs.get(neighbour, INF) and neighbour != goal and
+                            is_walkable(*neighbour)):
+                        rhs[neighbour] = distance
+                        self.enqueue(neighbour)
+            else:
+                # Got further away: recompute it and the neighbours whose
+                # rhs came through it
+                through = g.pop(cell) + 1
+                self.update(cell)
+                for neighbour in self.neighbours(cell):
+                    if rhs.get(neighbour) == through:
+                        self.update(neighbour)
+        self.expansions += expanded
+        return True
+
+    def distance(self):
+        # Steps from the start to the goal, or -1 if unreachable
+        distance = self.g.get(self.start, INF)
+        return -1 if distance == INF else distance
+
+    def next_step(self, occupied=(), rng=random):
+        # Pick one of the free neighbours of the start that is a step
+        # closer to the goal, like FlowField.next_step
+        here = self.distance()
+        if here <= 0:
+            return None
+        g = self.g
+        x, y = self.start
+        steps = [cell for cell in ((x+1, y), (x-1, y), (x, y+1), (x, y-1))
+                 if g.get(cell, INF) == here - 1 and cell not in occupied]
+        return rng.choice(steps) if steps else None
+
+    def route(self, cell, steps):
+        # Up to steps cells further down the tree from cell, like
+        # FlowField.route (as of the last compute())
+        g = self.g
+        cells = []
+        here = g.get(cell, INF)
+        x, y = cell
+        while 1 < here < INF and len(cells) < steps:
+            for nx, ny in ((x+1, y), (x-1, y), (x, y+1), (x, y-1)):
+                if g.get((nx, ny), INF) == here - 1:
+                    break
+            cells.append((nx, ny))
+            x, y, here = nx, ny, here - 1
+        return cells
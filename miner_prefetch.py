@@ -0,0 +1,56 @@
+import queue
+import threading
+from miner_replay import make_state
+
+DEPTH = 1  # Levels built ahead of the one being played
+
+
+# Builds the states of upcoming levels on a background thread, so the
+# next level is ready the moment the current one ends, however long it
+# takes to generate. settings is an iterable of make_state() settings in
+# the order the levels will be played; at most depth finished levels
+# wait in the queue, so the thread only runs ahead that far. A state is
+# never touched by the thread again once it has been queued.
+class LevelPrefetcher:
+    def __init__(self, settings, depth=DEPTH):
+        self.settings = iter(settings)
+        self.levels = queue.Queue(maxsize=depth)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='level-prefetch', daemon=True)
+        self.thread.start()
+
+    def run(self):
+        for settings in self.settings:
+            try:
+                item = (settings, make_state(settings), None)
+            except Exception as error:
+                item = (settings, None, error)
+            while not self.stopped.is_set():
+                try:
+                    self.levels.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+            if self.stopped.is_set():
+                if item[1] is not None:
+                    item[1].close()  # Built, but nobody will play it
+                return
+            if item[2] is not None:
+                return
+
+    def next(self):
+        # (settings, state) of the next level, waiting for it if it isn't
+        # built yet. An error raised while building it is raised here.
+        settings, state, error = self.levels.get()
+        if error is not None:
+            raise error
+        return settings, state
+
+    def close(self):
+        # Stop building levels and close the ones built but never played
+        self.stopped.set()
+        self.thread.join()
+        while not self.levels.empty():
+            settings, state, error = self.levels.get()
+            if state is not None:
+                state.close()
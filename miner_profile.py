@@ -0,0 +1,96 @@
+import csv
+import json
+import numpy as np
+import time
+from collections import deque
+
+# Phases of a frame of the game loop, in the order they run
+PHASES = ('draw_field', 'show_stats', 'events', 'step', 'move_zombies',
+          'zombie_attack', 'fluids', 'display_update', 'idle')
+WINDOW = 240  # Frames kept for the rolling statistics
+
+
+# Times the phases of every frame. The loop calls next_frame() at the
+# start of a frame and mark(phase) after each phase, which adds the time
+# since the previous mark to that phase, so a phase that runs several
+# times in a frame (like a zombie tick while catching up) is summed.
+# Frames are only timed while the overlay is shown or samples are being
+# written; otherwise both calls return straight away.
+class FrameProfiler:
+    def __init__(self, output=None, window=WINDOW):
+        self.show = False
+        self.samples = {phase: deque(maxlen=window) for phase in PHASES}
+        self.frame_times = deque(maxlen=window)
+        self.frame_count = 0
+        self.frame = None  # Phase times of the frame being timed
+        self.frame_start = 0.0
+        self.last = 0.0
+        # Per-frame samples go to a CSV file, or JSON lines for any other
+        # file extension
+        self.file = None
+        self.writer = None
+        if output:
+            self.file = open(output, 'w', newline='')
+            if output.endswith('.csv'):
+                self.writer = csv.writer(self.file)
+                self.writer.writerow(('frame', 'frame_ms') + PHASES)
+
+    @property
+    def enabled(self):
+        return self.show or self.file is not None
+
+    def toggle(self):
+        self.show = not self.show
+
+    def next_frame(self):
+        now = time.perf_counter()
+        if self.frame is not None:
+            self.finish_frame(now)
+        if not self.enabled:
+            self.frame = None
+            return
+        self.frame = dict.fromkeys(PHASES, 0.0)
+        self.frame_start = self.last = now
+
+    def mark(self, phase):
+        if self.frame is None:
+            return
+        now = time.perf_counter()
+        self.frame[phase] += now - self.last
+        self.last = now
+
+    def finish_frame(self, now):
+        frame_time = now - self.frame_start
+        self.frame_times.append(frame_time)
+        for phase, seconds in self.frame.items():
+            self.samples[phase].append(seconds)
+        self.frame_count += 1
+        if self.writer is not None:
+            self.writer.writerow(
+                [self.frame_count, round(frame_time * 1000, 4)] +
+                [round(self.frame[phase] * 1000, 4) for phase in PHASES])
+        elif self.file is not None:
+            sample = {'frame': self.frame_count,
+                      'frame_ms': round(frame_time * 1000, 4)}
+            sample.update((phase, round(seconds * 1000, 4))
+                          for phase, seconds in self.frame.items())
+            self.file.write(json.dumps(sample) + '\n')
+
+    def fps(self):
+        total = sum(self.frame_times)
+        return len(self.frame_times) / total if total else 0.0
+
+    def percentiles(self):
+        # phase -> (p50, p99) in milliseconds over the recent frames
+        stats = {}
+        for phase, samples in self.samples.items():
+            if samples:
+                p50, p99 = np.percentile(np.fromiter(samples, float), (50, 99))
+                stats[phase] = (float(p50) * 1000, float(p99) * 1000)
+        return stats
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.writer = None
@@ -0,0 +1,118 @@
+import argparse
+import hashlib
+import json
+import time
+from miner_corpus import load_corpus
+from miner_engine import Action, GameState
+from miner_save import load_state
+from miner_world import ChunkedField
+
+# A recording is a JSON lines file. Each level starts with a line
+#     {"level": {...settings...}}
+# holding the keyword arguments of make_state() (or {"snapshot": path} for
+# a level resumed from a saved snapshot, and a "corpus" path for a level
+# read from a level corpus), followed by one line
+#     [action, dt]
+# per GameState.step() call. Since the engine draws all randomness from
+# the seed in the settings and only advances through step(), replaying
+# the lines reproduces the session exactly.
+
+
+def make_state(settings):
+    if 'snapshot' in settings:
+        return load_state(settings['snapshot'])
+    settings = dict(settings)
+    world_size = settings.pop('world_size', None)
+    corpus = settings.pop('corpus', None)
+    world = None
+    if world_size:
+        world = ChunkedField(world_size, seed=settings['seed'],
+                             level=settings['level'])
+    elif corpus:
+        # A level missing from the corpus is generated as usual
+        settings['layout'] = load_corpus(corpus).get(settings['level'], settings['seed'])
+    return GameState(world=world, **settings)
+
+
+class InputRecorder:
+    def __init__(self, path):
+        self.file = open(path, 'w')
+
+    def start_level(self, settings):
+        self.file.write(json.dumps({'level': settings}) + '\n')
+
+    def record(self, action, dt):
+        self.file.write(json.dumps([int(action), dt]) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+def read_recording(path):
+    # List of (settings, steps) per level
+    levels = []
+    with open(path) as f:
+        for line in f:
+            entry = json.loads(line)
+            if isinstance(entry, dict):
+                levels.append((entry['level'], []))
+            else:
+                levels[-1][1].append((Action(entry[0]), entry[1]))
+    return levels
+
+
+class InputPlayer:
+    def __init__(self, path):
+        self.levels = read_recording(path)
+
+    def play(self):
+        # Replay every recorded level headlessly, yielding the final state
+        # and number of steps of each
+        for settings, steps in self.levels:
+            state = make_state(settings)
+            for action, dt in steps:
+                state.step(action, dt)
+            yield state, len(steps)
+            state.close()
+
+
+def state_digest(state):
+    # Short fingerprint of a state, to check two runs ended identically
+    digest = hashlib.sha1()
+    field = state.field
+    if isinstance(field, ChunkedField):
+        # Every chunk generated so far, changed or not
+        for key in sorted(field.generated):
+            digest.update(repr(key).encode())
+            digest.update(field.peek(key).tobytes())
+    else:
+        digest.update(field.cells.tobytes())
+    zombies = state.zombies
+    for column in (zombies.x, zombies.y, zombies.health):
+        digest.update(column[:zombies.count].tobytes())
+    digest.update(repr((state.player_pos, state.player_health,
+                        state.player_inventory, state.player_blue_ore_inventory,
+                        state.player_green_ore_inventory, state.bucket_content,
+                        state.time, state.game_result)).encode())
+    return digest.hexdigest()[:12]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Replay a recorded miner session without a window.')
+    parser.add_argument('recording')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    total_steps = 0
+    for state, steps in InputPlayer(args.recording).play():
+        total_steps += steps
+        print(f'Level {state.level}: {steps} steps, '
+              f'{state.game_result or "unfinished"}, digest {state_digest(state)}')
+    elapsed = time.perf_counter() - start
+    print(f'{total_steps} steps in {elapsed:.3f}s '
+          f'({total_steps / max(elapsed, 1e-9):.0f} steps/s)')
+
+
+if __name__ == "__main__":
+    main()
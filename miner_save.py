@@ -0,0 +1,212 @@
+import json
+import numpy as np
+import os
+import struct
+import tempfile
+from miner_engine import GameState
+from miner_field import Cell, Field
+from miner_planner import INF, DStarLite
+from miner_world import ChunkedField
+from miner_zombies import COLUMNS, Zombies
+
+# A snapshot of a GameState in one binary file:
+#     magic, format version and header length ('<8sII')
+#     JSON header with the scalar state and the list of arrays
+#     the arrays as raw bytes, each starting on an ALIGN byte boundary
+# The grid is stored as-is (uint8, row-major), so loading memory-maps it
+# instead of reading or regenerating it, and a snapshot of a large world
+# opens in about the time it takes to parse the header. A chunked world
+# stores only the chunks that differ from their generated layout. The
+# incremental zombie searches are stored too, so a resumed game plays
+# on exactly as the saved one would have.
+MAGIC = b'MINERSAV'
+VERSION = 5
+ALIGN = 64
+PREFIX = struct.Struct('<8sII')
+
+# Plain attributes of a GameState stored in the header
+STATE_FIELDS = (
+    'level', 'flow_radius', 'player_pos', 'player_inventory',
+    'player_blue_ore_inventory', 'player_green_ore_inventory', 'player_health',
+    'player_facing', 'player_has_bucket', 'bucket_content',
+    'total_zombies_defeated', 'time', 'ticks', 'game_over', 'level_complete', 'game_result',
+    'ai_cursor', 'route_steps',
+)
+
+
+def aligned(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+def planner_arrays(planner):
+    # A DStarLite search as arrays: g and rhs as rows of x, y, value, and
+    # the heap (in its order) and queued keys as rows of x, y, key
+    def values(table):
+        return np.array([(x, y, value) for (x, y), value in table.items()],
+                        dtype=np.int64).reshape(-1, 3)
+
+    def keys(entries):
+        return np.array([(x, y, k1, k2) for (k1, k2), (x, y) in entries],
+                        dtype=np.float64).reshape(-1, 4)
+
+    return {
+        'g': values(planner.g),
+        'rhs': values(planner.rhs),
+        'queue': keys(planner.queue),
+        'queued': keys((key, cell) for cell, key in planner.queued.items()),
+    }
+
+
+def restore_planner(field, saved, arrays):
+    planner = DStarLite(field, tuple(saved['start']), tuple(saved['goal']))
+    planner.km = saved['km']
+    planner.expansions = saved['expansions']
+    planner.g = {(x, y): value for x, y, value in arrays['g'].tolist()}
+    planner.rhs = {(x, y): value for x, y, value in arrays['rhs'].tolist()}
+
+    def key(k1, k2):
+        # Keys are whole numbers apart from the -INF tie-break
+        return (int(k1), k2 if k2 == -INF else int(k2))
+
+    planner.queue = [(key(k1, k2), (int(x), int(y)))
+                     for x, y, k1, k2 in arrays['queue'].tolist()]
+    planner.queued = {(int(x), int(y)): key(k1, k2)
+                      for x, y, k1, k2 in arrays['queued'].tolist()}
+    return planner
+
+
+def save_state(state, path):
+    arrays = []  # (name, array) in file order
+    field = state.field
+    if isinstance(field, ChunkedField):
+        chunks = []
+        for key, cells in field.changed_chunks():
+            chunks.append(key)
+            arrays.append(('chunk_%d_%d' % key, cells))
+        field_header = {
+            'kind': 'chunked', 'width': field.width, 'height': field.height,
+            'seed': field.seed, 'level': field.level,
+            'chunk_size': field.chunk_size, 'chunks': chunks,
+            'generated': sorted(field.generated),
+        }
+    else:
+        arrays.append(('cells', field.cells))
+        field_header = {'kind': 'grid', 'width': field.width, 'height': field.height}
+    zombies = state.zombies
+    for name in COLUMNS:
+        arrays.append(('zombies.' + name, getattr(zombies, name)[:zombies.count]))
+    planners = []
+    for i, planner in sorted(state.planners.items()):
+        planners.append({'zombie': i, 'start': planner.start, 'goal': planner.goal,
+                         'km': planner.km, 'expansions': planner.expansions})
+        for name, array in planner_arrays(planner).items():
+            arrays.append(('planner_%d.%s' % (i, name), array))
+    # Fluid cells that may still flow, as (n, 2) arrays of x, y
+    for kind in (Cell.WATER, Cell.LAVA):
+        frontier = sorted(state.fluids.frontier[kind])
+        arrays.append(('frontier.%d' % kind,
+                       np.array(frontier, dtype=np.int32).reshape(-1, 2)))
+
+    blocks = []
+    offset = 0
+    for name, array in arrays:
+        blocks.append({'name': name, 'dtype': array.dtype.str,
+                       'shape': array.shape, 'offset': offset})
+        offset = aligned(offset + array.nbytes)
+    rng_version, rng_internal, rng_gauss = state.rng.getstate()
+    header = {
+        'state': {name: getattr(state, name) for name in STATE_FIELDS},
+        'rng': [rng_version, rng_internal, rng_gauss],
+        'timestep': {'accumulator': state.timestep.accumulator,
+                     'max_steps': state.timestep.max_steps},
+        'field': field_header,
+        'zombies': zombies.count,
+        'routes': [[i, route] for i, route in sorted(state.routes.items())],
+        'planners': planners,
+        'blocks': blocks,
+    }
+    header = json.dumps(header).encode()
+    # Block offsets are relative to the first block, after the header
+    data_start = aligned(PREFIX.size + len(header))
+    header = header.ljust(data_start - PREFIX.size)
+
+    # Written to a new file that then replaces path: the grid may still be
+    # mapped from path by load_state(), and truncating it in place would
+    # pull the pages out from under the arrays being saved
+    fd, temp_path = tempfile.mkstemp(prefix='.miner-save-',
+                                     dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(PREFIX.pack(MAGIC, VERSION, len(header)))
+            f.write(header)
+            for (name, array), block in zip(arrays, blocks):
+                f.seek(data_start + block['offset'])
+                f.write(np.ascontiguousarray(array).tobytes())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def load_state(path, mmap=True):
+    # With mmap the grid is mapped copy-on-write: changes made while
+    # playing stay in memory and never reach the file
+    with open(path, 'rb') as f:
+        magic, version, header_size = PREFIX.unpack(f.read(PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a miner snapshot')
+        if version != VERSION:
+            raise ValueError(f'{path} has unsupported snapshot version {version}')
+        header = json.loads(f.read(header_size))
+    data_start = PREFIX.size + header_size
+
+    def read(block):
+        dtype = np.dtype(block['dtype'])
+        shape = tuple(block['shape'])
+        offset = data_start + block['offset']
+        count = int(np.prod(shape))
+        if mmap and count:
+            return np.memmap(path, dtype=dtype, mode='c', offset=offset, shape=shape)
+        return np.fromfile(path, dtype=dtype, count=count, offset=offset).reshape(shape)
+
+    arrays = {block['name']: read(block) for block in header['blocks']}
+
+    field_header = header['field']
+    saved = header['state']
+    if field_header['kind'] == 'chunked':
+        world = ChunkedField(field_header['width'], field_header['height'],
+                             seed=field_header['seed'], level=field_header['level'],
+                             chunk_size=field_header['chunk_size'])
+        world.generated = {tuple(key) for key in field_header['generated']}
+        for key in field_header['chunks']:
+            world.restore_chunk(tuple(key), arrays['chunk_%d_%d' % tuple(key)])
+        state = GameState(level=saved['level'], world=world)
+    else:
+        field = Field(field_header['width'], field_header['height'],
+                      cells=arrays['cells'])
+        state = GameState(level=saved['level'], field=field)
+
+    for name in STATE_FIELDS:
+        setattr(state, name, saved[name])
+    rng_version, rng_internal, rng_gauss = header['rng']
+    state.rng.setstate((rng_version, tuple(rng_internal), rng_gauss))
+    state.timestep.accumulator = header['timestep']['accumulator']
+    state.timestep.max_steps = header['timestep']['max_steps']
+
+    count = header['zombies']
+    zombies = Zombies(max(16, count))
+    zombies.count = count
+    for name in COLUMNS:
+        getattr(zombies, name)[:count] = arrays['zombies.' + name]
+    zombies.cells = {zombies.position(i): i for i in zombies.living().tolist()}
+    state.zombies = zombies
+    state.routes = {i: [tuple(cell) for cell in route] for i, route in header['routes']}
+    for saved_planner in header['planners']:
+        i = saved_planner['zombie']
+        state.planners[i] = restore_planner(state.field, saved_planner, {
+            name: arrays['planner_%d.%s' % (i, name)]
+            for name in ('g', 'rhs', 'queue', 'queued')})
+    for kind in (Cell.WATER, Cell.LAVA):
+        frontier = arrays['frontier.%d' % kind].tolist()
+        state.fluids.frontier[kind] = {(x, y) for x, y in frontier}
+    return state
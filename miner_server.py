@@ -0,0 +1,273 @@
+import argparse
+import asyncio
+import base64
+import json
+import numpy as np
+import random
+import sys
+import time
+from collections import deque
+from miner_engine import Action, GRID_SIZE
+from miner_prefetch import LevelPrefetcher
+
+# Authoritative game server. One asyncio process runs the game rules at a
+# fixed tick rate and any number of clients connect over TCP or a Unix
+# socket to watch and play. The protocol is JSON lines in both
+# directions:
+#
+#     client -> server  {"action": "MOVE_UP"}  (an Action name or number)
+#     server -> client  {"type": "level", ...}  the full state: on joining
+#                                               and when a level starts
+#                       {"type": "tick", ...}   what changed in one tick
+#                       {"type": "stats", ...}  server load, every second
+#
+# A tick message only holds what changed: cells as [x, y, kind], zombies
+# as [index, x, y, health], and the player fields that differ from the
+# last tick, so its size follows the activity rather than the map size.
+# All clients steer the same player; each gets at most one action
+# applied per tick, in the order they joined.
+
+TICK_RATE = 20             # Server ticks per second
+STATS_INTERVAL = 1.0       # Seconds between stats messages
+MAX_PENDING_ACTIONS = 4    # Actions a client may queue ahead
+MAX_BUFFER = 1024 * 1024   # Unsent bytes after which a slow client is dropped
+BACKLOG = 1024             # Connections waiting to be accepted
+
+PLAYER_FIELDS = (
+    'level', 'player_pos', 'player_health', 'player_inventory',
+    'player_blue_ore_inventory', 'player_green_ore_inventory', 'player_facing',
+    'player_has_bucket', 'bucket_content', 'total_zombies_defeated',
+)
+
+
+def upcoming_levels(grid_size, session_rng, level=1):
+    while True:
+        yield {'level': level, 'grid_size': grid_size, 'seed': session_rng.getrandbits(32)}
+        level += 1
+
+
+def encode(message):
+    return (json.dumps(message) + '\n').encode()
+
+
+def parse_action(line):
+    # Action of a client line, or None if it isn't a valid one
+    try:
+        action = json.loads(line)['action']
+        return Action[action] if isinstance(action, str) else Action(action)
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class Client:
+    def __init__(self, writer):
+        self.writer = writer
+        self.actions = deque(maxlen=MAX_PENDING_ACTIONS)
+
+
+class GameServer:
+    def __init__(self, grid_size=GRID_SIZE, seed=None, tick_rate=TICK_RATE):
+        self.grid_size = grid_size
+        self.tick_rate = tick_rate
+        self.session_rng = random.Random(seed)
+        self.clients = {}  # StreamWriter -> Client, in joining order
+        self.tick = 0
+        # Load since the last stats message
+        self.stats_ticks = 0
+        self.stats_cpu = time.process_time()
+        self.stats_bytes = 0
+
+        self.state = None
+        self.start_session()
+        self.start_level(self.prefetcher.next()[1], 0)
+
+    def start_session(self):
+        self.prefetcher = LevelPrefetcher(upcoming_levels(self.grid_size, self.session_rng))
+
+    def start_level(self, state, total_zombies_defeated):
+        state.total_zombies_defeated = total_zombies_defeated
+        self.state = state
+        state.field.take_dirty()
+        self.zombies_sent = self.zombie_columns()
+        self.player_sent = self.player_fields()
+        self.broadcast(self.level_message())
+
+    def zombie_columns(self):
+        zombies = self.state.zombies
+        n = zombies.count
+        return zombies.x[:n].copy(), zombies.y[:n].copy(), zombies.health[:n].copy()
+
+    def player_fields(self):
+        fields = {name: getattr(self.state, name) for name in PLAYER_FIELDS}
+        fields['player_pos'] = list(fields['player_pos'])  # Changed in place
+        return fields
+
+    def level_message(self):
+        state = self.state
+        field = state.field
+        xs, ys, health = self.zombies_sent
+        return {
+            'type': 'level', 'tick': self.tick, 'time': state.now,
+            'width': field.width, 'height': field.height,
+            # uint8 cells, row-major
+            'cells': base64.b64encode(field.cells.tobytes()).decode(),
+            'zombies': [[i, x, y, h] for i, (x, y, h) in
+                        enumerate(zip(xs.tolist(), ys.tolist(), health.tolist()))],
+            'player': self.player_sent,
+        }
+
+    def delta_message(self, messages):
+        state = self.state
+        field = state.field
+        message = {'type': 'tick', 'tick': self.tick, 'time': state.now}
+        dirty = field.take_dirty()
+        if dirty:
+            message['cells'] = [[x, y, field.get(x, y)] for x, y in sorted(dirty)]
+
+        old_xs, old_ys, old_health = self.zombies_sent
+        xs, ys, health = current = self.zombie_columns()
+        n = len(old_xs)
+        changed = ((xs[:n] != old_xs) | (ys[:n] != old_ys) | (health[:n] != old_health))
+        indexes = np.flatnonzero(changed).tolist() + list(range(n, len(xs)))
+        if indexes:
+            message['zombies'] = [[i, xs.item(i), ys.item(i), health.item(i)] for i in indexes]
+        self.zombies_sent = current
+
+        player = self.player_fields()
+        changes = {name: value for name, value in player.items()
+                   if value != self.player_sent[name]}
+        if changes:
+            message['player'] = changes
+        self.player_sent = player
+        if messages:
+            message['messages'] = messages
+        if state.done:
+            message['result'] = state.game_result
+        return message
+
+    def step(self):
+        # One server tick: everyone's next action, then dt of game time
+        state = self.state
+        messages = []
+        for client in self.clients.values():
+            if client.actions and not state.done:
+                state.step(client.actions.popleft(), 0.0)
+                messages.extend(state.messages)
+        state.step(None, 1.0 / self.tick_rate)
+        messages.extend(state.messages)
+        self.tick += 1
+        self.broadcast(self.delta_message(messages))
+
+    async def next_level(self):
+        # Start the next level once this one is over, or a new session
+        # after a game over. Stopping the old prefetcher and waiting for
+        # a level that isn't built yet both block, so they run off the
+        # event loop and clients are still served meanwhile.
+        loop = asyncio.get_running_loop()
+        state = self.state
+        total_zombies_defeated = state.total_zombies_defeated
+        if state.game_over:
+            await loop.run_in_executor(None, self.prefetcher.close)
+            self.start_session()
+            total_zombies_defeated = 0
+        settings, next_state = await loop.run_in_executor(None, self.prefetcher.next)
+        state.close()
+        self.start_level(next_state, total_zombies_defeated)
+
+    def broadcast(self, message):
+        data = encode(message)
+        for writer in list(self.clients):
+            self.send(writer, data)
+
+    def send(self, writer, data):
+        if writer.transport.get_write_buffer_size() > MAX_BUFFER:
+            # Too far behind to catch up: drop it rather than buffer more
+            self.clients.pop(writer, None)
+            writer.transport.abort()
+            return
+        writer.write(data)
+        self.stats_bytes += len(data)
+
+    async def handle(self, reader, writer):
+        self.clients[writer] = client = Client(writer)
+        self.send(writer, encode(self.level_message()))
+        try:
+            async for line in reader:
+                action = parse_action(line)
+                if action is not None:
+                    client.actions.append(action)
+        except (ConnectionError, ValueError):
+            # ValueError: a line longer than the reader's limit. Either
+            # way the client is dropped.
+            pass
+        finally:
+            self.clients.pop(writer, None)
+            writer.close()
+
+    async def run(self):
+        # Tick on a fixed schedule. When a tick overruns, the schedule
+        # moves on from now instead of running a burst of late ticks, so
+        # an overloaded server slows the game down rather than stuttering.
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.tick_rate
+        next_tick = loop.time()
+        stats_time = loop.time()
+        while True:
+            self.step()
+            self.stats_ticks += 1
+            if self.state.done:
+                await self.next_level()
+
+            now = loop.time()
+            if now - stats_time >= STATS_INTERVAL:
+                self.send_stats(now - stats_time)
+                stats_time = now
+            next_tick += period
+            if next_tick < now:
+                next_tick = now
+            await asyncio.sleep(next_tick - now)
+
+    def send_stats(self, elapsed):
+        # busy is the CPU time the server used (ticks and network alike),
+        # as a fraction of one core
+        cpu = time.process_time()
+        self.broadcast({
+            'type': 'stats', 'clients': len(self.clients),
+            'tick_rate': self.stats_ticks / elapsed,
+            'busy': (cpu - self.stats_cpu) / elapsed,
+            'bytes_per_second': self.stats_bytes / elapsed,
+        })
+        self.stats_ticks = 0
+        self.stats_cpu = cpu
+        self.stats_bytes = 0
+
+
+async def serve(server, host='127.0.0.1', port=8765, unix_path=None):
+    if unix_path:
+        listener = await asyncio.start_unix_server(server.handle, unix_path, backlog=BACKLOG)
+    else:
+        listener = await asyncio.start_server(server.handle, host, port, backlog=BACKLOG)
+    address = unix_path or '%s:%d' % listener.sockets[0].getsockname()[:2]
+    print(f'Serving on {address} at {server.tick_rate} ticks/s', file=sys.stderr, flush=True)
+    async with listener:
+        await server.run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run an authoritative miner game server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH', help='listen on a Unix socket instead')
+    parser.add_argument('--tick-rate', type=float, default=TICK_RATE)
+    parser.add_argument('--grid-size', type=int, default=GRID_SIZE)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    server = GameServer(args.grid_size, args.seed, args.tick_rate)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
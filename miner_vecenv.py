@@ -0,0 +1,529 @@
+import argparse
+import numpy as np
+import time
+from miner_engine import (ATTACK_COOLDOWN, Action, DIRECTIONS, GRID_SIZE, HIT_ACTIONS,
+                          LAVA_FLOW_KILLS_PLAYER, LAVA_FLOW_TICKS, MOVE_ACTIONS,
+                          PLAYER_HEALTH, SHOCK_TIME, WATER_FLOW_TICKS, ZOMBIE_HEALTH,
+                          ZOMBIE_TICK)
+from miner_field import Cell, WALKABLE
+from miner_levelgen import generate_level, zombie_count
+
+# Many independent miner levels stepped together, for training agents.
+# The levels live in stacked arrays (one row per environment) and every
+# rule of GameState (move_player, action_on_direction, the bucket,
+# move_zombies, zombie_attack and fluid flow) is applied to all of them at
+# once with NumPy instead of one GameState per level. Random choices (zombie
+# tie-breaks and random walks) come from one generator, so the games
+# follow the same rules as GameState but not its random sequence.
+# One exception: every zombie plans a path on every tick, as in GameState
+# with AI_PLAN_BUDGET = None. The AI level of detail of GameState (zombies
+# far from the player or without a path planning less often and walking
+# their last route in between) is left out, since one search here serves
+# all zombies of all levels anyway. Within AI_NEAR steps of the player the
+# two agree; test_miner_vecenv.py plays them side by side.
+
+ACTION_TIME = 0.25   # Simulated seconds per environment step
+TIME_LIMIT = 300.0   # Simulated seconds before an episode is truncated
+
+# Rewards
+REWARD_WIN = 1.0
+REWARD_DEATH = -1.0
+REWARD_BLUE_ORE = 0.1      # Per blue ore collected
+REWARD_OBSIDIAN = 0.1      # For making obsidian with the bucket
+
+# Directions by index, in DIRECTIONS order; player_facing is an index
+DIRECTION_NAMES = list(DIRECTIONS)
+DX = np.array([DIRECTIONS[name][0] for name in DIRECTION_NAMES])
+DY = np.array([DIRECTIONS[name][1] for name in DIRECTION_NAMES])
+# Order GameState.adjacent_positions() checks the bucket neighbours in
+ADJACENT = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+# Direction index of each move and hit action, -1 for other actions
+MOVE_DIRECTION = np.full(len(Action), -1)
+HIT_DIRECTION = np.full(len(Action), -1)
+for action, name in MOVE_ACTIONS.items():
+    MOVE_DIRECTION[action] = DIRECTION_NAMES.index(name)
+for action, name in HIT_ACTIONS.items():
+    HIT_DIRECTION[action] = DIRECTION_NAMES.index(name)
+
+# Bucket contents
+BUCKET_EMPTY = 0
+BUCKET_WATER = 1
+BUCKET_LAVA = 2
+
+# Columns of the 'state' observation
+STATE_COLUMNS = ('inventory', 'blue_ore', 'green_ore', 'health', 'has_bucket',
+                 'bucket', 'facing')
+
+
+ONE = np.uint64(1)
+# Cells zombies can't walk on
+BLOCKING = np.flatnonzero(~WALKABLE).tolist()
+
+
+def pack_rows(mask):
+    # (n, height, width) bool masks to (n, height) uint64 bitboards, bit x
+    # of a row set for cell x
+    packed = np.packbits(mask, axis=2, bitorder='little')
+    words = np.zeros(mask.shape[:2] + (8,), dtype=np.uint8)
+    words[:, :, :packed.shape[2]] = packed
+    return words.view('<u8')[:, :, 0]
+
+
+def walkable(cells):
+    # WALKABLE[cells], but comparing against the few blocking kinds is much
+    # faster than a table lookup on large stacks
+    mask = np.ones(cells.shape, dtype=bool)
+    for kind in BLOCKING:
+        mask &= cells != kind
+    return mask
+
+
+def dilate(mask):
+    # Cells next to a cell of mask in the four directions, for a stack of
+    # (n, height, width) masks
+    grown = np.zeros_like(mask)
+    grown[:, 1:, :] |= mask[:, :-1, :]
+    grown[:, :-1, :] |= mask[:, 1:, :]
+    grown[:, :, 1:] |= mask[:, :, :-1]
+    grown[:, :, :-1] |= mask[:, :, 1:]
+    return grown
+
+
+# Gym-style vectorized environment: step() takes one Action per
+# environment and returns (observations, rewards, terminated, truncated,
+# info). Environments whose episode ended are reset to a fresh level
+# straight away, so the observations returned for them already belong
+# to the next episode.
+class VectorMinerEnv:
+    def __init__(self, num_envs, grid_size=GRID_SIZE, level=1, seed=None,
+                 action_time=ACTION_TIME, time_limit=TIME_LIMIT):
+        if grid_size > 64:
+            raise ValueError('grid_size can be at most 64 (one uint64 per row)')
+        n = self.num_envs = num_envs
+        self.size = grid_size
+        self.level = level
+        self.action_time = action_time
+        self.time_limit = time_limit
+        self.rng = np.random.default_rng(seed)
+        z = self.max_zombies = zombie_count(level)
+
+        self.cells = np.zeros((n, grid_size, grid_size), dtype=np.uint8)
+        # Slot of the living zombie on each cell, or -1. Levels past 124
+        # have more zombies than int8 holds; int16 holds one per cell of
+        # the largest grid.
+        self.occupant = np.full((n, grid_size, grid_size), -1, dtype=np.int16)
+        # Fluid cells that may still flow (see FluidFlow)
+        self.water_frontier = np.zeros((n, grid_size, grid_size), dtype=bool)
+        self.lava_frontier = np.zeros((n, grid_size, grid_size), dtype=bool)
+
+        self.player_x = np.zeros(n, dtype=np.int32)
+        self.player_y = np.zeros(n, dtype=np.int32)
+        self.player_facing = np.zeros(n, dtype=np.int8)
+        self.player_inventory = np.zeros(n, dtype=np.int32)
+        self.player_blue_ore = np.zeros(n, dtype=np.int32)
+        self.player_green_ore = np.zeros(n, dtype=np.int32)
+        self.player_health = np.zeros(n, dtype=np.int32)
+        self.has_bucket = np.zeros(n, dtype=bool)
+        self.bucket = np.zeros(n, dtype=np.int8)
+        self.kills = np.zeros(n, dtype=np.int32)
+
+        self.time = np.zeros(n)          # Time of the last zombie tick
+        self.accumulator = np.zeros(n)   # Time since then
+        self.ticks = np.zeros(n, dtype=np.int64)
+
+        # Zombies, one column per slot
+        self.zombie_x = np.zeros((n, z), dtype=np.int32)
+        self.zombie_y = np.zeros((n, z), dtype=np.int32)
+        self.zombie_health = np.zeros((n, z), dtype=np.int16)
+        self.zombie_shocked = np.zeros((n, z), dtype=bool)
+        self.zombie_shock_time = np.zeros((n, z))
+        self.zombie_attack_time = np.zeros((n, z))
+        self.zombie_starred = np.zeros((n, z), dtype=bool)
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self.reset_envs(np.arange(self.num_envs))
+        return self.observations()
+
+    def reset_envs(self, envs):
+        for i in envs.tolist():
+            layout = generate_level(self.level, self.size, rng=self.rng)
+            self.cells[i] = layout.field.cells
+            self.occupant[i] = -1
+            count = len(layout.zombie_positions)
+            self.zombie_health[i] = 0
+            self.zombie_health[i, :count] = ZOMBIE_HEALTH
+            self.zombie_x[i, :count] = layout.zombie_positions[:, 0]
+            self.zombie_y[i, :count] = layout.zombie_positions[:, 1]
+            self.zombie_starred[i] = False
+            if layout.starred >= 0:
+                self.zombie_starred[i, layout.starred] = True
+            self.occupant[i, layout.zombie_positions[:, 1],
+                          layout.zombie_positions[:, 0]] = np.arange(count)
+        # Pools start flowing where they border empty cells or each other,
+        # like FluidFlow.seed()
+        cells = self.cells[envs]
+        water, lava = cells == Cell.WATER, cells == Cell.LAVA
+        empty = cells == Cell.EMPTY
+        self.water_frontier[envs] = water & dilate(empty | lava)
+        self.lava_frontier[envs] = lava & dilate(empty | water)
+        self.zombie_shocked[envs] = False
+        self.zombie_shock_time[envs] = 0.0
+        self.zombie_attack_time[envs] = -ATTACK_COOLDOWN
+        self.player_x[envs] = 0
+        self.player_y[envs] = 0
+        self.player_facing[envs] = DIRECTION_NAMES.index('down')
+        self.player_inventory[envs] = 0
+        self.player_blue_ore[envs] = 0
+        self.player_green_ore[envs] = 0
+        self.player_health[envs] = PLAYER_HEALTH
+        self.has_bucket[envs] = False
+        self.bucket[envs] = BUCKET_EMPTY
+        self.kills[envs] = 0
+        self.time[envs] = 0.0
+        self.accumulator[envs] = 0.0
+        self.ticks[envs] = 0
+
+    def observations(self):
+        return {
+            'cells': self.cells.copy(),
+            'zombies': self.occupant >= 0,
+            'player': np.stack((self.player_x, self.player_y), axis=1),
+            'state': np.stack((self.player_inventory, self.player_blue_ore,
+                               self.player_green_ore, self.player_health,
+                               self.has_bucket, self.bucket, self.player_facing),
+                              axis=1).astype(np.int32),
+        }
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        n = self.num_envs
+        self.reward = np.zeros(n)
+        self.won = np.zeros(n, dtype=bool)
+        self.died = np.zeros(n, dtype=bool)
+
+        self.apply_actions(actions)
+
+        # Run the zombie ticks that fall into this step, like FixedTimestep
+        self.accumulator += self.action_time
+        ticks = (self.accumulator // ZOMBIE_TICK).astype(np.int64)
+        self.accumulator -= ticks * ZOMBIE_TICK
+        for k in range(int(ticks.max())):
+            envs = np.flatnonzero((ticks > k) & ~self.won & ~self.died)
+            if len(envs):
+                self.tick(envs)
+
+        terminated = self.won | self.died
+        truncated = ~terminated & (self.time + self.accumulator >= self.time_limit)
+        self.reward += REWARD_WIN * self.won + REWARD_DEATH * self.died
+        info = {'won': self.won, 'kills': self.kills.copy(),
+                'time': self.time + self.accumulator}
+        ended = np.flatnonzero(terminated | truncated)
+        if len(ended):
+            self.reset_envs(ended)
+        return self.observations(), self.reward, terminated, truncated, info
+
+    def touch(self, envs, xs, ys):
+        # Cells (x, y) of envs changed: they and their fluid neighbours
+        # may flow again
+        size = self.size
+        for dx, dy in ((0, 0),) + ADJACENT:
+            nx, ny = xs + dx, ys + dy
+            inside = (nx >= 0) & (nx < size) & (ny >= 0) & (ny < size)
+            e, nx, ny = envs[inside], nx[inside], ny[inside]
+            cell = self.cells[e, ny, nx]
+            water = cell == Cell.WATER
+            self.water_frontier[e[water], ny[water], nx[water]] = True
+            lava = cell == Cell.LAVA
+            self.lava_frontier[e[lava], ny[lava], nx[lava]] = True
+
+    def apply_actions(self, actions):
+        size = self.size
+        cells = self.cells
+        px, py = self.player_x, self.player_y
+
+        # Moves (move_player)
+        direction = MOVE_DIRECTION[actions]
+        e = np.flatnonzero(direction >= 0)
+        if len(e):
+            d = direction[e]
+            tx, ty = px[e] + DX[d], py[e] + DY[d]
+            inside = (tx >= 0) & (tx < size) & (ty >= 0) & (ty < size)
+            e, d, tx, ty = e[inside], d[inside], tx[inside], ty[inside]
+            self.player_facing[e] = d
+            target = cells[e, ty, tx]
+            can_move = (self.occupant[e, ty, tx] < 0) & (target != Cell.MATERIAL)
+            e, tx, ty, target = e[can_move], tx[can_move], ty[can_move], target[can_move]
+            px[e] = tx
+            py[e] = ty
+            lava = target == Cell.LAVA
+            self.player_health[e[lava]] = 0
+            self.died[e[lava]] = True
+            self.won[e[(target == Cell.OBSIDIAN) & (self.player_blue_ore[e] >= 2)]] = True
+            blue = (target == Cell.BLUE_ORE) + 2 * (target == Cell.DOUBLE_BLUE_ORE)
+            self.player_blue_ore[e] += blue
+            self.reward[e] += REWARD_BLUE_ORE * blue
+            green = target == Cell.GREEN_ORE
+            self.player_green_ore[e] += green
+            collected = (blue > 0) | green
+            cells[e[collected], ty[collected], tx[collected]] = Cell.EMPTY
+            self.touch(e[collected], tx[collected], ty[collected])
+
+        # Hits (action_on_direction): a zombie there, or else material
+        direction = HIT_DIRECTION[actions]
+        e = np.flatnonzero(direction >= 0)
+        if len(e):
+            d = direction[e]
+            tx, ty = px[e] + DX[d], py[e] + DY[d]
+            inside = (tx >= 0) & (tx < size) & (ty >= 0) & (ty < size)
+            e, tx, ty = e[inside], tx[inside], ty[inside]
+            slot = self.occupant[e, ty, tx].astype(np.int64)
+            hit = slot >= 0
+            self.hit_zombies(e[hit], slot[hit])
+            mine = ~hit & (cells[e, ty, tx] == Cell.MATERIAL)
+            e, tx, ty = e[mine], tx[mine], ty[mine]
+            cells[e, ty, tx] = Cell.EMPTY
+            self.touch(e, tx, ty)
+            self.player_inventory[e] += 1
+
+        # place_material, at the player's own cell
+        e = np.flatnonzero((actions == Action.PLACE_MATERIAL) & (self.player_inventory > 0))
+        e = e[cells[e, py[e], px[e]] == Cell.EMPTY]
+        cells[e, py[e], px[e]] = Cell.MATERIAL
+        self.player_inventory[e] -= 1
+
+        # place_green_ore_in_front
+        e = np.flatnonzero((actions == Action.PLACE_GREEN_ORE) & (self.player_green_ore > 0))
+        d = self.player_facing[e]
+        tx, ty = px[e] + DX[d], py[e] + DY[d]
+        inside = (tx >= 0) & (tx < size) & (ty >= 0) & (ty < size)
+        e, tx, ty = e[inside], tx[inside], ty[inside]
+        empty = cells[e, ty, tx] == Cell.EMPTY
+        e, tx, ty = e[empty], tx[empty], ty[empty]
+        cells[e, ty, tx] = Cell.GREEN_ORE
+        self.player_green_ore[e] -= 1
+
+        # craft_bucket
+        e = np.flatnonzero((actions == Action.CRAFT_BUCKET) & ~self.has_bucket &
+                           (self.player_green_ore >= 1))
+        self.player_green_ore[e] -= 1
+        self.has_bucket[e] = True
+
+        # fill_bucket and pour_bucket check the neighbours in a fixed order
+        # and use the first that matches
+        fill = (actions == Action.FILL_BUCKET) & self.has_bucket & (self.bucket == BUCKET_EMPTY)
+        pour = (actions == Action.POUR_BUCKET) & self.has_bucket & (self.bucket != BUCKET_EMPTY)
+        for dx, dy in ADJACENT:
+            if not (fill.any() or pour.any()):
+                break
+            tx, ty = px + dx, py + dy
+            inside = (tx >= 0) & (tx < size) & (ty >= 0) & (ty < size)
+            cell = np.where(inside, cells[np.arange(self.num_envs),
+                                          np.clip(ty, 0, size - 1),
+                                          np.clip(tx, 0, size - 1)], Cell.EMPTY)
+            filled = fill & ((cell == Cell.WATER) | (cell == Cell.LAVA))
+            self.bucket[filled] = np.where(cell[filled] == Cell.LAVA, BUCKET_LAVA, BUCKET_WATER)
+            fill &= ~filled
+            opposite = np.where(self.bucket == BUCKET_LAVA, Cell.WATER, Cell.LAVA)
+            poured = pour & (cell == opposite)
+            e = np.flatnonzero(poured)
+            cells[e, ty[e], tx[e]] = Cell.OBSIDIAN
+            self.bucket[e] = BUCKET_EMPTY
+            self.reward[e] += REWARD_OBSIDIAN
+            pour &= ~poured
+
+    def hit_zombies(self, envs, slots):
+        # hit_zombie for one zombie in each of envs
+        now = self.time[envs] + self.accumulator[envs]
+        self.zombie_health[envs, slots] -= 1
+        self.zombie_shocked[envs, slots] = True
+        self.zombie_shock_time[envs, slots] = now
+        dead = self.zombie_health[envs, slots] <= 0
+        envs, slots = envs[dead], slots[dead]
+        x, y = self.zombie_x[envs, slots], self.zombie_y[envs, slots]
+        self.zombie_health[envs, slots] = 0
+        self.occupant[envs, y, x] = -1
+        self.cells[envs, y, x] = np.where(self.zombie_starred[envs, slots],
+                                          Cell.DOUBLE_BLUE_ORE, Cell.BLUE_ORE)
+        self.kills[envs] += 1
+
+    def tick(self, envs):
+        self.time[envs] += ZOMBIE_TICK
+        self.move_zombies(envs)
+        self.zombie_attack(envs)
+        self.ticks[envs] += 1
+        self.flow_fluids(envs)
+
+    def distance_layers(self, envs):
+        # BFS out from the player through walkable cells, for all envs at
+        # once on bitboards: every row of the grid is one uint64 with a bit
+        # per cell. Returns a (steps, envs, rows) stack where layer k holds
+        # the cells exactly k steps from the player. An env drops out of
+        # the search once all its active zombies are labelled or its wave
+        # stops, so the few envs with large open areas don't slow down the
+        # rest.
+        m = len(envs)
+        rows = np.arange(m)
+        row_mask = np.uint64((1 << self.size) - 1)
+        frontier = np.zeros((m, self.size), dtype=np.uint64)
+        frontier[rows, self.player_y[envs]] = ONE << self.player_x[envs].astype(np.uint64)
+        layers = [frontier]
+        active = (self.zombie_health[envs] > 0) & ~self.zombie_shocked[envs]
+        row, slot = np.nonzero(active)
+        zx = self.zombie_x[envs][row, slot].astype(np.uint64)
+        zy = self.zombie_y[envs][row, slot]
+
+        # Working set: envs still searching, their wave and unvisited cells
+        work = rows
+        unvisited = pack_rows(walkable(self.cells[envs])) & ~frontier
+        place = row  # Row of each zombie's env in the working set
+        while True:
+            found = ((unvisited[place, zy] >> zx) & ONE) == 0
+            searching = np.zeros(m, dtype=bool)
+            searching[row[~found]] = True
+            keep = searching[work] & frontier.any(axis=1)
+            if not keep.all():
+                work, frontier, unvisited = work[keep], frontier[keep], unvisited[keep]
+                if not len(work):
+                    break
+                position = np.full(m, -1)
+                position[work] = np.arange(len(work))
+                pending = position[row] >= 0
+                row, zx, zy = row[pending], zx[pending], zy[pending]
+                place = position[row]
+            grown = ((frontier << ONE) | (frontier >> ONE)) & row_mask
+            grown[:, 1:] |= frontier[:, :-1]
+            grown[:, :-1] |= frontier[:, 1:]
+            frontier = grown & unvisited
+            unvisited &= ~frontier
+            layer = np.zeros((m, self.size), dtype=np.uint64)
+            layer[work] = frontier
+            layers.append(layer)
+        return np.stack(layers)
+
+    def move_zombies(self, envs):
+        size = self.size
+        layers = self.distance_layers(envs)
+        rows = np.arange(len(envs))
+
+        def distance(r, x, y):
+            # Steps from (x, y) to the player, -1 if unreachable
+            bits = (layers[:, r, y] >> x.astype(np.uint64)) & ONE
+            return np.where(bits.any(axis=0), bits.argmax(axis=0), -1)
+
+        def in_layer(k, r, x, y):
+            return ((layers[k, r, y] >> x.astype(np.uint64)) & ONE).astype(bool)
+
+        # Zombies move one slot at a time, so each sees the cells taken by
+        # the ones before it, like GameState.move_zombies
+        for j in range(self.max_zombies):
+            active = (self.zombie_health[envs, j] > 0) & ~self.zombie_shocked[envs, j]
+            r = rows[active]
+            e = envs[active]
+            if not len(e):
+                continue
+            x, y = self.zombie_x[e, j], self.zombie_y[e, j]
+            here = distance(r, x, y)
+            nx, ny = x[:, None] + DX, y[:, None] + DY
+            inside = (nx >= 0) & (nx < size) & (ny >= 0) & (ny < size)
+            cx, cy = np.clip(nx, 0, size - 1), np.clip(ny, 0, size - 1)
+            ee, rr = e[:, None], r[:, None]
+            free = inside & (self.occupant[ee, cy, cx] < 0)
+            is_player = (nx == self.player_x[ee]) & (ny == self.player_y[ee])
+            reachable = (here > 0)[:, None]
+            # A step closer (possibly onto the player, which means staying
+            # to attack), or a random walk when the player can't be reached
+            closer = free & reachable & in_layer(np.maximum(here, 1)[:, None] - 1, rr, cx, cy)
+            wander = free & WALKABLE[self.cells[ee, cy, cx]] & ~is_player
+            options = np.where(reachable, closer, wander)
+            keys = np.where(options, self.rng.random(options.shape), -1.0)
+            choice = keys.argmax(axis=1)
+            pick = np.arange(len(e))
+            moves = options[pick, choice] & ~is_player[pick, choice]
+            e, choice, x, y = e[moves], choice[moves], x[moves], y[moves]
+            nx, ny = x + DX[choice], y + DY[choice]
+            self.occupant[e, y, x] = -1
+            self.occupant[e, ny, nx] = j
+            self.zombie_x[e, j] = nx
+            self.zombie_y[e, j] = ny
+            green = self.cells[e, ny, nx] == Cell.GREEN_ORE
+            self.cells[e[green], ny[green], nx[green]] = Cell.BLUE_ORE
+
+    def zombie_attack(self, envs):
+        now = self.time[envs][:, None]
+        alive = self.zombie_health[envs] > 0
+        ready = (alive & ~self.zombie_shocked[envs] &
+                 (now - self.zombie_attack_time[envs] >= ATTACK_COOLDOWN) &
+                 (np.abs(self.zombie_x[envs] - self.player_x[envs][:, None]) <= 1) &
+                 (np.abs(self.zombie_y[envs] - self.player_y[envs][:, None]) <= 1))
+        self.zombie_attack_time[envs] = np.where(ready, now, self.zombie_attack_time[envs])
+        self.player_health[envs] -= ready.sum(axis=1).astype(np.int32)
+        self.died[envs[self.player_health[envs] <= 0]] = True
+        self.zombie_shocked[envs] &= now - self.zombie_shock_time[envs] < SHOCK_TIME
+
+    def flow_fluids(self, envs):
+        for kind, every, frontier in ((Cell.WATER, WATER_FLOW_TICKS, self.water_frontier),
+                                      (Cell.LAVA, LAVA_FLOW_TICKS, self.lava_frontier)):
+            if not every:
+                continue
+            e = envs[self.ticks[envs] % every == 0]
+            if len(e):
+                e = e[frontier.reshape(self.num_envs, -1).any(axis=1)[e]]
+            if not len(e):
+                continue
+            cells = self.cells[e]
+            rows = np.arange(len(e))
+            source = frontier[e] & (cells == kind)
+            spread = dilate(source) & (cells == Cell.EMPTY)
+            waiting = np.zeros_like(spread)
+            if kind == Cell.WATER:
+                # Lava next to flowing water hardens
+                hardened = dilate(source) & (cells == Cell.LAVA)
+            else:
+                hardened = source & dilate(cells == Cell.WATER)
+                if not LAVA_FLOW_KILLS_PLAYER:
+                    # Lava waits for the player to step out of its way
+                    player = np.zeros_like(spread)
+                    player[rows, self.player_y[e], self.player_x[e]] = True
+                    waiting = source & dilate(player & spread)
+                    spread &= ~player
+            cells[spread] = kind
+            cells[hardened] = Cell.OBSIDIAN
+            self.cells[e] = cells
+            frontier[e] = spread | waiting
+            if kind == Cell.LAVA:
+                # Lava flowing over the player or a zombie kills it
+                burnt = spread[rows, self.player_y[e], self.player_x[e]]
+                self.player_health[e[burnt]] = 0
+                self.died[e[burnt]] = True
+                row, y, x = np.nonzero(spread & (self.occupant[e] >= 0))
+                env = e[row]
+                self.zombie_health[env, self.occupant[env, y, x]] = 0
+                self.occupant[env, y, x] = -1
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Measure the throughput of VectorMinerEnv with random actions.')
+    parser.add_argument('--envs', type=int, default=2048)
+    parser.add_argument('--steps', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    env = VectorMinerEnv(args.envs, seed=args.seed)
+    env.reset()
+    rng = np.random.default_rng(args.seed)
+    episodes = 0
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        _, _, terminated, truncated, _ = env.step(rng.integers(0, len(Action), args.envs))
+        episodes += int((terminated | truncated).sum())
+    elapsed = time.perf_counter() - start
+    print(f'{args.envs * args.steps} env steps in {elapsed:.2f}s '
+          f'({args.envs * args.steps / elapsed:.0f} steps/s), {episodes} episodes ended')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import numpy as np
+import os
+import tempfile
+from collections import OrderedDict
+from miner_field import IS_MINABLE, IS_WALKABLE
+from miner_levelgen import generate_level
+
+CHUNK_SIZE = 64                      # Cells per side of a chunk
+MEMORY_BUDGET = 64 * 1024 * 1024     # Bytes of cells kept in memory
+
+
+# A very large field split into CHUNK_SIZE x CHUNK_SIZE chunks that are
+# only generated when something reads them. Each chunk is laid out like a
+# small level (pools, materials, green ores and zombies) from a seed
+# derived from the world seed and the chunk coordinates, so an untouched
+# chunk can be dropped and regenerated identically later. At most
+# memory_budget bytes of chunks stay loaded; the least recently used ones
+# are evicted, and chunks that were changed are written to a cache
+# directory as raw bytes first.
+#
+# Offers the same interface as Field, apart from the whole-grid cells
+# array: use region() to read a rectangle of cells.
+class ChunkedField:
+    def __init__(self, width, height=None, seed=0, level=1,
+                 chunk_size=CHUNK_SIZE, memory_budget=MEMORY_BUDGET,
+                 cache_dir=None, on_generate=None):
+        self.width = width
+        self.height = width if height is None else height
+        self.seed = seed
+        self.level = level
+        self.chunk_size = chunk_size
+        self.max_chunks = max(1, memory_budget // (chunk_size * chunk_size))
+        self.cache_dir = cache_dir
+        # Temporary directory made for the cache when no cache_dir was
+        # given, removed by close() (or once the field is collected)
+        self.spill = None
+        # Called as on_generate(x0, y0, cells, zombie_positions, starred)
+        # the first time a chunk is generated, with the chunk's top-left
+        # corner and cells, the zombie start positions in world
+        # coordinates and the index of the starred one (or -1)
+        self.on_generate = on_generate
+
+        # (cx, cy) -> cells of a loaded chunk, least recently used first
+        self.chunks = OrderedDict()
+        self.modified = set()   # Loaded chunks changed since loading
+        self.cached = set()     # Chunks saved in the cache directory
+        self.generated = set()  # Chunks whose zombies have been spawned
+        self.dirty = set()
+
+    def chunk(self, cx, cy):
+        key = (cx, cy)
+        cells = self.chunks.get(key)
+        if cells is not None:
+            self.chunks.move_to_end(key)
+            return cells
+        if key in self.cached:
+            cells = np.fromfile(self.chunk_path(key), dtype=np.uint8)
+            cells = cells.reshape(self.chunk_size, self.chunk_size)
+        else:
+            cells = self.generate_chunk(cx, cy)
+        self.chunks[key] = cells
+        while len(self.chunks) > self.max_chunks:
+            self.evict()
+        return cells
+
+    def generate_chunk(self, cx, cy):
+        size = self.chunk_size
+        rng = np.random.default_rng((self.seed, cx, cy))
+        # The player starts in the top-left corner of the world
+        player_pos = (0, 0) if (cx, cy) == (0, 0) else None
+        layout = generate_level(self.level, size, player_pos=player_pos, rng=rng)
+        if (cx, cy) not in self.generated:
+            self.generated.add((cx, cy))
+            if self.on_generate is not None:
+                positions = layout.zombie_positions + (cx * size, cy * size)
+                inside = ((positions[:, 0] < self.width) &
+                          (positions[:, 1] < self.height))
+                self.on_generate(cx * size, cy * size, layout.field.cells,
+                                 positions[inside], layout.starred
+                                 if layout.starred >= 0 and inside[layout.starred]
+                                 else -1)
+        # Cells past the world edge (in the last row and column of chunks)
+        # stay in the array but are never read
+        return layout.field.cells
+
+    def evict(self):
+        key, cells = self.chunks.popitem(last=False)
+        if key in self.modified:
+            self.modified.discard(key)
+            if self.cache_dir is None:
+                self.spill = tempfile.TemporaryDirectory(prefix='miner-chunks-')
+                self.cache_dir = self.spill.name
+            cells.tofile(self.chunk_path(key))
+            self.cached.add(key)
+
+    def peek(self, key):
+        # Cells of a chunk without loading it or making it recently used:
+        # from memory, the cache directory or its seed
+        cells = self.chunks.get(key)
+        if cells is not None:
+            return cells
+        if key in self.cached:
+            cells = np.fromfile(self.chunk_path(key), dtype=np.uint8)
+            return cells.reshape(self.chunk_size, self.chunk_size)
+        return self.generate_chunk(*key)
+
+    def changed_chunks(self):
+        # (key, cells) of every chunk that differs from its generated layout
+        for key in sorted(self.modified | self.cached):
+            yield key, self.peek(key)
+
+    def restore_chunk(self, key, cells):
+        # Use cells (e.g. from a snapshot) in place of the chunk's generated
+        # layout. It counts as changed, so it is cached if evicted.
+        self.chunks[key] = cells
+        self.chunks.move_to_end(key)
+        self.modified.add(key)
+        while len(self.chunks) > self.max_chunks:
+            self.evict()
+
+    def close(self):
+        # Remove the temporary cache directory, if one was made. The
+        # changed chunks cached there are lost, so only call this once
+        # the world is no longer played or saved.
+        if self.spill is not None:
+            self.spill.cleanup()
+            self.spill = None
+            self.cache_dir = None
+
+    def chunk_path(self, key):
+        return os.path.join(self.cache_dir, 'chunk_%d_%d.bin' % key)
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def is_generated(self, x, y):
+        # Whether the chunk of (x, y) has been generated, so reading it
+        # doesn't lay out a new part of the world
+        size = self.chunk_size
+        return (x // size, y // size) in self.generated
+
+    def get(self, x, y):
+        size = self.chunk_size
+        return self.chunk(x // size, y // size).item(y % size, x % size)
+
+    def set(self, x, y, cell):
+        size = self.chunk_size
+        key = (x // size, y // size)
+        self.chunk(*key)[y % size, x % size] = cell
+        self.modified.add(key)
+        self.dirty.add((x, y))
+
+    def take_dirty(self):
+        dirty = self.dirty
+        self.dirty = set()
+        return dirty
+
+    def is_walkable(self, x, y):
+        return IS_WALKABLE[self.get(x, y)]
+
+    def is_minable(self, x, y):
+        return IS_MINABLE[self.get(x, y)]
+
+    def region(self, x0, y0, x1, y1):
+        # Cells in [x0, x1) x [y0, y1) as a (rows, cols) array, copied out
+        # of the chunks that overlap it
+        size = self.chunk_size
+        out = np.empty((y1 - y0, x1 - x0), dtype=np.uint8)
+        for cy in range(y0 // size, (y1 - 1) // size + 1):
+            for cx in range(x0 // size, (x1 - 1) // size + 1):
+                cells = self.chunk(cx, cy)
+                left, top = cx * size, cy * size
+                ax0, ay0 = max(x0, left), max(y0, top)
+                ax1, ay1 = min(x1, left + size), min(y1, top + size)
+                out[ay0 - y0:ay1 - y0, ax0 - x0:ax1 - x0] = \
+                    cells[ay0 - top:ay1 - top, ax0 - left:ax1 - left]
+        return out
+
+    def loaded_bytes(self):
+        return len(self.chunks) * self.chunk_size * self.chunk_size
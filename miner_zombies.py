@@ -0,0 +1,130 @@
+import numpy as np
+
+# Per-zombie columns and their types
+COLUMNS = {
+    'x': np.int32,
+    'y': np.int32,
+    'health': np.int16,
+    'shocked': bool,
+    'shock_time': np.float64,
+    'attack_time': np.float64,
+    'starred': bool,
+    # Position before the current tick, for interpolated drawing
+    'prev_x': np.int32,
+    'prev_y': np.int32,
+    # GameState.ticks at which the zombie next plans a path
+    'think_tick': np.int32,
+}
+
+
+# All zombies of a level stored as parallel arrays, one slot per zombie.
+# A zombie is identified by its slot index and stays in its slot after
+# dying (health 0). Living zombies are also indexed by cell so collision
+# and hit checks are dictionary lookups.
+class Zombies:
+    def __init__(self, capacity=16):
+        self.count = 0
+        for name, dtype in COLUMNS.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        # (x, y) -> index of the living zombie standing there
+        self.cells = {}
+
+    def __len__(self):
+        return self.count
+
+    def grow(self, capacity):
+        for name in COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            setattr(self, name, grown)
+
+    def spawn(self, x, y, health, starred=False, attack_time=0.0):
+        if self.count == len(self.x):
+            self.grow(max(16, 2 * self.count))
+        i = self.count
+        self.count += 1
+        self.x[i] = x
+        self.y[i] = y
+        self.health[i] = health
+        self.shocked[i] = False
+        self.shock_time[i] = 0.0
+        self.attack_time[i] = attack_time
+        self.starred[i] = starred
+        self.prev_x[i] = x
+        self.prev_y[i] = y
+        self.think_tick[i] = 0
+        self.cells[(x, y)] = i
+        return i
+
+    def at(self, x, y):
+        # Index of the living zombie at (x, y), or -1
+        return self.cells.get((x, y), -1)
+
+    def position(self, i):
+        return self.x.item(i), self.y.item(i)
+
+    def move(self, i, x, y):
+        del self.cells[(self.x.item(i), self.y.item(i))]
+        self.x[i] = x
+        self.y[i] = y
+        self.cells[(x, y)] = i
+
+    def damage(self, i, now):
+        # Hit a zombie for one point and shock it. Returns True if it died.
+        self.health[i] -= 1
+        self.shocked[i] = True
+        self.shock_time[i] = now
+        if self.health[i] <= 0:
+            self.kill(i)
+            return True
+        return False
+
+    def kill(self, i):
+        self.health[i] = 0
+        self.cells.pop((self.x.item(i), self.y.item(i)), None)
+
+    # Vectorized queries over all zombies
+
+    def alive(self):
+        return self.health[:self.count] > 0
+
+    def living(self):
+        return np.flatnonzero(self.alive())
+
+    def active(self):
+        # Living zombies that aren't shocked
+        return np.flatnonzero(self.alive() & ~self.shocked[:self.count])
+
+    def begin_tick(self):
+        self.prev_x[:self.count] = self.x[:self.count]
+        self.prev_y[:self.count] = self.y[:self.count]
+
+    def living_positions(self, x0=None, y0=None, x1=None, y1=None, alpha=1.0):
+        # x and y lists of living zombies, optionally only those inside
+        # the cell range [x0, x1) x [y0, y1). With alpha below 1 the
+        # positions are interpolated from where each zombie was before the
+        # last tick.
+        xs = self.x[:self.count]
+        ys = self.y[:self.count]
+        keep = self.alive()
+        if x0 is not None:
+            keep &= (xs >= x0) & (xs < x1) & (ys >= y0) & (ys < y1)
+        if alpha < 1.0:
+            prev_xs = self.prev_x[:self.count][keep]
+            prev_ys = self.prev_y[:self.count][keep]
+            return ((prev_xs + (xs[keep] - prev_xs) * alpha).tolist(),
+                    (prev_ys + (ys[keep] - prev_ys) * alpha).tolist())
+        return xs[keep].tolist(), ys[keep].tolist()
+
+    def attackers(self, x, y, now, cooldown):
+        # Active zombies next to (x, y) whose attack cooldown has passed
+        n = self.count
+        ready = (self.alive() & ~self.shocked[:n] &
+                 (now - self.attack_time[:n] >= cooldown) &
+                 (np.abs(self.x[:n] - x) <= 1) & (np.abs(self.y[:n] - y) <= 1))
+        return np.flatnonzero(ready)
+
+    def expire_shocks(self, now, duration):
+        n = self.count
+        self.shocked[:n] &= now - self.shock_time[:n] < duration
@@ -0,0 +1,67 @@
+from collections import deque
+import numpy as np
+import pytest
+from miner_components import Components
+from miner_field import Cell, Field
+
+# Regions kept up to date through any mix of cells opening and closing
+# have to match a labelling of the field from scratch.
+
+
+def bfs_labels(field):
+    # Region of every walkable cell by flood fill, -1 elsewhere
+    labels = np.full((field.height, field.width), -1)
+    count = 0
+    for y in range(field.height):
+        for x in range(field.width):
+            if labels[y, x] >= 0 or not field.is_walkable(x, y):
+                continue
+            labels[y, x] = count
+            queue = deque([(x, y)])
+            while queue:
+                cx, cy = queue.popleft()
+                for nx, ny in ((cx+1, cy), (cx-1, cy), (cx, cy+1), (cx, cy-1)):
+                    if (field.in_bounds(nx, ny) and labels[ny, nx] < 0 and
+                            field.is_walkable(nx, ny)):
+                        labels[ny, nx] = count
+                        queue.append((nx, ny))
+            count += 1
+    return labels
+
+
+def check_labels(field, components):
+    # Same region exactly when the flood fill says so. Returns the flood
+    # fill's labels and the region of each of its labels.
+    expected = bfs_labels(field)
+    components.settle()
+    pairs = set()
+    for y in range(field.height):
+        for x in range(field.width):
+            pairs.add((int(expected[y, x]), components.label(x, y)))
+    assert len({a for a, b in pairs}) == len(pairs) == len({b for a, b in pairs})
+    assert ((expected < 0) == (components.labels < 0)).all()
+    return expected, dict(pairs)
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_edits_match_flood_fill(seed):
+    rng = np.random.default_rng(seed)
+    size = int(rng.integers(4, 14))
+    # Mostly open or mostly walled, so regions both split and merge
+    closed = [0.3, 0.6][seed % 2]
+    cells = np.where(rng.random((size, size)) < closed, Cell.MATERIAL, Cell.EMPTY)
+    field = Field(size, cells=cells.astype(np.uint8))
+    components = Components(field)
+    for n in range(300):
+        x, y = int(rng.integers(size)), int(rng.integers(size))
+        field.set(x, y, Cell.MATERIAL if field.is_walkable(x, y) else Cell.EMPTY)
+        components.changed(x, y)
+        if n % 7:
+            continue  # Let several edits pile up between queries
+        expected, region = check_labels(field, components)
+        # around() holds the regions next to the cell as well
+        x, y = int(rng.integers(size)), int(rng.integers(size))
+        near = [(x, y), (x+1, y), (x-1, y), (x, y+1), (x, y-1)]
+        regions = {region[int(expected[cy, cx])] for cx, cy in near
+                   if field.in_bounds(cx, cy) and expected[cy, cx] >= 0}
+        assert components.around(x, y) == regions
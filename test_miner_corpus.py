@@ -0,0 +1,130 @@
+import random
+import numpy as np
+from miner_corpus import (Corpus, EMPTY_SLOT, check_layout, hash_table, layout_for, slot_of,
+                          write_corpus)
+from miner_engine import GRID_SIZE
+from miner_field import Cell, Field
+from miner_levelgen import Level
+
+# A corpus has to find every level it holds by its seed, including seeds
+# that share a home slot, and find nothing for the seeds it doesn't hold.
+# The levels going into it are checked first, and the check has to turn
+# down the ones that can't be won.
+
+
+def seeds_in_slot(slot, bits, count, taken=()):
+    # The first count seeds whose home slot is slot
+    seeds = []
+    seed = 0
+    while len(seeds) < count:
+        if slot_of(seed, bits) == slot and seed not in taken:
+            seeds.append(seed)
+        seed += 1
+    return seeds
+
+
+def probe(keys, values, seed):
+    # Corpus.index() on a bare table
+    bits = len(keys).bit_length() - 1
+    slot = slot_of(seed, bits)
+    while keys[slot] != EMPTY_SLOT:
+        if keys[slot] == seed:
+            return values[slot]
+        slot = (slot + 1) % len(keys)
+    return -1
+
+
+def test_hash_table_collisions():
+    # Four seeds take a table of 8 slots. Two share the last slot, so the
+    # second wraps round to the first slot, where a third seed has its
+    # home and gets pushed along too.
+    last = seeds_in_slot(7, 3, 3)
+    first = seeds_in_slot(0, 3, 2)
+    seeds = last[:2] + first
+    keys, values = hash_table(seeds)
+    assert len(keys) == 8
+    assert keys.tolist()[:3] == [last[1], first[0], first[1]]
+    for index, seed in enumerate(seeds):
+        assert probe(keys, values, seed) == index
+    # A seed that isn't in it follows the same chain to an empty slot
+    assert probe(keys, values, last[2]) == -1
+
+    keys, values = hash_table([])
+    assert keys.tolist() == [EMPTY_SLOT, EMPTY_SLOT]
+    assert probe(keys, values, 3) == -1
+
+
+def test_build_then_lookup(tmp_path):
+    # Level 2 has seeds that collide; level 3 kept no levels at all
+    seeds = seeds_in_slot(7, 3, 3) + seeds_in_slot(0, 3, 1)
+    good = []
+    for seed in seeds[:2] + seeds[3:]:
+        layout = layout_for(2, seed)
+        good.append((seed, layout.field.cells, layout.zombie_positions, layout.starred))
+    path = tmp_path / 'levels.corpus'
+    write_corpus(path, GRID_SIZE, {2: good, 3: []})
+
+    corpus = Corpus(path)
+    assert len(corpus) == 3 and corpus.count(3) == 0
+    for index, (seed, cells, positions, starred) in enumerate(good):
+        assert corpus.index(2, seed) == index
+        level = corpus.get(2, seed)
+        assert np.array_equal(level.field.cells, cells)
+        assert np.array_equal(level.zombie_positions, positions)
+        assert level.starred == starred
+    assert corpus.get(2, seeds[2]) is None   # Not kept, same home slot
+    assert corpus.get(3, seeds[0]) is None   # Kept nothing
+    assert corpus.get(4, seeds[0]) is None   # Not built
+    assert corpus.pick(3, random.Random(0)) is None
+    assert corpus.pick(2, random.Random(0)) in seeds
+
+
+def walled_level(left, right, zombies=(), starred=-1):
+    # A 10x10 level split by a wall of lava down column 5, with the cells
+    # in left placed on the player's side and those in right beyond it,
+    # as {(x, y): cell} with x counted from the wall
+    cells = np.full((10, 10), Cell.EMPTY, dtype=np.uint8)
+    cells[:, 5] = Cell.LAVA
+    for (x, y), cell in left.items():
+        cells[y, 4 - x] = cell
+    for (x, y), cell in right.items():
+        cells[y, 6 + x] = cell
+    positions = np.array(zombies, dtype=np.int32).reshape(-1, 2)
+    return Level(1, Field(10, cells=cells), positions, starred)
+
+
+BLUE_ORES = {(0, 0): Cell.BLUE_ORE, (0, 1): Cell.BLUE_ORE}
+
+
+def test_check_accepts_winnable_levels():
+    assert check_layout(walled_level({**BLUE_ORES, (1, 3): Cell.OBSIDIAN}, {})) == []
+    # A green ore and water on the player's side; the lava wall is the
+    # lava to pour it on
+    assert check_layout(walled_level(
+        {**BLUE_ORES, (1, 3): Cell.GREEN_ORE, (2, 3): Cell.WATER}, {})) == []
+
+
+def test_check_rejects_walled_off_obsidian():
+    # Obsidian and green ore beyond the lava don't count
+    level = walled_level(BLUE_ORES, {(1, 3): Cell.OBSIDIAN, (2, 3): Cell.GREEN_ORE})
+    assert check_layout(level) == ['no green ore']
+    # Nor does water there, with the green ore on the player's side
+    level = walled_level({**BLUE_ORES, (1, 3): Cell.GREEN_ORE},
+                         {(1, 3): Cell.OBSIDIAN, (2, 3): Cell.WATER})
+    assert check_layout(level) == ['no water or lava']
+
+
+def test_check_rejects_too_few_blue_ores():
+    # One blue ore in reach; the double blue ore and the zombies,
+    # starred one included, are beyond the lava
+    level = walled_level({(0, 0): Cell.BLUE_ORE, (1, 3): Cell.OBSIDIAN},
+                         {(1, 1): Cell.DOUBLE_BLUE_ORE},
+                         zombies=[(8, 4), (9, 4)], starred=0)
+    assert check_layout(level) == ['too few blue ores']
+    # A zombie in reach makes up the second
+    level = walled_level({(0, 0): Cell.BLUE_ORE, (1, 3): Cell.OBSIDIAN}, {},
+                         zombies=[(2, 6)])
+    assert check_layout(level) == []
+    # Everything missing at once
+    assert check_layout(walled_level({}, {(1, 3): Cell.OBSIDIAN})) == \
+        ['no green ore', 'too few blue ores']
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+import miner_engine
+from miner_engine import (AI_STUCK_INTERVAL, AI_UNFINISHED_INTERVAL, Action, FlowField,
+                          GameState, SearchBudget, ZOMBIE_HEALTH, ZOMBIE_TICK, find_path)
+from miner_field import Cell, Field
+from miner_zombies import Zombies
+
+# The zombie AI's work budget: searches stop where it runs out and carry
+# on later, without counting as having found no path, and zombies that
+# did find none plan again as soon as the terrain opens up.
+
+
+def open_state(size, positions, wall=None):
+    # An empty field with zombies at positions, and a wall of material
+    # down column wall
+    cells = np.full((size, size), Cell.EMPTY, dtype=np.uint8)
+    if wall is not None:
+        cells[:, wall] = Cell.MATERIAL
+    state = GameState(seed=1, field=Field(size, cells=cells))
+    state.player_health = 10 ** 6
+    state.zombies = Zombies()
+    for x, y in positions:
+        state.zombies.spawn(x, y, ZOMBIE_HEALTH)
+    return state
+
+
+def test_searches_stop_at_the_budget():
+    field = Field(30)
+    budget = SearchBudget(50)
+    assert find_path((29, 29), (0, 0), field, budget=budget) is None
+    assert budget.spent
+    budget = SearchBudget(10 ** 4)
+    path = find_path((29, 29), (0, 0), field, budget=budget)
+    assert len(path) == 58 and not budget.spent
+
+    # The flow field reaches the nearer targets first
+    budget = SearchBudget(100)
+    flow = FlowField(field, (0, 0), [(3, 3), (29, 29)], budget=budget)
+    assert not flow.complete and budget.spent
+    assert flow.distance_at(3, 3) == 6 and flow.distance_at(29, 29) == -1
+    flow = FlowField(field, (0, 0), [(3, 3), (29, 29)], budget=SearchBudget(10 ** 4))
+    assert flow.complete and flow.distance_at(29, 29) == 58
+
+
+@pytest.mark.parametrize('mode', ['bfs', 'incremental'])
+def test_work_is_shared_round_robin(monkeypatch, mode):
+    # A tick's budget covers one or two of the searches: the zombies take
+    # turns, and every one of them gets to move towards the player
+    monkeypatch.setattr(miner_engine, 'ZOMBIE_PATHFINDING', mode)
+    monkeypatch.setattr(miner_engine, 'AI_PLAN_BUDGET', 2000)
+    positions = [(39, y) for y in range(0, 40, 5)]
+    state = open_state(40, positions)
+    for _ in range(40):
+        expansions = sum(planner.expansions for planner in state.planners.values())
+        state.step(Action.NONE, ZOMBIE_TICK)
+        if mode == 'incremental':
+            used = sum(planner.expansions for planner in state.planners.values())
+            assert used - expansions <= 2000
+    zombies = state.zombies
+    assert (zombies.x[:zombies.count] < 39).all()
+
+
+def test_unfinished_search_is_not_stuck(monkeypatch):
+    # A search carried over several ticks, planning again on each
+    monkeypatch.setattr(miner_engine, 'ZOMBIE_PATHFINDING', 'incremental')
+    monkeypatch.setattr(miner_engine, 'AI_PLAN_BUDGET', 10)
+    state = open_state(20, [(19, 19)])
+    zombies = state.zombies
+    state.step(Action.NONE, ZOMBIE_TICK)
+    ticks = 0
+    while not state.planners[0].compute(0):
+        assert zombies.think_tick[0] == state.ticks - 1 + AI_UNFINISHED_INTERVAL
+        state.step(Action.NONE, ZOMBIE_TICK)
+        ticks += 1
+    assert ticks > 1
+    # Then it steps closer
+    x, y = zombies.position(0)
+    state.step(Action.NONE, ZOMBIE_TICK)
+    assert sum(zombies.position(0)) == x + y - 1
+
+
+@pytest.mark.parametrize('mode', ['flow_field', 'bfs', 'incremental'])
+def test_mining_wakes_walled_off_zombies(monkeypatch, mode):
+    monkeypatch.setattr(miner_engine, 'ZOMBIE_PATHFINDING', mode)
+    state = open_state(12, [(11, 0)], wall=5)
+    state.player_pos = [4, 0]
+    state.step(Action.NONE, ZOMBIE_TICK)
+    zombies = state.zombies
+    assert zombies.think_tick[0] == state.ticks - 1 + AI_STUCK_INTERVAL
+    # Mining through the wall lets it plan on the very next tick
+    state.step(Action.HIT_RIGHT, 0.0)
+    assert zombies.think_tick[0] <= state.ticks
+    x = zombies.x[0]
+    state.step(Action.NONE, ZOMBIE_TICK)
+    assert zombies.x[0] == x - 1
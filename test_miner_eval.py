@@ -0,0 +1,17 @@
+from miner_eval import ACTION_TIME, TIME_LIMIT, ScriptedBot
+from miner_engine import GameState
+from miner_world import ChunkedField
+
+# The scripted bot plays the same levels in a chunked world as on a
+# grid, looking at the cells around the player.
+
+
+def test_bot_plays_chunked_world():
+    for seed in range(2):
+        state = GameState(level=1, world=ChunkedField(1024, seed=seed, chunk_size=32),
+                          seed=seed)
+        bot = ScriptedBot()
+        while not state.done and state.now < TIME_LIMIT:
+            state.step(bot.act(state), ACTION_TIME)
+        assert state.level_complete
+        state.close()
@@ -0,0 +1,66 @@
+from collections import deque
+import numpy as np
+import pytest
+from miner_field import Cell, Field
+from miner_planner import DStarLite
+
+# A D* Lite search repaired after any mix of terrain edits and moves of
+# the start and goal has to give the same distance as a search from
+# scratch.
+
+
+def bfs_distance(field, start, goal):
+    # Steps from start to goal through walkable cells (the goal itself is
+    # always let in), or -1
+    distance = {goal: 0}
+    queue = deque([goal])
+    while queue:
+        x, y = queue.popleft()
+        for nx, ny in ((x+1, y), (x-1, y), (x, y+1), (x, y-1)):
+            if (field.in_bounds(nx, ny) and (nx, ny) not in distance and
+                    field.is_walkable(nx, ny)):
+                distance[(nx, ny)] = distance[(x, y)] + 1
+                queue.append((nx, ny))
+    return distance.get(start, -1)
+
+
+def random_cell(field, rng):
+    return int(rng.integers(field.width)), int(rng.integers(field.height))
+
+
+@pytest.mark.parametrize('budget', [None, 7])
+@pytest.mark.parametrize('seed', range(6))
+def test_repairs_match_bfs(seed, budget):
+    rng = np.random.default_rng(seed)
+    size = int(rng.integers(5, 16))
+    kinds = [Cell.EMPTY, Cell.EMPTY, Cell.MATERIAL, Cell.WATER, Cell.LAVA]
+    field = Field(size, cells=rng.choice(kinds, (size, size)).astype(np.uint8))
+    start, goal = random_cell(field, rng), random_cell(field, rng)
+    planner = DStarLite(field, start, goal)
+    for _ in range(150):
+        what = rng.integers(4)
+        if what == 0:
+            # Open or close a few cells
+            for _ in range(int(rng.integers(1, 4))):
+                x, y = random_cell(field, rng)
+                field.set(x, y, Cell.MATERIAL if field.is_walkable(x, y) else Cell.EMPTY)
+                planner.changed(x, y)
+        elif what == 1:
+            # The zombie steps to a neighbour, or anywhere
+            x, y = planner.start
+            step = [(x+1, y), (x-1, y), (x, y+1), (x, y-1), random_cell(field, rng)]
+            cell = step[rng.integers(len(step))]
+            if field.in_bounds(*cell):
+                planner.move_start(cell)
+        elif what == 2:
+            cell = random_cell(field, rng)
+            if cell != planner.goal:
+                planner.move_goal(cell)
+        while not planner.compute(budget):
+            pass
+        expected = bfs_distance(field, planner.start, planner.goal)
+        assert planner.distance() == expected
+        if expected > 0:
+            # Its next step really is one closer
+            step = planner.next_step()
+            assert bfs_distance(field, step, planner.goal) == expected - 1
@@ -0,0 +1,34 @@
+import time
+import miner_prefetch
+from miner_prefetch import LevelPrefetcher
+
+# Closing a prefetcher closes the levels it built that were never handed
+# out: the one waiting in the queue and the one it was about to queue.
+
+
+class Level:
+    def __init__(self, settings):
+        self.settings = settings
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_close_closes_unplayed_levels(monkeypatch):
+    built = []
+
+    def make_state(settings):
+        built.append(Level(settings))
+        return built[-1]
+
+    monkeypatch.setattr(miner_prefetch, 'make_state', make_state)
+    prefetcher = LevelPrefetcher(range(10), depth=1)
+    settings, played = prefetcher.next()
+    deadline = time.monotonic() + 5
+    while len(built) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)  # Level 1 queued, level 2 waiting for room
+    prefetcher.close()
+    assert [level.settings for level in built] == [0, 1, 2]
+    assert not played.closed
+    assert all(level.closed for level in built[1:])
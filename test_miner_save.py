@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+import miner_engine
+from miner_engine import Action, GameState, ZOMBIE_TICK
+from miner_field import Cell
+from miner_replay import state_digest
+from miner_save import load_state, save_state
+from miner_world import ChunkedField
+
+# A snapshot must resume a game exactly: a state saved after some ticks
+# and loaded again has to play on identically to the one that was saved.
+
+# Moves and hits, so the player walks, mines and fights
+ACTIONS = [Action.MOVE_UP, Action.MOVE_DOWN, Action.MOVE_LEFT, Action.MOVE_RIGHT,
+           Action.MOVE_RIGHT, Action.MOVE_DOWN, Action.HIT_UP, Action.HIT_DOWN,
+           Action.HIT_LEFT, Action.HIT_RIGHT, Action.PLACE_MATERIAL]
+
+
+def play(state, rng, steps):
+    for action in rng.choice(ACTIONS, steps).tolist():
+        state.step(Action(action), ZOMBIE_TICK / 2)
+
+
+def check_round_trip(state, path, before=60, after=60):
+    rng = np.random.default_rng(7)
+    play(state, rng, before)
+    save_state(state, path)
+    loaded = load_state(path)
+    assert state_digest(loaded) == state_digest(state)
+    # Both play on with the same actions
+    actions = rng.choice(ACTIONS, after).tolist()
+    for n, action in enumerate(actions):
+        state.step(Action(action), ZOMBIE_TICK / 2)
+        loaded.step(Action(action), ZOMBIE_TICK / 2)
+        if n % 10 == 9:
+            assert state_digest(loaded) == state_digest(state)
+    return loaded
+
+
+@pytest.mark.parametrize('mode', ['flow_field', 'bfs', 'incremental'])
+def test_grid_round_trip(tmp_path, monkeypatch, mode):
+    monkeypatch.setattr(miner_engine, 'ZOMBIE_PATHFINDING', mode)
+    for seed in range(3):
+        state = GameState(level=4, seed=seed)
+        state.player_health = 1000  # Play on past the zombies' attacks
+        loaded = check_round_trip(state, tmp_path / f'{mode}{seed}.sav')
+        assert loaded.ticks == state.ticks
+        if mode == 'incremental':
+            assert sorted(loaded.planners) == sorted(state.planners)
+
+
+@pytest.mark.parametrize('mode', ['flow_field', 'incremental'])
+def test_chunked_round_trip(tmp_path, monkeypatch, mode):
+    # A budget of a few chunks, so chunks get evicted to the cache
+    monkeypatch.setattr(miner_engine, 'ZOMBIE_PATHFINDING', mode)
+    world = ChunkedField(512, seed=5, level=3, chunk_size=16,
+                         memory_budget=4 * 16 * 16, cache_dir=str(tmp_path))
+    state = GameState(level=3, world=world, seed=5)
+    state.player_health = 1000
+    # Move the player over several chunks before saving, letting the
+    # zombies around each place chase it for a while
+    for k in range(1, 7):
+        x, y = 40 * k + 8, 24 * k + 8
+        world.set(x, y, Cell.EMPTY)
+        state.player_pos = [x, y]
+        for _ in range(10):
+            state.step(Action.NONE, ZOMBIE_TICK)
+    assert not state.done and world.cached
+    loaded = check_round_trip(state, tmp_path / 'chunked.sav')
+    assert loaded.field.generated == world.generated
+
+
+def test_digest_covers_chunks():
+    # Terrain that only differs in a chunk away from the player changes
+    # the digest
+    def state():
+        return GameState(world=ChunkedField(256, seed=2, chunk_size=32), seed=2)
+
+    first, second = state(), state()
+    second.field.get(40, 40)
+    first.field.get(40, 40)
+    assert state_digest(first) == state_digest(second)
+    cell = Cell.EMPTY if first.field.get(40, 40) == Cell.MATERIAL else Cell.MATERIAL
+    second.field.set(40, 40, cell)
+    assert state_digest(first) != state_digest(second)
+
+
+def test_save_over_loaded_snapshot(tmp_path):
+    # The loaded grid is mapped from the file being overwritten
+    path = tmp_path / 'miner.sav'
+    state = GameState(level=2, seed=4)
+    save_state(state, path)
+    loaded = load_state(path)
+    loaded.step(Action.HIT_RIGHT, ZOMBIE_TICK)
+    digest = state_digest(loaded)
+    save_state(loaded, path)
+    assert state_digest(loaded) == digest
+    assert state_digest(load_state(path)) == digest
+    assert [p.name for p in tmp_path.iterdir()] == ['miner.sav']
@@ -0,0 +1,102 @@
+import asyncio
+import base64
+import json
+import random
+import numpy as np
+from miner_engine import Action
+from miner_server import Client, GameServer, encode
+
+# A client that applies the tick messages to the last level message it
+# got has to end up with the server's own state, tick after tick and
+# across level changes.
+
+
+class Transport:
+    def get_write_buffer_size(self):
+        return 0
+
+
+class Writer:
+    # Collects what the server sends, in place of a StreamWriter
+    def __init__(self):
+        self.transport = Transport()
+        self.data = []
+        self.closed = False
+
+    def write(self, data):
+        self.data.append(data)
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        lines = b''.join(self.data).splitlines()
+        self.data = []
+        return [json.loads(line) for line in lines]
+
+
+class Mirror:
+    # The game as a client sees it
+    def __init__(self):
+        self.levels = 0
+
+    def apply(self, message):
+        if message['type'] == 'level':
+            self.levels += 1
+            cells = np.frombuffer(base64.b64decode(message['cells']), dtype=np.uint8)
+            self.cells = cells.reshape(message['height'], message['width']).copy()
+            self.zombies = {}
+            self.player = dict(message['player'])
+        elif message['type'] == 'tick':
+            for x, y, kind in message.get('cells', []):
+                self.cells[y, x] = kind
+        else:
+            return
+        for i, x, y, health in message.get('zombies', []):
+            self.zombies[i] = [x, y, health]
+        self.player.update(message.get('player', {}))
+
+    def check(self, server):
+        state = server.state
+        assert np.array_equal(self.cells, state.field.cells)
+        xs, ys, health = server.zombie_columns()
+        assert [self.zombies[i] for i in range(len(xs))] == \
+            [list(zombie) for zombie in zip(xs.tolist(), ys.tolist(), health.tolist())]
+        assert len(self.zombies) == len(xs)
+        assert self.player == server.player_fields()
+
+
+def test_deltas_rebuild_the_state():
+    server = GameServer(grid_size=16, seed=3, tick_rate=2)
+    writer = Writer()
+    server.clients[writer] = client = Client(writer)
+    server.send(writer, encode(server.level_message()))  # As on joining
+    mirror = Mirror()
+    rng = random.Random(3)
+    for _ in range(600):
+        client.actions.append(rng.choice(list(Action)))
+        server.step()
+        if server.state.done:
+            asyncio.run(server.next_level())
+        for message in writer.take():
+            mirror.apply(message)
+        mirror.check(server)
+        if mirror.levels >= 3:
+            break
+    assert mirror.levels >= 3
+
+
+def test_long_line_drops_client():
+    # A line over the reader's limit ends the client, not the server
+    server = GameServer(grid_size=16, seed=3)
+
+    async def connect():
+        reader = asyncio.StreamReader(limit=64)
+        reader.feed_data(b'{"action": "%s"}\n' % (b'x' * 100))
+        reader.feed_eof()
+        writer = Writer()
+        await server.handle(reader, writer)
+        return writer
+
+    writer = asyncio.run(connect())
+    assert writer.closed and writer not in server.clients
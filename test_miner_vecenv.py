@@ -0,0 +1,159 @@
+import numpy as np
+import pytest
+import miner_engine
+from miner_engine import ATTACK_COOLDOWN, Action, GameState, ZOMBIE_HEALTH
+from miner_field import Cell, Field
+from miner_vecenv import (BUCKET_EMPTY, BUCKET_LAVA, DIRECTION_NAMES, VectorMinerEnv,
+                          dilate)
+
+# VectorMinerEnv applies the rules of GameState to many levels at once.
+# Played step by step with the same actions, one of its levels has to end
+# up exactly where a GameState on the same cells does. The random choices
+# of the two differ, so the checks stay clear of them: the player runs
+# into no zombies while fluids flow, and zombies chase through a maze
+# where every cell has one step closer to the player.
+
+BUCKETS = {BUCKET_EMPTY: 'empty', BUCKET_LAVA: 'lava'}
+
+
+def game_on(env, seed):
+    # A GameState on the cells of the env's level, with the same player
+    state = GameState(seed=seed, field=Field(env.size, cells=env.cells[0].copy()))
+    state.player_health = int(env.player_health[0])
+    return state
+
+
+def check_same(env, state):
+    assert np.array_equal(env.cells[0], state.field.cells)
+    assert [int(env.player_x[0]), int(env.player_y[0])] == state.player_pos
+    assert DIRECTION_NAMES[env.player_facing[0]] == state.player_facing
+    assert env.player_inventory[0] == state.player_inventory
+    assert env.player_blue_ore[0] == state.player_blue_ore_inventory
+    assert env.player_green_ore[0] == state.player_green_ore_inventory
+    assert env.player_health[0] == state.player_health
+    assert env.has_bucket[0] == state.player_has_bucket
+    assert BUCKETS.get(int(env.bucket[0]), 'water') == state.bucket_content
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_fluids_and_actions(seed):
+    # Every action, and pools flowing from the start of the level
+    env = VectorMinerEnv(1, level=3, seed=seed)
+    env.reset()
+    env.zombie_health[:] = 0
+    env.occupant[:] = -1
+    state = game_on(env, seed)
+    rng = np.random.default_rng(seed)
+    for action in rng.integers(0, len(Action), 400).tolist():
+        state.step(Action(action), env.action_time)
+        terminated, truncated = env.step([action])[2:4]
+        if terminated[0] or truncated[0]:
+            # The env restarted the level already
+            assert state.done == bool(terminated[0])
+            break
+        check_same(env, state)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_pools_meeting(seed):
+    # Random pools of water and lava everywhere, so they meet each other
+    # on all sides and flow around the player
+    rng = np.random.default_rng(seed)
+    env = VectorMinerEnv(1, grid_size=20, seed=seed)
+    env.reset()
+    kinds = [Cell.EMPTY, Cell.EMPTY, Cell.WATER, Cell.LAVA, Cell.MATERIAL]
+    cells = rng.choice(kinds, (20, 20)).astype(np.uint8)
+    cells[0, 0] = Cell.EMPTY
+    env.cells[0] = cells
+    env.zombie_health[:] = 0
+    env.occupant[:] = -1
+    water, lava, empty = cells == Cell.WATER, cells == Cell.LAVA, cells == Cell.EMPTY
+    env.water_frontier[0] = (water & dilate((empty | lava)[None]))[0]
+    env.lava_frontier[0] = (lava & dilate((empty | water)[None]))[0]
+    state = game_on(env, seed)
+    for _ in range(40):
+        state.step(Action.NONE, env.action_time)
+        env.step([Action.NONE])
+        check_same(env, state)
+
+
+def maze(size, rng):
+    # Material walls around a tree of corridors through the even cells
+    cells = np.full((size, size), Cell.MATERIAL, dtype=np.uint8)
+    cells[0, 0] = Cell.EMPTY
+    stack = [(0, 0)]
+    while stack:
+        x, y = stack[-1]
+        options = [(x + dx, y + dy) for dx, dy in ((2, 0), (-2, 0), (0, 2), (0, -2))
+                   if 0 <= x + dx < size and 0 <= y + dy < size and
+                   cells[y + dy, x + dx] == Cell.MATERIAL]
+        if not options:
+            stack.pop()
+            continue
+        nx, ny = options[rng.integers(len(options))]
+        cells[(y + ny) // 2, (x + nx) // 2] = Cell.EMPTY
+        cells[ny, nx] = Cell.EMPTY
+        stack.append((nx, ny))
+    return cells
+
+
+@pytest.mark.parametrize('budget', [miner_engine.AI_PLAN_BUDGET, None])
+def test_zombies_chase(monkeypatch, budget):
+    # The env plans every zombie on every tick, like AI_PLAN_BUDGET = None.
+    # Near the player, GameState plans on every tick as well.
+    monkeypatch.setattr(miner_engine, 'AI_PLAN_BUDGET', budget)
+    rng = np.random.default_rng(3)
+    env = VectorMinerEnv(1, grid_size=21, level=4, seed=3)
+    env.reset()
+    cells = maze(env.size, rng)
+    env.cells[0] = cells
+    env.water_frontier[:] = False
+    env.lava_frontier[:] = False
+    env.player_health[0] = 1000
+    env.occupant[:] = -1
+    ys, xs = np.nonzero(cells == Cell.EMPTY)
+    picks = rng.choice(np.arange(1, len(xs)), env.max_zombies, replace=False)
+    state = game_on(env, 3)
+    for j, k in enumerate(picks.tolist()):
+        x, y = int(xs[k]), int(ys[k])
+        env.zombie_x[0, j], env.zombie_y[0, j] = x, y
+        env.zombie_health[0, j] = ZOMBIE_HEALTH
+        env.zombie_starred[0, j] = False
+        env.occupant[0, y, x] = j
+        state.zombies.spawn(x, y, ZOMBIE_HEALTH, attack_time=-ATTACK_COOLDOWN)
+
+    moves = [Action.NONE, Action.MOVE_UP, Action.MOVE_DOWN, Action.MOVE_LEFT,
+             Action.MOVE_RIGHT]
+    for action in rng.choice(moves, 300).tolist():
+        state.step(Action(action), env.action_time)
+        env.step([action])
+        check_same(env, state)
+        zombies = state.zombies
+        assert env.zombie_x[0].tolist() == zombies.x[:zombies.count].tolist()
+        assert env.zombie_y[0].tolist() == zombies.y[:zombies.count].tolist()
+    assert state.player_health < 1000  # The zombies caught up
+
+
+def test_many_zombies():
+    # More zombies than fit in an int8 slot: every one is found on its
+    # cell, and a hit lands on the zombie that is there
+    env = VectorMinerEnv(2, level=130, seed=1)
+    env.reset()
+    assert env.max_zombies > 128
+    for e in range(2):
+        living = np.flatnonzero(env.zombie_health[e] > 0)
+        assert len(living) == env.max_zombies
+        assert (env.occupant[e, env.zombie_y[e, living], env.zombie_x[e, living]]
+                == living).all()
+    j = env.max_zombies - 1
+    x, y = int(env.zombie_x[0, j]), int(env.zombie_y[0, j])
+    side = 1 if x == 0 else -1
+    env.player_x[0], env.player_y[0] = x + side, y
+    env.occupant[0, y, x + side] = -1
+    env.cells[0, y, x + side] = Cell.EMPTY
+    health = env.zombie_health[0].copy()
+    actions = np.full(2, Action.NONE)
+    actions[0] = Action.HIT_LEFT if side == 1 else Action.HIT_RIGHT
+    env.apply_actions(actions)
+    hit = np.flatnonzero(env.zombie_health[0] != health)
+    assert hit.tolist() == [j]